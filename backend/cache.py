@@ -0,0 +1,84 @@
+"""In-process TTL cache for upstream responses.
+
+``TTLCache.get_or_load`` returns a fresh cached value or awaits the loader,
+with concurrent misses for the same key sharing one load (so a burst of
+requests after expiry costs a single upstream call). Entries are bounded
+LRU-style, and hits and misses are reported per cache name.
+
+Invalidating a key also detaches any load of it still in flight: that load
+may have read data from before the write, so its result is returned to the
+callers already waiting on it but never stored, and later misses start a
+fresh load.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from metrics import record_cache
+
+
+class TTLCache:
+    def __init__(self, name, ttl, max_entries=256):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._loading = {}
+
+    def get(self, key):
+        """Fresh cached value for ``key``, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is not None and ttl <= 0:
+            # Expired on arrival; don't let it evict live entries
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """Cached value for ``key``, calling ``await loader()`` on a miss.
+
+        ``ttl`` overrides the cache's lifetime for the loaded value (0 keeps it
+        uncached); it may be a function of the value.
+        """
+        value = self.get(key)
+        if value is not None:
+            record_cache(self.name, True)
+            return value
+        record_cache(self.name, False)
+
+        pending = self._loading.get(key)
+        if pending is None:
+            pending = self._loading[key] = asyncio.ensure_future(loader())
+            try:
+                value = await asyncio.shield(pending)
+            finally:
+                current = self._loading.get(key) is pending
+                if current:
+                    del self._loading[key]
+            # Not stored if the key was invalidated while loading
+            if current:
+                self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        # Another request is already loading this key; wait for its result
+        return await asyncio.shield(pending)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+            self._loading.clear()
+        else:
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
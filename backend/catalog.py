@@ -0,0 +1,48 @@
+"""Refresh cadence and view rates for synced channel video catalogs.
+
+A connected channel's uploads are copied once into ``channel_videos``; after
+that each video's statistics are refreshed on a tiered cadence by age, since
+recent uploads gain views quickly and old ones barely move. Every refresh
+also records the video's daily view rate, measured from the change since the
+previous refresh, so monthly views can be summed from real per-video data.
+Until a video has been refreshed once, its rate is only the lifetime average
+and is marked unmeasured; new videos are refreshed soon after hydration
+whatever their tier, so that lasts a day rather than weeks.
+"""
+import os
+from datetime import timedelta
+
+# (maximum video age in days, refresh interval in hours); older videos use the last interval
+CATALOG_REFRESH_TIERS = [
+    (2, float(os.environ.get('CATALOG_REFRESH_HOURS_NEW', '1'))),
+    (30, float(os.environ.get('CATALOG_REFRESH_HOURS_RECENT', '6'))),
+    (365, float(os.environ.get('CATALOG_REFRESH_HOURS_YEAR', '72'))),
+]
+CATALOG_REFRESH_HOURS_OLD = float(os.environ.get('CATALOG_REFRESH_HOURS_OLD', '336'))
+# Shorter gaps between refreshes are too noisy to measure a view rate from
+CATALOG_MIN_RATE_HOURS = float(os.environ.get('CATALOG_MIN_RATE_HOURS', '1'))
+# A video without a measured rate is refreshed this soon, even on a slower tier
+CATALOG_FIRST_REFRESH_HOURS = float(os.environ.get('CATALOG_FIRST_REFRESH_HOURS', '24'))
+
+
+def refresh_interval(published_at, now, measured=True):
+    """How long a video published at ``published_at`` goes between stats refreshes"""
+    age_days = (now - published_at).total_seconds() / 86400
+    interval = timedelta(hours=CATALOG_REFRESH_HOURS_OLD)
+    for max_age_days, hours in CATALOG_REFRESH_TIERS:
+        if age_days < max_age_days:
+            interval = timedelta(hours=hours)
+            break
+    if not measured:
+        interval = min(interval, timedelta(hours=CATALOG_FIRST_REFRESH_HOURS))
+    return interval
+
+
+def daily_view_rate(views, published_at, now, previous_views=None, previous_at=None):
+    """(views per day, measured): since the previous refresh when possible, else the lifetime average"""
+    if previous_at is not None and previous_views is not None:
+        elapsed_days = (now - previous_at).total_seconds() / 86400
+        if elapsed_days * 24 >= CATALOG_MIN_RATE_HOURS:
+            return round(max(0, views - previous_views) / elapsed_days, 1), True
+    age_days = max(1.0, (now - published_at).total_seconds() / 86400)
+    return round(views / age_days, 1), False
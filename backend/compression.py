@@ -0,0 +1,235 @@
+"""Response compression for the CreatorHub API.
+
+Provides an ASGI middleware that negotiates gzip (and brotli when the
+``brotli`` package is installed) for textual responses above a size
+threshold, plus ``StaticPayload`` for JSON bodies that never change and can
+be encoded and compressed once at import time.
+"""
+import gzip
+import json
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Only these content types are worth compressing; images, video and already
+# compressed archives are passed through untouched.
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+
+
+def supported_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type):
+    """Check a Content-Type header value against the allowlist"""
+    if not content_type:
+        return False
+    content_type = content_type.split(';')[0].strip().lower()
+    return any(content_type.startswith(allowed) for allowed in COMPRESSIBLE_CONTENT_TYPES)
+
+
+def compress(body, encoding):
+    """Compress a complete body in one shot"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class _StreamCompressor:
+    """Incremental compressor that flushes after every chunk.
+
+    Flushing keeps streamed responses (NDJSON and similar) readable by the
+    client as each chunk arrives instead of only when the stream ends.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 selects the gzip container format
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b''):
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Compress eligible HTTP responses with brotli or gzip"""
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # encoding is None when the client accepts nothing we can produce; the
+        # responder still marks compressible responses with Vary then
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding'))
+        await _CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app, encoding, minimum_size):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.initial_message = None
+        self.started = False
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        message_type = message['type']
+
+        if message_type == 'http.response.start':
+            # Hold the start message until the first body chunk tells us
+            # whether compression applies.
+            self.initial_message = message
+            headers = MutableHeaders(raw=message['headers'])
+            compressible = is_compressible(headers.get('content-type'))
+            vary = [value.strip().lower() for value in headers.get('vary', '').split(',')]
+            if compressible and 'accept-encoding' not in vary:
+                # Caches must key on Accept-Encoding even when this particular
+                # response goes out uncompressed.
+                headers.add_vary_header('Accept-Encoding')
+            self.passthrough = (
+                self.encoding is None
+                or not compressible
+                or 'content-encoding' in headers
+            )
+            return
+
+        if message_type != 'http.response.body':
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message['headers'])
+
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(self.initial_message)
+                await self.send(message)
+                self.passthrough = True
+                return
+
+            headers['Content-Encoding'] = self.encoding
+
+            if not more_body:
+                body = compress(body, self.encoding)
+                headers['Content-Length'] = str(len(body))
+                await self.send(self.initial_message)
+                await self.send({'type': 'http.response.body', 'body': body})
+                return
+
+            # Streaming response: length is unknown up front
+            if 'content-length' in headers:
+                del headers['Content-Length']
+            self.compressor = _StreamCompressor(self.encoding)
+            await self.send(self.initial_message)
+            await self.send({
+                'type': 'http.response.body',
+                'body': self.compressor.chunk(body),
+                'more_body': True,
+            })
+            return
+
+        if more_body:
+            chunk = self.compressor.chunk(body)
+        else:
+            chunk = self.compressor.finish(body)
+        await self.send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+
+class StaticPayload:
+    """A JSON payload encoded and compressed once, then served from memory"""
+
+    def __init__(self, content):
+        self.body = json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.compressed = {}
+        if len(self.body) >= COMPRESSION_MIN_SIZE:
+            for encoding in supported_encodings():
+                self.compressed[encoding] = compress(self.body, encoding)
+
+    def response(self, request):
+        """Build a response for ``request`` using the best stored encoding"""
+        headers = {'Vary': 'Accept-Encoding'}
+        encoding = choose_encoding(request.headers.get('accept-encoding'))
+        body = self.compressed.get(encoding)
+        if body is None:
+            body = self.body
+        else:
+            headers['Content-Encoding'] = encoding
+        return Response(content=body, media_type='application/json', headers=headers)
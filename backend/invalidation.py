@@ -0,0 +1,141 @@
+"""Cross-worker invalidation of in-process caches.
+
+A worker that changes data behind a cache calls ``publish(cache, key)``:
+the entry is dropped locally right away and an event is written to a Mongo
+collection. Every worker listens for those events and drops the same entry
+from its own caches. Listening uses a change stream where the deployment
+supports one (replica sets); standalone servers reject change streams with
+error 40573, and the listener falls back to polling the collection.
+
+Whenever the listener (re)connects it clears every registered cache, since
+events may have been missed while it was down.
+
+Events are upserted without an ``_id`` so the server assigns the ObjectId:
+ids then follow one clock, the server's, and pollers page through them in
+order however skewed the workers' own clocks are.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from scheduler import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+CACHE_EVENTS_POLL_SECONDS = float(os.environ.get('CACHE_EVENTS_POLL_SECONDS', '1'))
+# Events are kept this long (TTL index); pollers re-read events whose ids are this much older
+# than the newest seen, as concurrent inserts can become visible out of id order
+CACHE_EVENTS_TTL_SECONDS = int(os.environ.get('CACHE_EVENTS_TTL_SECONDS', '3600'))
+CACHE_EVENTS_POLL_OVERLAP_SECONDS = float(os.environ.get('CACHE_EVENTS_POLL_OVERLAP_SECONDS', '5'))
+
+# Error codes meaning "change streams are not available here"
+CHANGE_STREAM_UNSUPPORTED = (40573, 40324)
+
+
+class CacheInvalidator:
+    def __init__(self, get_collection, poll_interval=CACHE_EVENTS_POLL_SECONDS):
+        self.get_collection = get_collection
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._caches = {}
+        self._task = None
+
+    def register(self, name, cache):
+        """Route events for ``name`` to ``cache.invalidate(key)``"""
+        self._caches[name] = cache
+
+    def _invalidate(self, name, key):
+        cache = self._caches.get(name)
+        if cache is not None:
+            # Keys travel as BSON arrays; caches use tuples
+            cache.invalidate(tuple(key) if isinstance(key, list) else key)
+
+    def _invalidate_all(self):
+        for cache in self._caches.values():
+            cache.invalidate()
+
+    async def publish(self, name, key=None):
+        """Drop ``key`` (or the whole cache) here and on every other worker"""
+        self._invalidate(name, key)
+        try:
+            # Matches nothing, so it inserts; without an _id in it the server generates one
+            await self.get_collection().update_one(
+                {'event': uuid.uuid4().hex},
+                {'$setOnInsert': {
+                    'cache': name,
+                    'key': list(key) if isinstance(key, tuple) else key,
+                    'origin': WORKER_ID,
+                    'created_at': datetime.utcnow(),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            # Other workers fall back on the cache TTL
+            logger.warning("Failed to publish invalidation for %s: %s", name, e)
+
+    def _apply(self, event):
+        if event.get('origin') != WORKER_ID:
+            self._invalidate(event.get('cache'), event.get('key'))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache-invalidation")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        delay = 1
+        while True:
+            try:
+                if self.mode != 'polling':
+                    await self._watch()
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED and self.mode != 'polling':
+                    logger.info("Change streams unavailable (%s); polling for cache invalidations", e.code)
+                    self.mode = 'polling'
+                    continue
+                logger.warning("Cache invalidation listener failed: %s", e)
+            except Exception as e:
+                logger.warning("Cache invalidation listener failed: %s", e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _watch(self):
+        pipeline = [{'$match': {'operationType': 'insert'}}]
+        async with self.get_collection().watch(pipeline) as stream:
+            self.mode = 'change_stream'
+            self._invalidate_all()
+            async for change in stream:
+                self._apply(change['fullDocument'])
+
+    async def _poll(self):
+        collection = self.get_collection()
+        self._invalidate_all()
+        # Everything up to the newest event is covered by the clear above
+        newest = await collection.find({}, {'_id': 1}).sort('_id', -1).to_list(1)
+        seen = {newest[0]['_id']} if newest else set()
+        while True:
+            query = {}
+            if seen:
+                floor = max(seen).generation_time - timedelta(seconds=CACHE_EVENTS_POLL_OVERLAP_SECONDS)
+                query = {'_id': {'$gte': ObjectId.from_datetime(floor)}}
+                seen = {event_id for event_id in seen if event_id >= query['_id']['$gte']}
+            events = await collection.find(query).sort('_id', 1).to_list(1000)
+            for event in events:
+                if event['_id'] not in seen:
+                    seen.add(event['_id'])
+                    self._apply(event)
+            await asyncio.sleep(self.poll_interval)
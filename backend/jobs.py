@@ -0,0 +1,285 @@
+"""Background job queue backed by MongoDB.
+
+Submitting a job stores a document and returns its ID straight away; a
+small pool of asyncio workers runs the handler and records progress, the
+result or the error on that document. Workers claim jobs atomically
+(``queued`` -> ``running``), so several API processes can share one
+collection, and identical requests that are still pending are answered
+with the existing job instead of a new one.
+
+A claim is a lease that the worker renews while the handler runs. A job
+whose lease lapsed (its worker was killed mid-run) no longer counts as
+pending; every worker pool periodically queues such jobs again. Errors the
+handler marks as transient (an overloaded upstream) put the job back in the
+queue with an exponential backoff, up to a number of attempts, instead of
+failing it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+# A running job's claim lasts this long and is renewed every third of it
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '120'))
+# How often a worker pool looks for lapsed leases and retries whose backoff has elapsed
+JOB_RECLAIM_SECONDS = float(os.environ.get('JOB_RECLAIM_SECONDS', '30'))
+# Runs a job gets when it keeps hitting transient errors; the delay doubles from the base
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '4'))
+JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', '30'))
+
+
+class QueueFull(Exception):
+    """Too many jobs are already waiting; the caller should retry later"""
+
+
+def pending_filter(now):
+    """Query matching jobs that are queued or held by a live worker"""
+    return {'$or': [{'status': QUEUED}, {'status': RUNNING, 'lease_expires_at': {'$gt': now}}]}
+
+
+def lapsed_filter(now):
+    """Query matching running jobs whose worker stopped renewing the lease"""
+    return {'status': RUNNING, '$or': [{'lease_expires_at': {'$lte': now}}, {'lease_expires_at': None}]}
+
+
+def retry_delay(attempts, base):
+    """Seconds before another run of a job that failed transiently ``attempts`` times"""
+    return base * 2 ** (attempts - 1)
+
+
+def request_hash(kind, payload):
+    """Stable fingerprint of a job request, used to dedupe pending jobs"""
+    canonical = json.dumps({'kind': kind, 'payload': payload}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class JobQueue:
+    def __init__(self, kind, handler, get_collection, workers=2, max_pending=100, lease_seconds=JOB_LEASE_SECONDS,
+                 retry_on=(), max_attempts=JOB_MAX_ATTEMPTS, retry_backoff=JOB_RETRY_BACKOFF_SECONDS,
+                 reclaim_seconds=JOB_RECLAIM_SECONDS):
+        """``handler(payload, progress)`` returns the job's result as a dict;
+        ``get_collection()`` returns the Mongo collection holding job documents;
+        exceptions of the ``retry_on`` types are retried rather than failing the job.
+        """
+        self.kind = kind
+        self.handler = handler
+        self.get_collection = get_collection
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.retry_on = tuple(retry_on)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.reclaim_seconds = reclaim_seconds
+        self._queue = None
+        self._tasks = []
+        # request hash -> job document, for jobs submitted here and not yet finished
+        self._pending = {}
+
+    async def start(self):
+        """Start the worker pool and pick up jobs left queued, or abandoned mid-run, by a previous run"""
+        if self._tasks:
+            return
+        now = datetime.utcnow()
+        abandoned = await self.get_collection().update_many(
+            dict(lapsed_filter(now), kind=self.kind),
+            {'$set': {'status': QUEUED, 'stage': QUEUED, 'updated_at': now}},
+        )
+        if abandoned.modified_count:
+            logger.warning("Re-queued %d %s jobs whose worker died", abandoned.modified_count, self.kind)
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.kind}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._reclaim_loop(), name=f"{self.kind}-reclaim"))
+        # Retries still backing off are queued by the reclaim loop once due
+        leftover = await self.get_collection().find(
+            {'kind': self.kind, 'status': QUEUED, 'retry_at': None}, {'_id': 0, 'job_id': 1}
+        ).sort('created_at', 1).to_list(self.max_pending)
+        for job in leftover:
+            self._queue.put_nowait(job['job_id'])
+        if leftover:
+            logger.info("Resumed %d queued %s jobs", len(leftover), self.kind)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload):
+        """Queue a job, returning ``(job, deduplicated)``"""
+        collection = self.get_collection()
+        fingerprint = request_hash(self.kind, payload)
+        # Checked before any await so concurrent identical submissions collapse here
+        local = self._pending.get(fingerprint)
+        if local:
+            return local, True
+        if self._queue is None or self._queue.qsize() >= self.max_pending:
+            raise QueueFull(f"{self.kind} queue is full")
+
+        now = datetime.utcnow()
+        job = {
+            'job_id': str(uuid.uuid4()),
+            'kind': self.kind,
+            'status': QUEUED,
+            'stage': QUEUED,
+            'request_hash': fingerprint,
+            'request': payload,
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'started_at': None,
+            'finished_at': None,
+        }
+        self._pending[fingerprint] = job
+        try:
+            # Another process may already be running the same request
+            existing = await collection.find_one(
+                dict(pending_filter(now), kind=self.kind, request_hash=fingerprint),
+                {'_id': 0},
+            )
+            if existing:
+                self._pending.pop(fingerprint, None)
+                return existing, True
+            await collection.insert_one(dict(job))
+        except Exception:
+            self._pending.pop(fingerprint, None)
+            raise
+        self._queue.put_nowait(job['job_id'])
+        return job, False
+
+    async def get(self, job_id):
+        return await self.get_collection().find_one({'job_id': job_id, 'kind': self.kind}, {'_id': 0})
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("%s job %s crashed the worker loop", self.kind, job_id)
+            finally:
+                self._queue.task_done()
+
+    async def reclaim(self):
+        """Queue jobs whose worker died mid-run and retries whose backoff has elapsed; the count queued"""
+        collection = self.get_collection()
+        now = datetime.utcnow()
+        reclaimed = []
+        lapsed = await collection.find(
+            dict(lapsed_filter(now), kind=self.kind), {'_id': 0, 'job_id': 1}
+        ).to_list(self.max_pending)
+        for job in lapsed:
+            # Conditional, so a lease renewed or reclaimed meanwhile is left alone
+            requeued = await collection.update_one(
+                dict(lapsed_filter(now), job_id=job['job_id']),
+                {'$set': {'status': QUEUED, 'stage': QUEUED, 'updated_at': now}},
+            )
+            if requeued.modified_count:
+                logger.warning("Re-queued %s job %s whose worker died", self.kind, job['job_id'])
+                reclaimed.append(job['job_id'])
+        # Every pool queues due retries; the atomic claim lets only one of them run it
+        due = await collection.find(
+            {'kind': self.kind, 'status': QUEUED, 'retry_at': {'$lte': now}}, {'_id': 0, 'job_id': 1}
+        ).sort('retry_at', 1).to_list(self.max_pending)
+        reclaimed.extend(job['job_id'] for job in due)
+        for job_id in reclaimed:
+            self._queue.put_nowait(job_id)
+        return len(reclaimed)
+
+    async def _reclaim_loop(self):
+        while True:
+            await asyncio.sleep(self.reclaim_seconds)
+            try:
+                await self.reclaim()
+            except Exception as e:
+                logger.warning("Reclaiming %s jobs failed: %s", self.kind, e)
+
+    def _forget(self, job_id):
+        for fingerprint, job in list(self._pending.items()):
+            if job['job_id'] == job_id:
+                del self._pending[fingerprint]
+
+    async def _renew_lease(self, job_id):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.get_collection().update_one(
+                {'job_id': job_id, 'status': RUNNING},
+                {'$set': {'lease_expires_at': datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+            )
+
+    async def _run(self, job_id):
+        collection = self.get_collection()
+        now = datetime.utcnow()
+        # Atomic claim, so a job is never run twice when processes share the collection
+        job = await collection.find_one_and_update(
+            {'job_id': job_id, 'status': QUEUED,
+             '$or': [{'retry_at': None}, {'retry_at': {'$lte': now}}]},
+            {'$set': {
+                'status': RUNNING, 'stage': 'started', 'started_at': now, 'updated_at': now,
+                'lease_expires_at': now + timedelta(seconds=self.lease_seconds), 'retry_at': None,
+            }, '$inc': {'attempts': 1}},
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            # Claimed by another process, or a retry not yet due; its outcome is read from the collection
+            self._forget(job_id)
+            return
+
+        async def progress(stage):
+            await collection.update_one(
+                {'job_id': job_id},
+                {'$set': {'stage': stage, 'updated_at': datetime.utcnow()}},
+            )
+
+        heartbeat = asyncio.create_task(self._renew_lease(job_id), name=f"{self.kind}-lease-{job_id}")
+        try:
+            result = await self.handler(job['request'], progress)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back rather than leave it running
+            self._pending.pop(job['request_hash'], None)
+            await collection.update_one(
+                {'job_id': job_id, 'status': RUNNING},
+                {'$set': {'status': QUEUED, 'stage': QUEUED, 'updated_at': datetime.utcnow()},
+                 '$unset': {'lease_expires_at': ''}},
+            )
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if isinstance(e, self.retry_on) and job['attempts'] < self.max_attempts:
+                delay = max(retry_delay(job['attempts'], self.retry_backoff), getattr(e, 'retry_after', 0))
+                logger.warning("%s job %s hit a transient error (attempt %d), retrying in %.0fs: %s",
+                               self.kind, job_id, job['attempts'], delay, e)
+                # Still pending, so identical submissions keep deduplicating onto it
+                await collection.update_one(
+                    {'job_id': job_id, 'status': RUNNING},
+                    {'$set': {'status': QUEUED, 'stage': QUEUED, 'error': error, 'updated_at': datetime.utcnow(),
+                              'retry_at': datetime.utcnow() + timedelta(seconds=delay)},
+                     '$unset': {'lease_expires_at': ''}},
+                )
+                return
+            logger.warning("%s job %s failed: %s", self.kind, job_id, e)
+            update = {'status': FAILED, 'stage': FAILED, 'error': error}
+        else:
+            update = {'status': SUCCEEDED, 'stage': SUCCEEDED, 'result': result, 'error': None}
+        finally:
+            heartbeat.cancel()
+        now = datetime.utcnow()
+        update.update(finished_at=now, updated_at=now)
+        try:
+            await collection.update_one({'job_id': job_id}, {'$set': update})
+        finally:
+            self._pending.pop(job['request_hash'], None)
@@ -0,0 +1,190 @@
+"""Shared gateway for calls to the LLM provider.
+
+Every LLM call goes through one ``LLMGateway`` so a slow or failing provider
+cannot take the whole API down with it:
+
+* at most ``LLM_MAX_IN_FLIGHT`` calls run at once; the rest wait in a
+  bounded queue, and callers beyond ``LLM_MAX_QUEUE`` (or that wait longer
+  than ``LLM_QUEUE_TIMEOUT_SECONDS``) are shed immediately;
+* each call is cut off after a per-endpoint timeout;
+* a circuit breaker opens after ``LLM_BREAKER_FAILURES`` consecutive
+  failures, rejecting calls without touching the provider until
+  ``LLM_BREAKER_RESET_SECONDS`` have passed, then lets a single probe through.
+
+Rejections raise ``LLMUnavailable`` subclasses carrying a ``retry_after``
+hint, which handlers turn into a fallback or a 503 with Retry-After.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from metrics import LLM_CIRCUIT_STATE, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_REJECTED
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', '8'))
+LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', '32'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', '10'))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '45'))
+LLM_SCRIPT_TIMEOUT_SECONDS = float(os.environ.get('LLM_SCRIPT_TIMEOUT_SECONDS', '120'))
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', '30'))
+
+# Long-form generations get more time than short list/analysis prompts
+ENDPOINT_TIMEOUTS = {
+    'generate_script': LLM_SCRIPT_TIMEOUT_SECONDS,
+}
+
+
+class LLMUnavailable(Exception):
+    """The gateway refused or abandoned a call; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class LLMOverloaded(LLMUnavailable):
+    pass
+
+
+class LLMTimeout(LLMUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning("LLM circuit breaker %s -> %s", self.state, state)
+        self.state = state
+        LLM_CIRCUIT_STATE.set(value=self._STATE_VALUES[state])
+
+    def retry_after(self):
+        if self.state == self.OPEN:
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+        return self.reset_timeout
+
+    def is_open(self):
+        """True while calls would be rejected without reaching the provider"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def before_call(self):
+        """Admit a call or raise ``CircuitOpen``"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpen("LLM provider circuit is open", self.retry_after())
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpen("LLM provider circuit is half-open; probe in progress", self.reset_timeout)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self):
+        """Forget a probe that ended without a verdict (e.g. the caller was cancelled)"""
+        self._probe_in_flight = False
+
+
+class LLMGateway:
+    def __init__(self, max_in_flight=LLM_MAX_IN_FLIGHT, max_queue=LLM_MAX_QUEUE,
+                 queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS, breaker=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = None
+        # Callers currently running or queued for a slot
+        self._admitted = 0
+
+    def _slots(self):
+        # Created lazily so the semaphore binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def _reject(self, error, reason):
+        LLM_REJECTED.inc(reason)
+        raise error
+
+    async def send(self, chat, message, endpoint, timeout=None):
+        """Send ``message`` through ``chat`` subject to the gateway's limits"""
+        if timeout is None:
+            timeout = ENDPOINT_TIMEOUTS.get(endpoint, LLM_TIMEOUT_SECONDS)
+        slots = self._slots()
+
+        if self.breaker.is_open():
+            self._reject(CircuitOpen("LLM provider circuit is open", self.breaker.retry_after()), 'circuit_open')
+        if self._admitted >= self.max_in_flight + self.max_queue:
+            self._reject(LLMOverloaded("LLM queue is full", self.queue_timeout), 'queue_full')
+
+        self._admitted += 1
+        LLM_QUEUE_DEPTH.set(value=max(0, self._admitted - self.max_in_flight))
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._leave()
+            self._reject(LLMOverloaded("Timed out waiting for an LLM slot", self.queue_timeout), 'queue_timeout')
+        except BaseException:
+            self._leave()
+            raise
+
+        LLM_IN_FLIGHT.inc()
+        try:
+            # The breaker may have opened while this call was queued
+            try:
+                self.breaker.before_call()
+            except CircuitOpen as e:
+                self._reject(e, 'circuit_open')
+            try:
+                response = await asyncio.wait_for(chat.send_message(message), timeout)
+            except asyncio.TimeoutError:
+                self.breaker.record_failure()
+                raise LLMTimeout(f"LLM call timed out after {timeout:.0f}s", self.breaker.retry_after())
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return response
+        finally:
+            LLM_IN_FLIGHT.dec()
+            slots.release()
+            self._leave()
+
+    def _leave(self):
+        self._admitted -= 1
+        LLM_QUEUE_DEPTH.set(value=max(0, self._admitted - self.max_in_flight))
+
+
+gateway = LLMGateway()
@@ -0,0 +1,128 @@
+"""Tolerant extraction of JSON objects from LLM replies.
+
+Models wrap JSON in prose or code fences, leave trailing commas, and get cut
+off mid-array. Rather than ``json.loads`` on everything between the first
+``[`` and the last ``]`` (which loses the whole reply to one bad
+character), ``JSONObjectStream`` scans the text as it arrives and yields
+each complete object as soon as its closing brace is seen. Any object not
+nested in another object is taken, whether at top level or inside arrays,
+so a stray ``[`` in the prose before the array ("[Note", a markdown link)
+doesn't hide what follows; malformed objects are repaired where that is
+cheap and skipped otherwise, so every well-formed object is still
+recovered.
+"""
+import json
+import re
+
+from metrics import LLM_JSON_OBJECTS
+
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"'})
+
+
+def _repair(text):
+    """Cheap fixes for the mistakes models make most often"""
+    return _TRAILING_COMMA.sub(r'\1', text.translate(_SMART_QUOTES))
+
+
+class JSONObjectStream:
+    def __init__(self, endpoint='unknown'):
+        self.endpoint = endpoint
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        # Open arrays around the current object
+        self._object_depth = None
+        self._buffer = ''
+        self._pos = 0
+        self.failures = 0
+
+    def _record(self, outcome):
+        LLM_JSON_OBJECTS.inc(self.endpoint, outcome)
+        if outcome in ('failed', 'truncated'):
+            self.failures += 1
+
+    def _decode(self, text):
+        try:
+            value = json.loads(text)
+            outcome = 'parsed'
+        except json.JSONDecodeError:
+            try:
+                value = json.loads(_repair(text))
+                outcome = 'repaired'
+            except json.JSONDecodeError:
+                self._record('failed')
+                return None
+        self._record(outcome)
+        return value
+
+    def _abandon_object(self):
+        """Drop a structurally broken object and resume in its enclosing arrays"""
+        self._record('failed')
+        del self._stack[self._object_depth:]
+        self._object_start = None
+
+    def feed(self, chunk):
+        """Consume more text and return the objects it completed"""
+        self._buffer += chunk
+        completed = []
+        text = self._buffer
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            # Quotes only delimit strings inside an object; prose around it may hold stray ones
+            if char == '"' and self._object_start is not None:
+                self._in_string = True
+            elif char in '[{':
+                # Outside an object the stack only holds arrays, balanced or not
+                if char == '{' and self._object_start is None:
+                    self._object_start = pos
+                    self._object_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in ']}':
+                if not self._stack:
+                    continue
+                if self._stack[-1] != ('[' if char == ']' else '{'):
+                    if self._object_start is not None:
+                        self._abandon_object()
+                    continue
+                self._stack.pop()
+                if char == '}' and self._object_start is not None and len(self._stack) == self._object_depth:
+                    value = self._decode(text[self._object_start:pos + 1])
+                    if isinstance(value, dict):
+                        completed.append(value)
+                    self._object_start = None
+
+        # Keep only the unfinished object (if any) for the next chunk
+        if self._object_start is not None:
+            self._buffer = text[self._object_start:]
+            self._object_start = 0
+        else:
+            self._buffer = ''
+        self._pos = len(self._buffer)
+        return completed
+
+    def close(self):
+        """Finish the stream, counting a cut-off trailing object as truncated"""
+        if self._object_start is not None:
+            self._record('truncated')
+        self._object_start = None
+        self._stack.clear()
+        self._buffer = ''
+        self._pos = 0
+
+
+def extract_objects(text, endpoint='unknown'):
+    """Every recoverable JSON object in a complete LLM reply"""
+    stream = JSONObjectStream(endpoint)
+    objects = stream.feed(text)
+    stream.close()
+    return objects
@@ -0,0 +1,207 @@
+"""Structured, low-overhead logging for the CreatorHub API.
+
+``configure_logging()`` routes every record through a bounded in-memory
+queue to a listener thread, so formatting and stream I/O never run on the
+event loop. Records are kept unformatted until the listener renders them
+(as JSON by default), high-volume INFO/DEBUG loggers can be sampled, and
+repeated tracebacks for the same error are rate limited.
+
+Environment:
+    LOG_LEVEL               root level (default INFO)
+    LOG_FORMAT              "json" (default) or "text"
+    LOG_SAMPLE_RATES        per-logger keep ratio for INFO/DEBUG, e.g. "server=0.1,httpx=0"
+    LOG_TRACEBACK_INTERVAL  seconds between full tracebacks for the same error (default 60)
+    LOG_QUEUE_SIZE          max queued records before new ones are dropped (default 10000)
+"""
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from tracing import current_request_id
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+LOG_TRACEBACK_INTERVAL = float(os.environ.get('LOG_TRACEBACK_INTERVAL', '60'))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def parse_sample_rates(spec):
+    """Parse "logger=rate,logger=rate" into a dict of floats"""
+    rates = {}
+    for part in spec.split(','):
+        name, _, rate = part.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including ``extra`` fields and the request ID"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            payload['request_id'] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Capture the request ID while still on the request's task"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO/DEBUG records from configured loggers.
+
+    Rates apply to a logger and its children; WARNING and above always pass.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._resolved = {}
+
+    def _rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+class TracebackRateLimitFilter(logging.Filter):
+    """Emit the full traceback for a given error at most once per interval.
+
+    Errors are keyed by logger, message template and exception type; in
+    between, records still pass but without ``exc_info``, noting how many
+    tracebacks were suppressed.
+    """
+
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last = {}
+
+    def filter(self, record):
+        if not record.exc_info or self.interval <= 0:
+            return True
+        exc_type = record.exc_info[0]
+        key = (record.name, record.msg if isinstance(record.msg, str) else repr(record.msg),
+               exc_type.__name__ if exc_type else None)
+        now = time.monotonic()
+        with self._lock:
+            last_time, suppressed = self._last.get(key, (0.0, 0))
+            if now - last_time >= self.interval:
+                self._last[key] = (now, 0)
+                if suppressed:
+                    record.suppressed_tracebacks = suppressed
+                return True
+            self._last[key] = (last_time, suppressed + 1)
+        record.exc_info = None
+        record.exc_text = None
+        record.traceback_suppressed = True
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that defers formatting to the listener and never blocks.
+
+    The stock ``QueueHandler.prepare`` formats the message on the calling
+    thread; here the record is only shallow-copied, so string interpolation
+    and traceback rendering happen on the listener thread (and not at all
+    for records that end up dropped).
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return copy.copy(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+
+
+def configure_logging():
+    """Install queue-based structured logging on the root logger (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+    queue_handler.addFilter(TracebackRateLimitFilter(LOG_TRACEBACK_INTERVAL))
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,359 @@
+"""In-process Prometheus-style metrics for the CreatorHub API.
+
+A deliberately small registry (counters, gauges and histograms with labels)
+rendered in the Prometheus text exposition format. Recording a sample is a
+dict lookup and a few additions under a lock, which keeps it cheap enough to
+leave enabled in production.
+"""
+import asyncio
+import bisect
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+LOOP_LAG_INTERVAL = float(os.environ.get('METRICS_LOOP_LAG_INTERVAL', '0.5'))
+
+# Latency buckets in seconds, from sub-millisecond Mongo calls up to long LLM generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, *labels):
+        """Context manager observing the wall time of its block"""
+        return _Timer(self, labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, key, ('le', '+Inf'))
+            lines.append(f"{self.name}_bucket{le} {state[-1]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(*self.labels, value=time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# HTTP
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'creatorhub_http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ('method', 'route', 'status'),
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'creatorhub_http_requests_in_flight',
+    'HTTP requests currently being handled',
+)
+
+# Upstreams
+YOUTUBE_CALL_DURATION = REGISTRY.histogram(
+    'creatorhub_youtube_call_duration_seconds',
+    'YouTube Data API call latency by method',
+    ('method',),
+)
+YOUTUBE_CALL_ERRORS = REGISTRY.counter(
+    'creatorhub_youtube_call_errors_total',
+    'Failed YouTube Data API calls by method',
+    ('method',),
+)
+YOUTUBE_QUOTA_UNITS = REGISTRY.counter(
+    'creatorhub_youtube_quota_units_total',
+    'YouTube Data API quota units consumed by method',
+    ('method',),
+)
+LLM_CALL_DURATION = REGISTRY.histogram(
+    'creatorhub_llm_call_duration_seconds',
+    'LLM call latency by endpoint',
+    ('endpoint',),
+)
+LLM_CALL_ERRORS = REGISTRY.counter(
+    'creatorhub_llm_call_errors_total',
+    'Failed LLM calls by endpoint',
+    ('endpoint',),
+)
+LLM_JSON_OBJECTS = REGISTRY.counter(
+    'creatorhub_llm_json_objects_total',
+    'JSON objects extracted from LLM replies by endpoint and outcome (parsed, repaired, failed, truncated)',
+    ('endpoint', 'outcome'),
+)
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    'creatorhub_llm_in_flight',
+    'LLM calls currently running through the gateway',
+)
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    'creatorhub_llm_queue_depth',
+    'LLM calls waiting for a gateway slot',
+)
+LLM_REJECTED = REGISTRY.counter(
+    'creatorhub_llm_rejected_total',
+    'LLM calls rejected by the gateway by reason (queue_full, queue_timeout, circuit_open)',
+    ('reason',),
+)
+LLM_CIRCUIT_STATE = REGISTRY.gauge(
+    'creatorhub_llm_circuit_state',
+    'LLM circuit breaker state (0 closed, 1 half-open, 2 open)',
+)
+MONGO_OPERATION_DURATION = REGISTRY.histogram(
+    'creatorhub_mongo_operation_duration_seconds',
+    'MongoDB operation latency by collection and operation',
+    ('collection', 'operation'),
+)
+MONGO_OPERATION_ERRORS = REGISTRY.counter(
+    'creatorhub_mongo_operation_errors_total',
+    'Failed MongoDB operations by collection and operation',
+    ('collection', 'operation'),
+)
+MONGO_POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    'creatorhub_mongo_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled MongoDB connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+MONGO_POOL_CHECKOUT_FAILURES = REGISTRY.counter(
+    'creatorhub_mongo_pool_checkout_failures_total',
+    'Failed MongoDB connection checkouts by reason (timeout, connectionError, poolClosed)',
+    ('reason',),
+)
+MONGO_POOL_CHECKED_OUT = REGISTRY.gauge(
+    'creatorhub_mongo_pool_checked_out',
+    'MongoDB connections currently checked out of the pool',
+)
+MONGO_POOL_CONNECTIONS = REGISTRY.gauge(
+    'creatorhub_mongo_pool_connections',
+    'Open MongoDB connections across all pools',
+)
+
+# Caches
+CACHE_REQUESTS = REGISTRY.counter(
+    'creatorhub_cache_requests_total',
+    'Cache lookups by cache name and result (hit or miss)',
+    ('cache', 'result'),
+)
+
+# Worker lifecycle
+WORKER_READY = REGISTRY.gauge(
+    'creatorhub_worker_ready',
+    'Whether this worker has finished warming up (1) or not (0)',
+)
+WARMUP_STEP_DURATION = REGISTRY.gauge(
+    'creatorhub_warmup_step_duration_seconds',
+    'Time taken by each startup warm-up step',
+    ('step',),
+)
+
+# Event loop
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    'creatorhub_event_loop_lag_seconds',
+    'Delay between a scheduled event loop wake-up and when it actually ran',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_LAST = REGISTRY.gauge(
+    'creatorhub_event_loop_lag_last_seconds',
+    'Most recent event loop lag sample',
+)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup as a hit or a miss"""
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+class MetricsMiddleware:
+    """Record per-route latency for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get('route')
+            route_path = getattr(route, 'path', None) or 'unmatched'
+            HTTP_REQUEST_DURATION.observe(
+                scope['method'], route_path, status['code'],
+                value=time.perf_counter() - start,
+            )
+
+
+async def monitor_event_loop_lag(interval=LOOP_LAG_INTERVAL):
+    """Sample how late the event loop wakes up from a fixed sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        EVENT_LOOP_LAG.observe(value=lag)
+        EVENT_LOOP_LAG_LAST.set(value=lag)
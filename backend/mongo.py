@@ -0,0 +1,284 @@
+"""MongoDB helpers for the CreatorHub API.
+
+``InstrumentedDatabase`` wraps a Motor database so that every awaited
+collection operation (including cursor ``to_list`` calls) is timed and
+traced per collection and operation without touching individual call sites.
+
+``create_client`` builds the Motor client from environment settings (pool
+limits, timeouts, compression) with a pool listener feeding checkout metrics,
+and ``ensure_indexes`` / ``drop_indexes`` manage the indexes the API relies
+on at startup.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, monitoring
+from pymongo.errors import OperationFailure
+
+from metrics import (
+    MONGO_OPERATION_DURATION, MONGO_OPERATION_ERRORS, MONGO_POOL_CHECKED_OUT,
+    MONGO_POOL_CHECKOUT_FAILURES, MONGO_POOL_CHECKOUT_WAIT, MONGO_POOL_CONNECTIONS,
+)
+from tracing import span
+
+# Pool sizing and timeouts; the wait-queue timeout turns an exhausted pool into a fast error
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000'))
+# Comma-separated wire compressors, e.g. "zstd,zlib" (zstd and snappy need their Python packages)
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')
+# Read preference for analytics and cache reads that tolerate replication lag
+MONGO_ANALYTICS_READ_PREFERENCE = os.environ.get('MONGO_ANALYTICS_READ_PREFERENCE', 'secondaryPreferred')
+MONGO_READY_TIMEOUT_SECONDS = float(os.environ.get('MONGO_READY_TIMEOUT_SECONDS', '2'))
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds connection pool checkout waits, failures and usage into metrics.
+
+    Checkouts start and finish on the same driver thread, so the wait is timed
+    with a thread-local start.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(value=time.perf_counter() - started)
+            self._local.started = None
+        MONGO_POOL_CHECKED_OUT.inc()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        MONGO_POOL_CHECKOUT_FAILURES.inc(str(event.reason))
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            logger.warning("Timed out waiting for a Mongo connection from %s", event.address)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc()
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec()
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        logger.warning("Mongo connection pool for %s cleared", event.address)
+
+    def pool_closed(self, event):
+        pass
+
+
+def create_client(url):
+    """Motor client with pool limits, timeouts and compression from the environment"""
+    options = {
+        'maxPoolSize': MONGO_MAX_POOL_SIZE,
+        'minPoolSize': MONGO_MIN_POOL_SIZE,
+        'maxIdleTimeMS': MONGO_MAX_IDLE_TIME_MS,
+        'waitQueueTimeoutMS': MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        'serverSelectionTimeoutMS': MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        'connectTimeoutMS': MONGO_CONNECT_TIMEOUT_MS,
+        'socketTimeoutMS': MONGO_SOCKET_TIMEOUT_MS,
+        'event_listeners': [PoolMetricsListener()],
+    }
+    if MONGO_COMPRESSORS:
+        options['compressors'] = MONGO_COMPRESSORS
+    return AsyncIOMotorClient(url, **options)
+
+
+def analytics_read_preference():
+    if MONGO_ANALYTICS_READ_PREFERENCE not in READ_PREFERENCES:
+        logger.warning("Unknown MONGO_ANALYTICS_READ_PREFERENCE %r; using primary", MONGO_ANALYTICS_READ_PREFERENCE)
+    return READ_PREFERENCES.get(MONGO_ANALYTICS_READ_PREFERENCE, ReadPreference.PRIMARY)
+
+
+async def check_ready(database, timeout=MONGO_READY_TIMEOUT_SECONDS):
+    """Ping the server; returns None when healthy, or the error message"""
+    try:
+        await asyncio.wait_for(database.command('ping'), timeout)
+        return None
+    except asyncio.TimeoutError:
+        return f"ping timed out after {timeout}s"
+    except Exception as e:
+        return str(e)
+
+
+async def _timed(awaitable, collection, operation):
+    start = time.perf_counter()
+    try:
+        with span(f"mongo.{collection}.{operation}"):
+            return await awaitable
+    except Exception:
+        MONGO_OPERATION_ERRORS.inc(collection, operation)
+        raise
+    finally:
+        MONGO_OPERATION_DURATION.observe(collection, operation, value=time.perf_counter() - start)
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times ``to_list`` and keeps chaining wrapped"""
+
+    def __init__(self, cursor, collection, operation):
+        self._cursor = cursor
+        self._collection = collection
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if result is self._cursor:
+                # sort(), limit(), skip()... return the cursor itself
+                return self
+            if inspect.isawaitable(result):
+                return _timed(result, self._collection, self._operation)
+            return result
+
+        return call
+
+    def __aiter__(self):
+        return self._cursor.__aiter__()
+
+
+class InstrumentedCollection:
+    def __init__(self, collection):
+        self._collection = collection
+        self._name = collection.name
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return _timed(result, self._name, name)
+            if hasattr(result, 'to_list'):
+                return InstrumentedCursor(result, self._name, name)
+            return result
+
+        return call
+
+    def __getitem__(self, name):
+        return InstrumentedCollection(self._collection[name])
+
+
+class InstrumentedDatabase:
+    def __init__(self, database):
+        self._database = database
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if hasattr(type(self._database), name):
+            # Database-level API (command, list_collection_names, ...)
+            attr = getattr(self._database, name)
+            if not callable(attr):
+                return attr
+
+            def call(*args, **kwargs):
+                result = attr(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    return _timed(result, '$db', name)
+                return result
+
+            return call
+        return self[name]
+
+    def __getitem__(self, name):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = InstrumentedCollection(self._database[name])
+        return collection
+
+    def with_options(self, **kwargs):
+        """Instrumented copy of the database with other read preference, write concern, ..."""
+        return InstrumentedDatabase(self._database.with_options(**kwargs))
+
+    def unwrap(self):
+        """The underlying Motor database"""
+        return self._database
+
+
+# The index name exists with other keys or options (e.g. a plain index now declared unique)
+INDEX_SPEC_CONFLICTS = (85, 86)
+
+
+def index_name(keys, options):
+    """Name Mongo gives an index unless one is set explicitly"""
+    return options.get('name') or '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+
+async def ensure_indexes(database, specs):
+    """Create each ``(collection, keys, options)`` index; returns how many failed.
+
+    An index whose name exists with an older definition is dropped and
+    rebuilt. Any other failure (e.g. existing duplicates under a new unique
+    index) is logged and skipped so one bad index never keeps a worker down.
+    """
+    failed = 0
+    for collection, keys, options in specs:
+        try:
+            try:
+                await database[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                if e.code not in INDEX_SPEC_CONFLICTS:
+                    raise
+                name = index_name(keys, options)
+                logger.info("Rebuilding index %s on %s with its new definition", name, collection)
+                await database[collection].drop_index(name)
+                await database[collection].create_index(keys, **options)
+        except Exception as e:
+            failed += 1
+            logger.warning("Could not create index %s on %s: %s", keys, collection, e)
+    return failed
+
+
+async def drop_indexes(database, names):
+    """Drop each ``(collection, index_name)`` if present"""
+    for collection, name in names:
+        try:
+            await database[collection].drop_index(name)
+            logger.info("Dropped index %s on %s", name, collection)
+        except OperationFailure as e:
+            # 27: IndexNotFound; also raised when the collection doesn't exist
+            if e.code not in (26, 27):
+                logger.warning("Could not drop index %s on %s: %s", name, collection, e)
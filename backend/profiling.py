@@ -0,0 +1,312 @@
+"""Runtime profiling helpers for the CreatorHub API.
+
+``BlockingDetector`` finds code that holds the event loop. The loop thread
+bumps a heartbeat from a short repeating timer; a watchdog thread notices
+when the heartbeat goes stale past a threshold and samples the loop
+thread's stack until it recovers. Samples are aggregated into per-function
+blocking time, so offloading work can be shown to remove a stall.
+
+``SamplingProfiler`` profiles the running worker on demand (CPU stack
+samples plus a tracemalloc allocation diff) without a restart.
+"""
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCKING_DETECTOR = os.environ.get('LOOP_BLOCKING_DETECTOR', 'false').lower() in ('1', 'true', 'yes')
+LOOP_BLOCKING_THRESHOLD_MS = float(os.environ.get('LOOP_BLOCKING_THRESHOLD_MS', '100'))
+LOOP_BLOCKING_SAMPLE_MS = float(os.environ.get('LOOP_BLOCKING_SAMPLE_MS', '10'))
+
+# Frames from files in this directory are application code
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def frame_label(code):
+    """Stable per-function label for a code object"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def is_app_code(code):
+    return os.path.abspath(code.co_filename).startswith(APP_DIR + os.sep)
+
+
+def capture_stack(thread_id, max_depth=64):
+    """Return the thread's current stack as labels, outermost first"""
+    frame = sys._current_frames().get(thread_id)
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        stack.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class BlockingDetector:
+    def __init__(self, threshold_ms=LOOP_BLOCKING_THRESHOLD_MS, sample_ms=LOOP_BLOCKING_SAMPLE_MS,
+                 max_recent=50):
+        self.threshold = threshold_ms / 1000
+        self.sample_interval = sample_ms / 1000
+        self.enabled = False
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = 0.0
+        self._stopping = threading.Event()
+        self._watchdog = None
+        self._lock = threading.Lock()
+        self._recent = collections.deque(maxlen=max_recent)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._self_samples = collections.Counter()
+            self._total_samples = collections.Counter()
+            self._app_samples = collections.Counter()
+            self._stall_count = 0
+            self._blocked_seconds = 0.0
+            self._recent.clear()
+
+    def start(self, loop):
+        """Begin watching ``loop``; must be called from the loop's own thread"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        loop.call_soon(self._beat)
+        self._watchdog = threading.Thread(target=self._watch, name='loop-blocking-watchdog', daemon=True)
+        self._watchdog.start()
+        logger.info("Event loop blocking detector started (threshold %.0fms)", self.threshold * 1000)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stopping.set()
+        self._watchdog.join(timeout=1)
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        if self.enabled:
+            # Beat well inside the threshold so idle loops never look stalled
+            self._loop.call_later(min(self.sample_interval, self.threshold / 4), self._beat)
+
+    def _watch(self):
+        stall_samples = []
+        stall_started = None
+        while not self._stopping.wait(self.sample_interval):
+            now = time.monotonic()
+            last_beat = self._last_beat
+            if now - last_beat > self.threshold:
+                if stall_started is None:
+                    stall_started = last_beat
+                stall_samples.append(capture_stack(self._loop_thread_id))
+            elif stall_started is not None:
+                self._record_stall(last_beat - stall_started, stall_samples)
+                stall_samples = []
+                stall_started = None
+
+    def _record_stall(self, duration, samples):
+        if not samples:
+            return
+        per_sample = duration / len(samples)
+        stacks = collections.Counter()
+        with self._lock:
+            self._stall_count += 1
+            self._blocked_seconds += duration
+            for stack in samples:
+                labels = [frame_label(code) for code, _ in stack]
+                if labels:
+                    self._self_samples[labels[-1]] += per_sample
+                for label in set(labels):
+                    self._total_samples[label] += per_sample
+                app_frames = [code for code, _ in stack if is_app_code(code)]
+                if app_frames:
+                    self._app_samples[frame_label(app_frames[-1])] += per_sample
+                stacks[tuple(f"{frame_label(code)}:{lineno}" for code, lineno in stack)] += 1
+            top_stack = list(stacks.most_common(1)[0][0])
+            self._recent.append({
+                'at': time.time(),
+                'duration_ms': round(duration * 1000, 1),
+                'samples': len(samples),
+                'stack': top_stack,
+            })
+        logger.warning(
+            "Event loop blocked for %.0fms; most sampled stack (innermost last):\n  %s",
+            duration * 1000, '\n  '.join(top_stack[-15:]),
+        )
+
+    def report(self, limit=30):
+        """Aggregate blocking time per function, largest first.
+
+        ``functions`` ranks by self time (the frame that was actually running);
+        ``app_functions`` charges each sample to its innermost application
+        frame, so time spent inside libraries is attributed to the handler or
+        helper in this codebase that called them.
+        """
+        with self._lock:
+            def entry(label):
+                return {
+                    'function': label,
+                    'self_ms': round(self._self_samples.get(label, 0.0) * 1000, 1),
+                    'total_ms': round(self._total_samples.get(label, 0.0) * 1000, 1),
+                }
+
+            return {
+                'enabled': self.enabled,
+                'threshold_ms': self.threshold * 1000,
+                'stalls': self._stall_count,
+                'blocked_ms': round(self._blocked_seconds * 1000, 1),
+                'functions': [entry(label) for label, _ in self._self_samples.most_common(limit)],
+                'app_functions': [
+                    {'function': label, 'blocked_ms': round(blocked * 1000, 1)}
+                    for label, blocked in self._app_samples.most_common(limit)
+                ],
+                'recent': list(self._recent),
+            }
+
+
+blocking_detector = BlockingDetector()
+
+
+# Leaf functions that mean a thread is idle rather than burning CPU
+IDLE_FUNCTIONS = frozenset({
+    'select', 'poll', 'epoll', 'wait', '_wait_for_tstate_lock', 'sleep', 'accept',
+    'recv', 'recv_into', 'readinto', 'get',
+})
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler plus tracemalloc allocation diff.
+
+    Stacks of every thread are sampled at a fixed interval for the requested
+    duration. Output is in the collapsed ("folded") format understood by
+    flamegraph.pl and speedscope, along with the hottest frames and the time
+    attributed to each route handler.
+    """
+
+    def __init__(self, interval_ms=5.0, tracemalloc_frames=25):
+        self.interval = interval_ms / 1000
+        self.tracemalloc_frames = tracemalloc_frames
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._lock.locked()
+
+    def run(self, seconds, handler_names=(), memory=True, top=25):
+        """Profile the process for ``seconds``; blocks the calling thread"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            return self._run(seconds, frozenset(handler_names), memory, top)
+        finally:
+            self._lock.release()
+
+    def _run(self, seconds, handler_names, memory, top):
+        import tracemalloc
+
+        started_tracing = False
+        start_snapshot = None
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.tracemalloc_frames)
+                started_tracing = True
+            start_snapshot = tracemalloc.take_snapshot()
+
+        folded = collections.Counter()
+        self_time = collections.Counter()
+        handler_time = collections.Counter()
+        handler_frames = collections.defaultdict(collections.Counter)
+        samples = idle = 0
+        own_thread = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                stack.reverse()
+                if stack[-1].co_name in IDLE_FUNCTIONS:
+                    idle += 1
+                    continue
+                samples += 1
+                labels = [frame_label(code) for code in stack]
+                thread_name = thread_names.get(thread_id, str(thread_id)).replace(';', '_')
+                folded[';'.join([thread_name] + labels)] += 1
+                self_time[labels[-1]] += 1
+                for code, label in zip(stack, labels):
+                    if code.co_name in handler_names and is_app_code(code):
+                        handler_time[code.co_name] += 1
+                        handler_frames[code.co_name][labels[-1]] += 1
+                        break
+            time.sleep(self.interval)
+
+        result = {
+            'duration_s': seconds,
+            'interval_ms': self.interval * 1000,
+            'cpu': {
+                'samples': samples,
+                'idle_samples': idle,
+                'top_frames': [
+                    {'function': label, 'samples': count, 'pct': round(count / samples * 100, 1)}
+                    for label, count in self_time.most_common(top)
+                ] if samples else [],
+                'handlers': [
+                    {
+                        'handler': name,
+                        'samples': count,
+                        'est_ms': round(count * self.interval * 1000, 1),
+                        'hot_frames': [
+                            {'function': label, 'samples': n}
+                            for label, n in handler_frames[name].most_common(5)
+                        ],
+                    }
+                    for name, count in handler_time.most_common()
+                ],
+                'folded': '\n'.join(f"{stack} {count}" for stack, count in folded.most_common()),
+            },
+        }
+
+        if memory:
+            end_snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            diff = end_snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), 'lineno')
+            largest = end_snapshot.filter_traces(filters).statistics('lineno')
+            result['memory'] = {
+                'traced_current_kb': round(current / 1024, 1),
+                'traced_peak_kb': round(peak / 1024, 1),
+                'growth': [
+                    {
+                        'location': str(stat.traceback[0]),
+                        'size_diff_kb': round(stat.size_diff / 1024, 1),
+                        'count_diff': stat.count_diff,
+                    }
+                    for stat in diff[:top] if stat.size_diff
+                ],
+                'largest': [
+                    {'location': str(stat.traceback[0]), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                    for stat in largest[:top]
+                ],
+            }
+
+        return result
+
+
+sampling_profiler = SamplingProfiler()
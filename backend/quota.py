@@ -0,0 +1,124 @@
+"""Daily YouTube Data API quota accounting.
+
+The API allots a fixed number of units per project per day, reset at
+midnight Pacific time. ``QuotaBudget`` tracks what the project has spent
+so optional, expensive calls (a 100-unit ``search.list`` for research) can
+be skipped before they starve the core features of quota. Spend is also
+tallied per tenant, optionally capped so one creator can't use up the
+project's quota for everyone.
+
+Every worker spends from the same project quota, so each one periodically
+adds its own spend since the last sync to a shared daily tally in Mongo
+(``$inc``, one document per quota day and tenant) and adopts the totals.
+Between syncs a worker only sees other workers' spend as of the last one.
+"""
+import os
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from pymongo import UpdateOne
+
+YOUTUBE_DAILY_QUOTA = int(os.environ.get('YOUTUBE_DAILY_QUOTA', '10000'))
+# Daily units a single tenant may spend on optional calls; 0 disables the cap
+YOUTUBE_TENANT_DAILY_QUOTA = int(os.environ.get('YOUTUBE_TENANT_DAILY_QUOTA', '0'))
+# How often a worker merges its spend into the shared daily tally
+YOUTUBE_QUOTA_SYNC_SECONDS = float(os.environ.get('YOUTUBE_QUOTA_SYNC_SECONDS', '30'))
+
+_QUOTA_TZ = ZoneInfo('America/Los_Angeles')
+
+
+def quota_day():
+    return datetime.now(_QUOTA_TZ).date()
+
+
+class QuotaBudget:
+    def __init__(self, get_collection=None, daily_limit=YOUTUBE_DAILY_QUOTA, tenant_limit=YOUTUBE_TENANT_DAILY_QUOTA):
+        self.get_collection = get_collection
+        self.daily_limit = daily_limit
+        self.tenant_limit = tenant_limit
+        self._lock = threading.Lock()
+        self._day = quota_day()
+        # Known spend (shared tally plus unsynced), and this worker's spend not yet synced
+        self._spent = 0
+        self._spent_by_tenant = {}
+        self._unsynced = 0
+        self._unsynced_by_tenant = {}
+
+    def _roll(self):
+        today = quota_day()
+        if today != self._day:
+            self._day = today
+            self._spent = 0
+            self._spent_by_tenant = {}
+            self._unsynced = 0
+            self._unsynced_by_tenant = {}
+
+    def spend(self, units, tenant=None):
+        with self._lock:
+            self._roll()
+            self._spent += units
+            self._unsynced += units
+            if tenant is not None:
+                self._spent_by_tenant[tenant] = self._spent_by_tenant.get(tenant, 0) + units
+                self._unsynced_by_tenant[tenant] = self._unsynced_by_tenant.get(tenant, 0) + units
+
+    async def sync(self):
+        """Add this worker's unsynced spend to the shared daily tally and adopt the tally's totals"""
+        if self.get_collection is None:
+            return
+        with self._lock:
+            self._roll()
+            day, units, by_tenant = self._day, self._unsynced, self._unsynced_by_tenant
+            self._unsynced, self._unsynced_by_tenant = 0, {}
+        collection = self.get_collection()
+        key = day.isoformat()
+        now = datetime.utcnow()
+        # The project total is the document without a tenant
+        increments = [(None, units)] + list(by_tenant.items()) if units else []
+        try:
+            if increments:
+                await collection.bulk_write([
+                    UpdateOne(
+                        {'day': key, 'tenant': tenant},
+                        {'$inc': {'spent': spent}, '$setOnInsert': {'created_at': now}},
+                        upsert=True,
+                    )
+                    for tenant, spent in increments
+                ], ordered=False)
+            docs = await collection.find({'day': key}, {'tenant': 1, 'spent': 1}).to_list(None)
+        except Exception:
+            with self._lock:
+                # Retried on the next sync unless the day rolled over meanwhile
+                if self._day == day:
+                    self._unsynced += units
+                    for tenant, spent in by_tenant.items():
+                        self._unsynced_by_tenant[tenant] = self._unsynced_by_tenant.get(tenant, 0) + spent
+            raise
+        with self._lock:
+            if self._day != day:
+                return
+            tally = {doc['tenant']: doc['spent'] for doc in docs}
+            self._spent = tally.get(None, 0) + self._unsynced
+            tenants = (set(tally) - {None}) | set(self._unsynced_by_tenant)
+            self._spent_by_tenant = {
+                tenant: tally.get(tenant, 0) + self._unsynced_by_tenant.get(tenant, 0) for tenant in tenants
+            }
+
+    def spent_by(self, tenant):
+        with self._lock:
+            self._roll()
+            return self._spent_by_tenant.get(tenant, 0)
+
+    @property
+    def remaining(self):
+        with self._lock:
+            self._roll()
+            return max(0, self.daily_limit - self._spent)
+
+    def can_spend(self, units, reserve=0, tenant=None):
+        """True if ``units`` fit while leaving ``reserve`` units for other work, within the tenant's cap"""
+        if tenant is not None and self.tenant_limit and self.spent_by(tenant) + units > self.tenant_limit:
+            return False
+        return self.remaining - units >= reserve
+
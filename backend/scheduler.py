@@ -0,0 +1,98 @@
+"""Periodic background jobs for the API process.
+
+``PeriodicJob`` runs a coroutine function on a fixed interval (with a little
+jitter so workers don't fire in lockstep). When given a lock collection,
+each run first takes a Mongo lease for the job name, so with several API
+workers only one of them does the work per interval. The lease lasts one
+interval and is renewed while a run is in progress, so a run that outlasts
+its interval doesn't let another worker start the same job alongside it.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process as a lease holder
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def acquire_lease(collection, name, ttl_seconds):
+    """Take or renew the named lease; False if another worker holds it"""
+    now = datetime.utcnow()
+    try:
+        await collection.update_one(
+            {'_id': name, '$or': [{'expires_at': {'$lt': now}}, {'owner': WORKER_ID}]},
+            {'$set': {'owner': WORKER_ID, 'expires_at': now + timedelta(seconds=ttl_seconds), 'acquired_at': now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The upsert collided with a live lease held by someone else
+        return False
+    return True
+
+
+class PeriodicJob:
+    def __init__(self, name, interval, func, get_lock_collection=None, jitter=0.1):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.get_lock_collection = get_lock_collection
+        self.jitter = jitter
+        self.last_run = None
+        self.last_error = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=f"job-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _hold_lease(self):
+        while True:
+            await asyncio.sleep(self.interval / 3)
+            try:
+                held = await acquire_lease(self.get_lock_collection(), self.name, self.interval)
+            except Exception as e:
+                logger.warning("Could not renew lease for job %s: %s", self.name, e)
+                continue
+            if not held:
+                logger.warning("Job %s lost its lease mid-run", self.name)
+
+    async def run_once(self):
+        """Run the job now if this worker wins the lease; returns whether it ran"""
+        if self.get_lock_collection is None:
+            await self.func()
+        else:
+            if not await acquire_lease(self.get_lock_collection(), self.name, self.interval):
+                return False
+            renewal = asyncio.create_task(self._hold_lease(), name=f"job-{self.name}-lease")
+            try:
+                await self.func()
+            finally:
+                renewal.cancel()
+        self.last_run = datetime.utcnow()
+        return True
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Periodic job %s failed: %s", self.name, e)
+            await asyncio.sleep(self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
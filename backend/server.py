@@ -1,51 +1,236 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import hmac
+import json
 import logging
+import re
+import threading
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
 from datetime import datetime, timedelta
+from statistics import median, quantiles
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from emergentintegrations.llm.chat import LlmChat, UserMessage
-import json
-import traceback
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 import google.auth.exceptions
+import httplib2
+from compression import CompressionMiddleware, StaticPayload
+from metrics import (
+    REGISTRY, MetricsMiddleware, monitor_event_loop_lag, record_cache,
+    YOUTUBE_CALL_DURATION, YOUTUBE_CALL_ERRORS, YOUTUBE_QUOTA_UNITS,
+    LLM_CALL_DURATION, LLM_CALL_ERRORS, WARMUP_STEP_DURATION, WORKER_READY,
+)
+from mongo import (
+    InstrumentedDatabase, analytics_read_preference, check_ready, create_client, drop_indexes, ensure_indexes,
+)
+from llm_json import extract_objects
+from llm import CircuitOpen, LLMUnavailable, gateway as llm_gateway
+from jobs import FAILED, SUCCEEDED, JobQueue, QueueFull
+from similarity import SEMANTIC_CACHE_TTL_HOURS, STOP_WORDS, SemanticCache
+from cache import TTLCache
+from scheduler import PeriodicJob
+from invalidation import CACHE_EVENTS_TTL_SECONDS, CacheInvalidator
+from velocity import VelocityTracker, utcnow_minute
+from watchlist import (
+    advance_high_water, error_backoff, merge_upload_times, parse_published_at, poll_interval, select_new_uploads,
+)
+from catalog import daily_view_rate, refresh_interval
+from quota import YOUTUBE_QUOTA_SYNC_SECONDS, QuotaBudget
+from tenancy import DEFAULT_USER_ID, current_tenant, tenant
+from tracing import TracingMiddleware, exporter as span_exporter, span
+from profiling import LOOP_BLOCKING_DETECTOR, blocking_detector, sampling_profiler
+from log_config import configure_logging, shutdown_logging
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+client = create_client(mongo_url)
+db = InstrumentedDatabase(client[os.environ['DB_NAME']])
+# Cache and analytics reads that can tolerate replication lag
+analytics_db = db.with_options(read_preference=analytics_read_preference())
 
 # API Keys
 YOUTUBE_API_KEY = os.environ.get('YOUTUBE_API_KEY')
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
 
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Startup warm-up: preloading is bounded so a slow upstream can't keep a worker out of rotation
+WARMUP_TIMEOUT_SECONDS = float(os.environ.get('WARMUP_TIMEOUT_SECONDS', '60'))
+WARMUP_PRELOAD = os.environ.get('WARMUP_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+WARMUP_MAX_DASHBOARDS = int(os.environ.get('WARMUP_MAX_DASHBOARDS', '20'))
+
+# Retries when concurrent primary-channel switches collide on the unique index
+PRIMARY_SWITCH_ATTEMPTS = int(os.environ.get('PRIMARY_SWITCH_ATTEMPTS', '3'))
+
+# Per-tenant connected channel lists; writes invalidate them on every worker, so this can be long
+CHANNEL_CACHE_SECONDS = float(os.environ.get('CHANNEL_CACHE_SECONDS', '3600'))
+
+# How long a channel's dashboard analytics are reused; a channel YouTube could not return is retried sooner
+DASHBOARD_CACHE_SECONDS = float(os.environ.get('DASHBOARD_CACHE_SECONDS', '300'))
+DASHBOARD_ERROR_CACHE_SECONDS = float(os.environ.get('DASHBOARD_ERROR_CACHE_SECONDS', '15'))
+
+# Competitor watchlist: due channels are checked on this interval, a bounded batch at a time;
+# polling pauses when the day's YouTube quota drops to the reserve
+WATCHLIST_CHECK_SECONDS = float(os.environ.get('WATCHLIST_CHECK_SECONDS', '60'))
+WATCHLIST_POLL_BATCH = int(os.environ.get('WATCHLIST_POLL_BATCH', '25'))
+WATCHLIST_POLL_CONCURRENCY = int(os.environ.get('WATCHLIST_POLL_CONCURRENCY', '4'))
+WATCHLIST_QUOTA_RESERVE = int(os.environ.get('WATCHLIST_QUOTA_RESERVE', '1000'))
+WATCHLIST_MAX_CHANNELS = int(os.environ.get('WATCHLIST_MAX_CHANNELS', '50'))
+# Uploads playlist paging per poll; a poll stops early at the high-water mark
+WATCHLIST_PAGE_SIZE = int(os.environ.get('WATCHLIST_PAGE_SIZE', '10'))
+WATCHLIST_MAX_PAGES = int(os.environ.get('WATCHLIST_MAX_PAGES', '5'))
+WATCHLIST_FEED_RETENTION_DAYS = float(os.environ.get('WATCHLIST_FEED_RETENTION_DAYS', '90'))
+
+# Channel catalogs: connected channels' uploads are synced into channel_videos, a bounded
+# number of playlist pages per run, with per-video stats refreshed on a tiered cadence
+CATALOG_SYNC_CHECK_SECONDS = float(os.environ.get('CATALOG_SYNC_CHECK_SECONDS', '300'))
+CATALOG_SYNC_MAX_PAGES = int(os.environ.get('CATALOG_SYNC_MAX_PAGES', '20'))
+# Work per run: channels synced and wall time after which no further channel is started
+CATALOG_SYNC_MAX_CHANNELS = int(os.environ.get('CATALOG_SYNC_MAX_CHANNELS', '10'))
+CATALOG_SYNC_BUDGET_SECONDS = float(os.environ.get('CATALOG_SYNC_BUDGET_SECONDS', '120'))
+CATALOG_UPLOADS_CHECK_MINUTES = float(os.environ.get('CATALOG_UPLOADS_CHECK_MINUTES', '60'))
+CATALOG_REFRESH_BATCH = int(os.environ.get('CATALOG_REFRESH_BATCH', '500'))
+CATALOG_QUOTA_RESERVE = int(os.environ.get('CATALOG_QUOTA_RESERVE', '3000'))
+# Latest uploads averaged for the dashboard's recent-performance figure
+CATALOG_RECENT_VIDEOS = int(os.environ.get('CATALOG_RECENT_VIDEOS', '10'))
+
+# Background script generation
+SCRIPT_JOB_WORKERS = int(os.environ.get('SCRIPT_JOB_WORKERS', '2'))
+SCRIPT_JOB_MAX_PENDING = int(os.environ.get('SCRIPT_JOB_MAX_PENDING', '100'))
+# Finished jobs (and their scripts) are kept this long for polling clients
+SCRIPT_JOB_RETENTION_DAYS = float(os.environ.get('SCRIPT_JOB_RETENTION_DAYS', '7'))
+
+# Batched idea generation: output-token budget and topic cap per LLM call, and concurrent calls per batch
+IDEA_BATCH_TOKEN_BUDGET = int(os.environ.get('IDEA_BATCH_TOKEN_BUDGET', '6000'))
+IDEA_BATCH_MAX_TOPICS = int(os.environ.get('IDEA_BATCH_MAX_TOPICS', '10'))
+IDEA_BATCH_CONCURRENCY = int(os.environ.get('IDEA_BATCH_CONCURRENCY', '4'))
+# Ideas one topic may ask for; keeps a single topic's reply well inside the batch token budget
+IDEA_MAX_COUNT = int(os.environ.get('IDEA_MAX_COUNT', '20'))
+# Follow-up LLM calls for ideas missing from a partially unparseable reply
+IDEA_RETRY_ATTEMPTS = int(os.environ.get('IDEA_RETRY_ATTEMPTS', '1'))
+
+# How long a mostPopular chart response is reused
+YOUTUBE_TRENDING_CACHE_SECONDS = float(os.environ.get('YOUTUBE_TRENDING_CACHE_SECONDS', '300'))
+# Deep trending crawls: pages of 50 followed (the chart ends at 200 items) and pages fetched ahead of the client
+TRENDING_CRAWL_MAX_PAGES = int(os.environ.get('TRENDING_CRAWL_MAX_PAGES', '4'))
+TRENDING_CRAWL_PREFETCH_PAGES = int(os.environ.get('TRENDING_CRAWL_PREFETCH_PAGES', '1'))
+# Trending charts are snapshotted on this interval to derive view velocity; history is kept for the retention period
+TRENDING_SNAPSHOT_SECONDS = float(os.environ.get('TRENDING_SNAPSHOT_SECONDS', '1800'))
+TRENDING_SNAPSHOT_RETENTION_DAYS = float(os.environ.get('TRENDING_SNAPSHOT_RETENTION_DAYS', '14'))
+VELOCITY_RELOAD_SECONDS = float(os.environ.get('VELOCITY_RELOAD_SECONDS', '300'))
+# Tracked videos (watched competitors' uploads and connected channels' catalogs) published within
+# this many days are snapshotted too, up to a cap, 50 a quota unit, until the day's quota drops to the reserve
+VELOCITY_TRACKED_DAYS = float(os.environ.get('VELOCITY_TRACKED_DAYS', '7'))
+VELOCITY_TRACKED_MAX = int(os.environ.get('VELOCITY_TRACKED_MAX', '500'))
+VELOCITY_QUOTA_RESERVE = int(os.environ.get('VELOCITY_QUOTA_RESERVE', '2000'))
+# Regions one aggregate trending request may ask for
+TRENDING_AGGREGATE_MAX_REGIONS = int(os.environ.get('TRENDING_AGGREGATE_MAX_REGIONS', '10'))
+
+# Auto-research: results are memoized per topic and language, and the 100-unit
+# search.list is skipped once the day's quota drops to the reserve
+RESEARCH_CACHE_HOURS = float(os.environ.get('RESEARCH_CACHE_HOURS', '24'))
+# LLM-only answers (no YouTube data, e.g. with the quota at its reserve) are reused only this long
+RESEARCH_FALLBACK_CACHE_SECONDS = float(os.environ.get('RESEARCH_FALLBACK_CACHE_SECONDS', '300'))
+RESEARCH_SEARCH_RESULTS = int(os.environ.get('RESEARCH_SEARCH_RESULTS', '50'))
+RESEARCH_QUOTA_RESERVE = int(os.environ.get('RESEARCH_QUOTA_RESERVE', '2000'))
+
+# Trending topics are precomputed per "REGION:category" variant by a background job
+TRENDING_TOPICS_VARIANTS = os.environ.get('TRENDING_TOPICS_VARIANTS', 'US:all')
+TRENDING_TOPICS_REFRESH_SECONDS = float(os.environ.get('TRENDING_TOPICS_REFRESH_SECONDS', '3600'))
+TRENDING_TOPICS_CHECK_SECONDS = float(os.environ.get('TRENDING_TOPICS_CHECK_SECONDS', '300'))
+TRENDING_TOPICS_RELOAD_SECONDS = float(os.environ.get('TRENDING_TOPICS_RELOAD_SECONDS', '60'))
+TRENDING_TOPICS_MAX_VARIANTS = int(os.environ.get('TRENDING_TOPICS_MAX_VARIANTS', '20'))
+# Variants requested through the API stop being generated once nobody asked for them in this long
+TRENDING_TOPICS_VARIANT_TTL_DAYS = float(os.environ.get('TRENDING_TOPICS_VARIANT_TTL_DAYS', '7'))
+TRENDING_TOPICS_USE_YOUTUBE = os.environ.get('TRENDING_TOPICS_USE_YOUTUBE', 'true').lower() in ('1', 'true', 'yes')
+
 # YouTube API client
 youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
 
 # Create the main app without a prefix
 app = FastAPI()
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Create a router with the /api prefix; every request is attributed to a tenant
+api_router = APIRouter(prefix="/api", dependencies=[Depends(tenant)])
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (JSON records, written from a background thread)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Upstream call helpers
+# Quota cost per YouTube Data API method (units per call)
+YOUTUBE_QUOTA_COSTS = {
+    'search.list': 100,
+    'videos.list': 1,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+}
+
+# Spend is merged into a daily tally in Mongo shared by every worker
+youtube_quota = QuotaBudget(lambda: db.youtube_quota)
+quota_sync_job = PeriodicJob("youtube_quota_sync", YOUTUBE_QUOTA_SYNC_SECONDS, youtube_quota.sync)
+
+_youtube_http = threading.local()
+
+def _execute_youtube_request(request):
+    """Execute a YouTube API request on a per-thread HTTP connection"""
+    # httplib2 connections are not thread-safe, so each executor thread keeps its own
+    http = getattr(_youtube_http, 'http', None)
+    if http is None:
+        http = _youtube_http.http = httplib2.Http()
+    return request.execute(http=http)
+
+async def youtube_execute(request):
+    """Run a YouTube API request off the event loop, recording latency, errors and quota"""
+    method = getattr(request, 'methodId', 'unknown').replace('youtube.', '', 1)
+    quota_cost = YOUTUBE_QUOTA_COSTS.get(method, 1)
+    YOUTUBE_QUOTA_UNITS.inc(method, amount=quota_cost)
+    youtube_quota.spend(quota_cost, current_tenant())
+    start = time.perf_counter()
+    try:
+        with span(f"youtube.{method}", quota_units=quota_cost):
+            return await asyncio.to_thread(_execute_youtube_request, request)
+    except Exception:
+        YOUTUBE_CALL_ERRORS.inc(method)
+        raise
+    finally:
+        YOUTUBE_CALL_DURATION.observe(method, value=time.perf_counter() - start)
+
+async def llm_send(chat, message, endpoint):
+    """Send a message to the LLM through the shared gateway, recording latency and errors per endpoint"""
+    start = time.perf_counter()
+    try:
+        with span(f"llm.{endpoint}"):
+            return await llm_gateway.send(chat, message, endpoint)
+    except CircuitOpen:
+        # Rejected without reaching the provider; counted by the gateway instead
+        raise
+    except Exception:
+        LLM_CALL_ERRORS.inc(endpoint)
+        raise
+    finally:
+        LLM_CALL_DURATION.observe(endpoint, value=time.perf_counter() - start)
+
+def llm_unavailable_error(e):
+    """503 telling the client when to retry a shed or rejected LLM call"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
 # Models
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -68,6 +253,22 @@ class TrendingVideo(BaseModel):
     duration: str
     tags: List[str] = []
     viral_score: int
+    # From consecutive trending snapshots; None until the video has been seen twice
+    velocity_score: Optional[int] = None
+    views_per_hour: Optional[float] = None
+
+class AggregatedTrendingVideo(TrendingVideo):
+    # 1-based chart position per region the video trends in
+    regionRanks: Dict[str, int]
+    regionCount: int
+    aggregateScore: float
+
+class AggregatedTrendingResponse(BaseModel):
+    regions: List[str]
+    category: str
+    videos: List[AggregatedTrendingVideo]
+    # Regions left out, with the reason (quota or upstream error)
+    skippedRegions: Dict[str, str] = {}
 
 class ChannelStats(BaseModel):
     channel_id: str
@@ -92,11 +293,27 @@ class VideoIdea(BaseModel):
     tags: List[str]
     ai_generated: bool = True
     created_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    # Similarity to the earlier topic when served from the semantic cache
+    confidence: Optional[float] = None
 
 class ContentGenerationRequest(BaseModel):
     topic: str
     category: str = "general"
-    count: int = 5
+    count: int = Field(default=5, ge=1, le=IDEA_MAX_COUNT)
+    bypass_cache: bool = False
+
+class BatchContentGenerationRequest(BaseModel):
+    items: List[ContentGenerationRequest] = Field(min_length=1, max_length=50)
+
+class BatchIdeasResult(BaseModel):
+    topic: str
+    category: str
+    ideas: List[VideoIdea]
+    fallback: bool = False
+
+class BatchContentGenerationResponse(BaseModel):
+    results: List[BatchIdeasResult]
+    llmCalls: int
 
 class ConnectedChannel(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -109,6 +326,8 @@ class ConnectedChannel(BaseModel):
     video_count: int
     connected_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
     is_primary: bool = False
+    # Read once from channels.list contentDetails; recent uploads are listed through it
+    uploads_playlist_id: Optional[str] = None
 
 class ChannelConnectionRequest(BaseModel):
     channel_id: Optional[str] = None
@@ -375,7 +594,7 @@ def calculate_demographic_multiplier(demographics_data):
         }
         
     except Exception as e:
-        logger.error(f"Error calculating demographic multiplier: {e}")
+        logger.error("Error calculating demographic multiplier: %s", e)
         # Return conservative fallback multipliers
         return {
             'combined_multiplier': 0.7,
@@ -440,7 +659,7 @@ async def fetch_youtube_demographics(channel_id, youtube_api_key):
         # For now, we'll return simulated realistic demographic data based on channel analysis
         # In production, this would integrate with YouTube Analytics API v2
         
-        logger.info(f"Fetching demographics for channel {channel_id}")
+        logger.info("Fetching demographics for channel %s", channel_id)
         
         # Analyze channel to estimate realistic demographics
         # This is a fallback until full YouTube Analytics OAuth integration
@@ -449,7 +668,7 @@ async def fetch_youtube_demographics(channel_id, youtube_api_key):
         return demographics
         
     except Exception as e:
-        logger.error(f"Error fetching YouTube demographics: {e}")
+        logger.error("Error fetching YouTube demographics: %s", e)
         return None
 
 async def simulate_realistic_demographics(channel_id, youtube_api_key):
@@ -463,7 +682,7 @@ async def simulate_realistic_demographics(channel_id, youtube_api_key):
             part="snippet,statistics",
             id=channel_id
         )
-        channel_response = channel_request.execute()
+        channel_response = await youtube_execute(channel_request)
         
         if not channel_response.get('items'):
             return None
@@ -537,12 +756,12 @@ async def simulate_realistic_demographics(channel_id, youtube_api_key):
                 'others': 14
             }
         
-        logger.info(f"Generated realistic demographics for {channel_id}: Age groups: {len(demographics['age_groups'])}, Countries: {len(demographics['countries'])}")
+        logger.info("Generated realistic demographics for %s: Age groups: %s, Countries: %s", channel_id, len(demographics['age_groups']), len(demographics['countries']))
         
         return demographics
         
     except Exception as e:
-        logger.error(f"Error simulating demographics: {e}")
+        logger.error("Error simulating demographics: %s", e)
         return None
 
 async def store_channel_demographics(channel_id, demographics_data):
@@ -562,27 +781,28 @@ async def store_channel_demographics(channel_id, demographics_data):
             upsert=True
         )
         
-        logger.info(f"Stored demographics data for channel {channel_id}")
+        logger.info("Stored demographics data for channel %s", channel_id)
         
     except Exception as e:
-        logger.error(f"Error storing demographics: {e}")
+        logger.error("Error storing demographics: %s", e)
 
 async def get_cached_demographics(channel_id):
     """Get cached demographic data from database"""
     try:
-        demographics_doc = await db.channel_demographics.find_one({
+        demographics_doc = await analytics_db.channel_demographics.find_one({
             "channel_id": channel_id,
             "expires_at": {"$gt": datetime.utcnow()}
         })
         
+        record_cache('demographics', demographics_doc is not None)
         if demographics_doc:
-            logger.info(f"Using cached demographics for channel {channel_id}")
+            logger.info("Using cached demographics for channel %s", channel_id)
             return demographics_doc.get('demographics')
         
         return None
         
     except Exception as e:
-        logger.error(f"Error getting cached demographics: {e}")
+        logger.error("Error getting cached demographics: %s", e)
         return None
 
 # API Routes
@@ -601,10 +821,79 @@ async def create_status_check(input: StatusCheckCreate):
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+    status_checks = await analytics_db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 # YouTube API endpoints
+velocity_tracker = VelocityTracker(lambda: db.video_velocity, lambda: db.trending_snapshots)
+
+def build_trending_video(item):
+    """TrendingVideo from a videos.list item with snippet, statistics and contentDetails"""
+    snippet = item['snippet']
+    statistics = item['statistics']
+    
+    # Get duration in seconds
+    duration_seconds = get_video_duration_seconds(item['contentDetails']['duration'])
+    
+    # Calculate viral score
+    viral_score = calculate_viral_score(
+        int(statistics.get('viewCount', 0)),
+        snippet['publishedAt']
+    )
+    
+    return TrendingVideo(
+        id=item['id'],
+        title=snippet['title'],
+        channel=snippet['channelTitle'],
+        channel_id=snippet['channelId'],
+        views=int(statistics.get('viewCount', 0)),
+        publish_date=snippet['publishedAt'].split('T')[0],
+        thumbnail=snippet['thumbnails']['medium']['url'],
+        category=snippet.get('categoryId', ''),
+        description=snippet['description'][:200] + "..." if len(snippet['description']) > 200 else snippet['description'],
+        duration=format_duration(duration_seconds),
+        tags=snippet.get('tags', [])[:5],  # Limit to 5 tags
+        viral_score=viral_score,
+        **video_velocity_fields(item['id'])
+    )
+
+def video_velocity_fields(video_id):
+    state = velocity_tracker.get(video_id)
+    if not state or state.get('views_per_hour') is None:
+        return {}
+    return {"velocity_score": state['velocity_score'], "views_per_hour": state['views_per_hour']}
+
+# Keyed by (region, category, page token), the first page's token being None;
+# pages cached for one tenant are keyed by (tenant, region, category, page token)
+most_popular_cache = TTLCache('youtube_most_popular', YOUTUBE_TRENDING_CACHE_SECONDS, max_entries=1024)
+
+async def fetch_most_popular_page(region, category="all", page_token=None, tenant=None):
+    """One 50-item page of the mostPopular chart and the next page's token, shared through a TTL cache.
+
+    With ``tenant`` the page is cached for that tenant only.
+    """
+    async def load():
+        request = youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            chart="mostPopular",
+            regionCode=region,
+            maxResults=50,
+            videoCategoryId=None if category == "all" else category,
+            pageToken=page_token
+        )
+        response = await youtube_execute(request)
+        return response.get('items', []), response.get('nextPageToken')
+
+    key = (region.upper(), category, page_token)
+    if tenant is not None:
+        key = (tenant,) + key
+    return await most_popular_cache.get_or_load(key, load)
+
+async def fetch_most_popular(region, category="all"):
+    """Items of the first (top 50) mostPopular chart page"""
+    items, _ = await fetch_most_popular_page(region, category)
+    return items
+
 @api_router.get("/youtube/trending", response_model=List[TrendingVideo])
 async def get_trending_videos(
     category: str = Query(default="all"),
@@ -613,47 +902,8 @@ async def get_trending_videos(
 ):
     """Get trending videos from YouTube"""
     try:
-        # Get trending videos
-        request = youtube.videos().list(
-            part="snippet,statistics,contentDetails",
-            chart="mostPopular",
-            regionCode=region,
-            maxResults=max_results,
-            videoCategoryId=None if category == "all" else category
-        )
-        
-        response = request.execute()
-        
-        trending_videos = []
-        for item in response.get('items', []):
-            snippet = item['snippet']
-            statistics = item['statistics']
-            content_details = item['contentDetails']
-            
-            # Get duration in seconds
-            duration_seconds = get_video_duration_seconds(content_details['duration'])
-            
-            # Calculate viral score
-            viral_score = calculate_viral_score(
-                int(statistics.get('viewCount', 0)),
-                snippet['publishedAt']
-            )
-            
-            video = TrendingVideo(
-                id=item['id'],
-                title=snippet['title'],
-                channel=snippet['channelTitle'],
-                channel_id=snippet['channelId'],
-                views=int(statistics.get('viewCount', 0)),
-                publish_date=snippet['publishedAt'].split('T')[0],
-                thumbnail=snippet['thumbnails']['medium']['url'],
-                category=snippet.get('categoryId', ''),
-                description=snippet['description'][:200] + "..." if len(snippet['description']) > 200 else snippet['description'],
-                duration=format_duration(duration_seconds),
-                tags=snippet.get('tags', [])[:5],  # Limit to 5 tags
-                viral_score=viral_score
-            )
-            trending_videos.append(video)
+        items = await fetch_most_popular(region, category)
+        trending_videos = [build_trending_video(item) for item in items[:max_results]]
         
         # Sort by viral score
         trending_videos.sort(key=lambda x: x.viral_score, reverse=True)
@@ -661,10 +911,170 @@ async def get_trending_videos(
         return trending_videos
         
     except Exception as e:
-        logger.error(f"Error fetching trending videos: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error fetching trending videos: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch trending videos: {str(e)}")
 
+async def crawl_trending_pages(region, category, max_pages, tenant):
+    """Yield NDJSON lines for up to ``max_pages`` chart pages.
+
+    A producer task follows page tokens and fetches ahead into a small bounded
+    queue while the current page is hydrated and streamed, so memory stays at a
+    few pages however deep the crawl goes. Pages past the first are only read
+    by crawls and are cached per ``tenant``, whose quota pays for them.
+    """
+    pages = asyncio.Queue(maxsize=TRENDING_CRAWL_PREFETCH_PAGES)
+
+    async def produce():
+        page_token = None
+        try:
+            for page in range(1, max_pages + 1):
+                items, page_token = await fetch_most_popular_page(
+                    region, category, page_token, tenant=tenant if page_token else None
+                )
+                await pages.put((page, items, None))
+                if not page_token:
+                    break
+        except Exception as e:
+            await pages.put((None, None, e))
+            return
+        await pages.put((None, None, None))
+
+    producer = asyncio.create_task(produce())
+    rank = 0
+    page_count = 0
+    error = None
+    try:
+        while True:
+            page, items, error = await pages.get()
+            if page is None:
+                break
+            page_count = page
+            lines = []
+            for item in items:
+                rank += 1
+                lines.append(json.dumps({"type": "video", "rank": rank, "page": page, **build_trending_video(item).dict()}))
+            if lines:
+                yield "\n".join(lines) + "\n"
+    finally:
+        # The client may disconnect mid-stream
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    summary = {"type": "summary", "region": region, "category": category, "count": rank, "pages": page_count, "complete": error is None}
+    if error is not None:
+        logger.warning("Trending crawl for %s/%s stopped at page %d: %s", region, category, page_count + 1, error)
+        summary["error"] = str(error)
+    yield json.dumps(summary) + "\n"
+
+@api_router.get("/youtube/trending/crawl")
+async def crawl_trending_videos(
+    region: str = Query(default="US"),
+    category: str = Query(default="all"),
+    max_pages: int = Query(default=TRENDING_CRAWL_MAX_PAGES, ge=1, le=TRENDING_CRAWL_MAX_PAGES),
+    user_id: str = Depends(tenant)
+):
+    """Stream the trending chart beyond the top 50 as NDJSON: one video per line, then a summary line"""
+    return StreamingResponse(
+        crawl_trending_pages(region.upper(), category, max_pages, user_id),
+        media_type="application/x-ndjson"
+    )
+
+def parse_region_codes(spec):
+    """Validated, de-duplicated upper-case region codes from "US,gb, IN" """
+    regions = []
+    for part in spec.split(','):
+        region = part.strip().upper()
+        if not region:
+            continue
+        if len(region) != 2 or not region.isalpha():
+            raise HTTPException(status_code=400, detail=f"Invalid region code: {part.strip()}")
+        if region not in regions:
+            regions.append(region)
+    if not regions:
+        raise HTTPException(status_code=400, detail="At least one region is required")
+    if len(regions) > TRENDING_AGGREGATE_MAX_REGIONS:
+        raise HTTPException(status_code=400, detail=f"At most {TRENDING_AGGREGATE_MAX_REGIONS} regions per request")
+    return regions
+
+def merge_region_charts(charts, region_count):
+    """Merge per-region chart items into AggregatedTrendingVideos ranked across regions.
+
+    Each region a video trends in contributes 1 at the top of its chart down to
+    1/len(chart) at the bottom; reach is that sum over the regions requested,
+    and the aggregate score weighs reach and the video's own viral score equally.
+    """
+    merged = {}
+    for region, items in charts.items():
+        for rank, item in enumerate(items, start=1):
+            entry = merged.get(item['id'])
+            if entry is None:
+                # Hydrate each video once, however many regions it trends in
+                entry = merged[item['id']] = {"video": build_trending_video(item), "ranks": {}, "reach": 0.0}
+            entry["ranks"][region] = rank
+            entry["reach"] += 1 - (rank - 1) / len(items)
+
+    videos = []
+    for entry in merged.values():
+        video = entry["video"]
+        reach = entry["reach"] / region_count
+        videos.append(AggregatedTrendingVideo(
+            **video.dict(),
+            regionRanks=entry["ranks"],
+            regionCount=len(entry["ranks"]),
+            aggregateScore=round(0.5 * video.viral_score + 50 * reach, 1)
+        ))
+    videos.sort(key=lambda v: (v.aggregateScore, v.regionCount, v.views), reverse=True)
+    return videos
+
+@api_router.get("/youtube/trending/aggregate", response_model=AggregatedTrendingResponse)
+async def get_aggregated_trending_videos(
+    regions: str = Query(default="US", description="Comma-separated region codes, e.g. US,GB,IN"),
+    category: str = Query(default="all"),
+    max_results: int = Query(default=50, ge=1, le=50)
+):
+    """Trending videos across several regions in one call, de-duplicated and ranked together"""
+    try:
+        region_codes = parse_region_codes(regions)
+        category = validate_category(category)
+        skipped = {}
+
+        # Cached charts are free; only fetch the rest while quota allows
+        to_fetch = []
+        for region in region_codes:
+            if most_popular_cache.get((region, category, None)) is not None or youtube_quota.can_spend(
+                YOUTUBE_QUOTA_COSTS['videos.list'], tenant=current_tenant()
+            ):
+                to_fetch.append(region)
+            else:
+                skipped[region] = "quota"
+
+        results = await asyncio.gather(
+            *(fetch_most_popular(region, category) for region in to_fetch), return_exceptions=True
+        )
+        charts = {}
+        for region, result in zip(to_fetch, results):
+            if isinstance(result, Exception):
+                logger.warning("Trending fetch for %s failed: %s", region, result)
+                skipped[region] = "error"
+            else:
+                charts[region] = result
+
+        if not charts:
+            raise HTTPException(status_code=502, detail="Failed to fetch trending videos for any region")
+
+        return AggregatedTrendingResponse(
+            regions=list(charts),
+            category=category,
+            videos=merge_region_charts(charts, len(charts))[:max_results],
+            skippedRegions=skipped
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error aggregating trending videos: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to aggregate trending videos: {str(e)}")
+
 @api_router.get("/youtube/search")
 async def search_youtube_videos(
     query: str = Query(..., description="Search query"),
@@ -680,7 +1090,7 @@ async def search_youtube_videos(
             order="relevance"
         )
         
-        response = request.execute()
+        response = await youtube_execute(request)
         
         # Get video IDs for additional details
         video_ids = [item['id']['videoId'] for item in response.get('items', [])]
@@ -694,40 +1104,14 @@ async def search_youtube_videos(
             id=','.join(video_ids)
         )
         
-        videos_response = videos_request.execute()
+        videos_response = await youtube_execute(videos_request)
         
-        search_results = []
-        for item in videos_response.get('items', []):
-            snippet = item['snippet']
-            statistics = item['statistics']
-            content_details = item['contentDetails']
-            
-            duration_seconds = get_video_duration_seconds(content_details['duration'])
-            viral_score = calculate_viral_score(
-                int(statistics.get('viewCount', 0)),
-                snippet['publishedAt']
-            )
-            
-            video = TrendingVideo(
-                id=item['id'],
-                title=snippet['title'],
-                channel=snippet['channelTitle'],
-                channel_id=snippet['channelId'],
-                views=int(statistics.get('viewCount', 0)),
-                publish_date=snippet['publishedAt'].split('T')[0],
-                thumbnail=snippet['thumbnails']['medium']['url'],
-                category=snippet.get('categoryId', ''),
-                description=snippet['description'][:200] + "..." if len(snippet['description']) > 200 else snippet['description'],
-                duration=format_duration(duration_seconds),
-                tags=snippet.get('tags', [])[:5],
-                viral_score=viral_score
-            )
-            search_results.append(video)
+        search_results = [build_trending_video(item) for item in videos_response.get('items', [])]
         
         return search_results
         
     except Exception as e:
-        logger.error(f"Error searching YouTube videos: {str(e)}")
+        logger.error("Error searching YouTube videos: %s", e)
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 @api_router.get("/youtube/channel/{channel_id}", response_model=ChannelStats)
@@ -739,7 +1123,7 @@ async def get_channel_stats(channel_id: str):
             id=channel_id
         )
         
-        response = request.execute()
+        response = await youtube_execute(request)
         
         if not response.get('items'):
             raise HTTPException(status_code=404, detail="Channel not found")
@@ -765,24 +1149,31 @@ async def get_channel_stats(channel_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching channel stats: {str(e)}")
+        logger.error("Error fetching channel stats: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch channel stats: {str(e)}")
 
 # AI-powered content generation
-@api_router.post("/content/generate-ideas", response_model=List[VideoIdea])
-async def generate_content_ideas(request: ContentGenerationRequest):
-    """Generate AI-powered content ideas based on trending topics"""
+# Answers for near-duplicate topics ("crypto tips" / "cryptocurrency tips") are reused
+semantic_cache = SemanticCache(lambda: analytics_db.semantic_cache)
+
+async def recall_answer(namespace, topic, accept=None):
+    """Semantic cache lookup; a failure here counts as a miss rather than failing the request"""
     try:
-        # Initialize AI chat
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"content_gen_{uuid.uuid4()}",
-            system_message="You are an expert YouTube content strategist. Generate viral video ideas based on trending topics and user requests. Focus on engaging, clickable titles and valuable content descriptions."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        # Create prompt for content generation
-        prompt = f"""
-Generate {request.count} unique YouTube video ideas for the category: {request.category} and topic: {request.topic}
+        return await semantic_cache.lookup(namespace, topic, accept=accept)
+    except Exception as e:
+        logger.warning("Semantic cache lookup failed for %s: %s", namespace, e)
+        return None
+
+async def remember_answer(namespace, topic, result):
+    """Store an LLM answer in the semantic cache; a failure here never fails the request"""
+    try:
+        await semantic_cache.store(namespace, topic, result)
+    except Exception as e:
+        logger.warning("Failed to cache answer for %s: %s", namespace, e)
+
+def content_ideas_prompt(request, count, exclude_titles=()):
+    prompt = f"""
+Generate {count} unique YouTube video ideas for the category: {request.category} and topic: {request.topic}
 
 For each idea, provide:
 1. A compelling, clickable title (under 60 characters)
@@ -803,62 +1194,236 @@ Make sure the titles are attention-grabbing and follow successful YouTube patter
 - "X Things You Didn't Know About..."
 - "This Changed My Life:"
 """
+    if exclude_titles:
+        prompt += "\nDo not repeat these existing ideas:\n" + "\n".join(f"- {title}" for title in exclude_titles)
+    return prompt
+
+def is_valid_idea(idea):
+    return isinstance(idea, dict) and isinstance(idea.get('title'), str) and idea['title'].strip() != ''
+
+def parse_ideas(response_text, endpoint):
+    """Every well-formed idea object in an LLM reply, even if the array around them is broken"""
+    ideas = []
+    for obj in extract_objects(response_text, endpoint):
+        if is_valid_idea(obj):
+            ideas.append(obj)
+        elif isinstance(obj.get('ideas'), list):
+            # Some replies wrap the array in an object
+            ideas.extend(idea for idea in obj['ideas'] if is_valid_idea(idea))
+    return ideas
+
+def default_content_ideas(topic):
+    """Fallback idea used when the LLM reply can't be parsed or the provider is unavailable"""
+    return [
+        {
+            "title": f"The Ultimate {topic} Guide for 2025",
+            "description": f"Everything you need to know about {topic} in the current year.",
+            "viral_potential": 75,
+            "difficulty": "Medium",
+            "estimated_views": "100K - 500K",
+            "tags": [topic, "guide", "2025", "tutorial"]
+        }
+    ]
+
+def video_idea_from_dict(idea, request, confidence=None):
+    """Build a VideoIdea from one parsed LLM idea, filling gaps with defaults"""
+    try:
+        viral_potential = int(idea.get('viral_potential', 70))
+    except (TypeError, ValueError):
+        viral_potential = 70
+    tags = idea.get('tags')
+    if not isinstance(tags, list):
+        tags = [request.topic]
+    return VideoIdea(
+        title=str(idea.get('title') or f'{request.topic} Content Idea'),
+        description=str(idea.get('description') or f'Great content about {request.topic}'),
+        category=request.category,
+        trend="AI Generated",
+        viral_potential=min(100, max(0, viral_potential)),
+        difficulty=str(idea.get('difficulty', 'Medium')),
+        estimated_views=str(idea.get('estimated_views', '50K - 200K')),
+        tags=[str(tag) for tag in tags[:5]],  # Limit to 5 tags
+        ai_generated=True,
+        confidence=confidence
+    )
+
+@api_router.post("/content/generate-ideas", response_model=List[VideoIdea])
+async def generate_content_ideas(request: ContentGenerationRequest, user_id: str = Depends(tenant)):
+    """Generate AI-powered content ideas based on trending topics"""
+    cache_namespace = f"content_ideas:{request.category.strip().lower()}"
+    if not request.bypass_cache:
+        cached = await recall_answer(
+            cache_namespace, request.topic, accept=lambda ideas: len(ideas) >= request.count
+        )
+        record_cache('semantic_content_ideas', cached is not None)
+        if cached:
+            ideas, confidence, _ = cached
+            return [video_idea_from_dict(idea, request, confidence) for idea in ideas[:request.count]]
 
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
+    if llm_gateway.breaker.is_open():
+        # Provider is failing; serve the default idea straight away instead of queueing
+        return [video_idea_from_dict(idea, request) for idea in default_content_ideas(request.topic)]
+
+    try:
+        # Initialize AI chat
+        chat = LlmChat(
+            api_key=EMERGENT_LLM_KEY,
+            session_id=f"content_gen_{uuid.uuid4()}",
+            system_message="You are an expert YouTube content strategist. Generate viral video ideas based on trending topics and user requests. Focus on engaging, clickable titles and valuable content descriptions."
+        ).with_model("openai", "gpt-4o-mini")
         
-        # Parse AI response
-        try:
-            # Extract JSON from the response
-            response_text = str(response)
-            start_idx = response_text.find('[')
-            end_idx = response_text.rfind(']') + 1
-            
-            if start_idx != -1 and end_idx != 0:
-                json_str = response_text[start_idx:end_idx]
-                ai_ideas = json.loads(json_str)
-            else:
-                # Fallback: create structured response
-                ai_ideas = []
-                
-        except json.JSONDecodeError:
-            # Fallback: create some default ideas if JSON parsing fails
-            ai_ideas = [
-                {
-                    "title": f"The Ultimate {request.topic} Guide for 2025",
-                    "description": f"Everything you need to know about {request.topic} in the current year.",
-                    "viral_potential": 75,
-                    "difficulty": "Medium",
-                    "estimated_views": "100K - 500K",
-                    "tags": [request.topic, "guide", "2025", "tutorial"]
-                }
-            ]
+        ai_ideas = []
+        for attempt in range(1 + IDEA_RETRY_ATTEMPTS):
+            missing = request.count - len(ai_ideas)
+            if missing <= 0:
+                break
+            # Retries only ask for the ideas the previous reply failed to deliver
+            prompt = content_ideas_prompt(request, missing, [idea['title'] for idea in ai_ideas])
+            try:
+                response = await llm_send(chat, UserMessage(text=prompt), "content_ideas")
+            except CircuitOpen:
+                if ai_ideas:
+                    break
+                return [video_idea_from_dict(idea, request) for idea in default_content_ideas(request.topic)]
+            except LLMUnavailable:
+                if ai_ideas:
+                    break
+                raise
+            ai_ideas.extend(parse_ideas(str(response), "content_ideas")[:missing])
+
+        if ai_ideas:
+            await remember_answer(cache_namespace, request.topic, ai_ideas)
+        else:
+            # Fallback: create some default ideas if nothing in the reply could be parsed
+            ai_ideas = default_content_ideas(request.topic)
         
         # Convert to VideoIdea objects
-        video_ideas = []
-        for idea in ai_ideas[:request.count]:
-            video_idea = VideoIdea(
-                title=idea.get('title', f'{request.topic} Content Idea'),
-                description=idea.get('description', f'Great content about {request.topic}'),
-                category=request.category,
-                trend="AI Generated",
-                viral_potential=min(100, max(0, int(idea.get('viral_potential', 70)))),
-                difficulty=idea.get('difficulty', 'Medium'),
-                estimated_views=idea.get('estimated_views', '50K - 200K'),
-                tags=idea.get('tags', [request.topic])[:5],  # Limit to 5 tags
-                ai_generated=True
-            )
-            video_ideas.append(video_idea)
+        video_ideas = [video_idea_from_dict(idea, request) for idea in ai_ideas[:request.count]]
         
         # Store in database
         for idea in video_ideas:
-            await db.video_ideas.insert_one(idea.dict())
+            await db.video_ideas.insert_one(dict(idea.dict(), user_id=user_id))
         
         return video_ideas
         
+    except LLMUnavailable as e:
+        raise llm_unavailable_error(e)
+    except Exception as e:
+        logger.exception("Error generating content ideas: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to generate content ideas: {str(e)}")
+
+# Rough output size of one idea in the JSON reply, plus per-topic wrapper overhead
+IDEA_OUTPUT_TOKENS = 120
+IDEA_TOPIC_OVERHEAD_TOKENS = 20
+
+def chunk_idea_requests(pairs):
+    """Split (index, request) pairs into LLM-sized chunks, preserving order"""
+    chunks, current, budget = [], [], 0
+    for index, item in pairs:
+        cost = item.count * IDEA_OUTPUT_TOKENS + IDEA_TOPIC_OVERHEAD_TOKENS
+        if current and (budget + cost > IDEA_BATCH_TOKEN_BUDGET or len(current) >= IDEA_BATCH_MAX_TOPICS):
+            chunks.append(current)
+            current, budget = [], 0
+        current.append((index, item))
+        budget += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def batch_ideas_prompt(chunk):
+    topic_lines = "\n".join(
+        f'[{index}] topic: "{item.topic}" | category: {item.category} | ideas: {item.count}'
+        for index, item in chunk
+    )
+    return f"""
+Generate unique YouTube video ideas for each of the topics below. Each line gives the topic index, topic, category and how many ideas it needs.
+
+{topic_lines}
+
+For each idea, provide:
+1. A compelling, clickable title (under 60 characters)
+2. A brief description (2-3 sentences)
+3. Estimated viral potential (0-100)
+4. Difficulty level (Easy/Medium/Hard)
+5. Estimated view range
+6. 3-5 relevant tags
+
+Format your response as a single JSON array with one object per topic: {{"topic_index": <index>, "ideas": [...]}}, where each idea has: title, description, viral_potential, difficulty, estimated_views, tags
+"""
+
+def parse_batch_ideas(response_text, chunk):
+    """Map topic index -> list of idea dicts for every topic the reply covered"""
+    wanted = {index for index, _ in chunk}
+    parsed = {}
+    for entry in extract_objects(response_text, "content_ideas_batch"):
+        try:
+            index = int(entry.get('topic_index'))
+        except (TypeError, ValueError):
+            continue
+        if index in wanted and isinstance(entry.get('ideas'), list):
+            parsed.setdefault(index, []).extend(idea for idea in entry['ideas'] if is_valid_idea(idea))
+    return parsed
+
+async def generate_idea_chunk(chunk, limiter):
+    """One LLM call for a chunk of topics; returns index -> idea dicts (empty on failure)"""
+    async with limiter:
+        chat = LlmChat(
+            api_key=EMERGENT_LLM_KEY,
+            session_id=f"content_batch_{uuid.uuid4()}",
+            system_message="You are an expert YouTube content strategist. Generate viral video ideas based on trending topics and user requests. Focus on engaging, clickable titles and valuable content descriptions."
+        ).with_model("openai", "gpt-4o-mini")
+        try:
+            response = await llm_send(chat, UserMessage(text=batch_ideas_prompt(chunk)), "content_ideas_batch")
+        except LLMUnavailable as e:
+            logger.warning("LLM unavailable for idea batch of %d topics: %s", len(chunk), e)
+            return {}
+        except Exception as e:
+            logger.error("Error generating idea batch of %d topics: %s", len(chunk), e)
+            return {}
+        return parse_batch_ideas(str(response), chunk)
+
+@api_router.post("/content/generate-ideas/batch", response_model=BatchContentGenerationResponse)
+async def generate_content_ideas_batch(request: BatchContentGenerationRequest, user_id: str = Depends(tenant)):
+    """Generate ideas for many topics, packing several topics into each LLM call"""
+    try:
+        items = request.items
+        limiter = asyncio.Semaphore(IDEA_BATCH_CONCURRENCY)
+        parsed = {index: [] for index in range(len(items))}
+        llm_calls = 0
+        for attempt in range(1 + IDEA_RETRY_ATTEMPTS):
+            if llm_gateway.breaker.is_open():
+                break
+            # The first pass asks for everything; retries only for topics that came back short
+            pending = [
+                (index, item.copy(update={"count": item.count - len(parsed[index])}))
+                for index, item in enumerate(items) if len(parsed[index]) < item.count
+            ]
+            chunks = chunk_idea_requests(pending)
+            if not chunks:
+                break
+            llm_calls += len(chunks)
+            for chunk_ideas in await asyncio.gather(*(generate_idea_chunk(chunk, limiter) for chunk in chunks)):
+                for index, ideas in chunk_ideas.items():
+                    parsed[index].extend(ideas[:items[index].count - len(parsed[index])])
+
+        results = []
+        for index, item in enumerate(items):
+            ai_ideas = parsed.get(index) or []
+            results.append(BatchIdeasResult(
+                topic=item.topic,
+                category=item.category,
+                ideas=[video_idea_from_dict(idea, item) for idea in (ai_ideas or default_content_ideas(item.topic))[:item.count]],
+                fallback=not ai_ideas,
+            ))
+
+        generated = [dict(idea.dict(), user_id=user_id) for result in results if not result.fallback for idea in result.ideas]
+        if generated:
+            await db.video_ideas.insert_many(generated)
+
+        return BatchContentGenerationResponse(results=results, llmCalls=llm_calls)
+
     except Exception as e:
-        logger.error(f"Error generating content ideas: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error generating content idea batch: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate content ideas: {str(e)}")
 
 # Pydantic models for script generation
@@ -883,62 +1448,81 @@ class GeneratedScript(BaseModel):
 
 class TrendingTopicsResponse(BaseModel):
     topics: List[str]
+    region: Optional[str] = None
+    category: Optional[str] = None
+    version: Optional[int] = None
+    generatedAt: Optional[datetime] = None
 
 class AutoResearchResponse(BaseModel):
     keywords: List[str]
     competitorCount: int
     optimalLength: str
     trendsAnalysis: str
+    confidence: Optional[float] = None
+    # Duration percentiles and sample sizes behind competitorCount/optimalLength
+    stats: Optional[dict] = None
+    dataSource: str = "youtube"
+
+class ScriptJob(BaseModel):
+    jobId: str
+    status: str
+    stage: str
+    deduplicated: bool = False
+    error: Optional[str] = None
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
 
 # AI Script Generator endpoints
-@api_router.post("/generate-script", response_model=GeneratedScript)
-async def generate_script(request: ScriptGenerationRequest):
-    """Generate AI-powered YouTube script based on user requirements"""
-    try:
-        # Initialize AI chat with specialized system message for script generation
-        system_message = f"""You are an expert YouTube script writer specializing in {request.style} content. 
-        Generate a complete, engaging YouTube script in {request.language} with a {request.tone} tone.
-        
-        Key requirements:
-        - Duration: {request.duration}
-        - Style: {request.style}
-        - Target audience: {request.targetAudience}
-        - Language: {request.language}
-        - Include hook: {request.includeHook}
-        - Include CTA: {request.includeCTA}
-        - Include timestamps: {request.includeTimestamps}
-        
-        Script styles guide:
-        - faceless-documentary: Professional narration with facts and insights
-        - faceless-listicle: Numbered list format with countdown style
-        - podcast-style: Conversational tone with natural flow
-        - shorts-punchline: Quick hook, main point, strong ending (max 60 seconds)
-        - educational-breakdown: Step-by-step tutorial format
-        - story-driven: Narrative structure with beginning, middle, end
-        
-        Duration guidelines:
-        - shorts: 60 seconds maximum, very punchy
-        - 5min: Concise, focused content
-        - 10min: Standard YouTube video length
-        - 15min+: Comprehensive coverage with multiple sections
-        - podcast: Long-form conversational content
-        
-        Always provide:
-        1. A compelling hook (first 15 seconds)
-        2. Clear structure with smooth transitions
-        3. Engaging content throughout
-        4. Strong call-to-action
-        5. Proper pacing for the duration
-        """
-        
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"script_gen_{uuid.uuid4()}",
-            system_message=system_message
-        ).with_model("openai", "gpt-4o-mini")
-        
-        # Build the generation prompt
-        prompt = f"""Generate a {request.duration} YouTube script about: {request.topic}
+async def build_script(request: ScriptGenerationRequest, progress=None, user_id=DEFAULT_USER_ID):
+    """Generate, parse and store a script; ``progress(stage)`` is awaited between steps"""
+    if progress:
+        await progress("generating")
+
+    # Initialize AI chat with specialized system message for script generation
+    system_message = f"""You are an expert YouTube script writer specializing in {request.style} content. 
+    Generate a complete, engaging YouTube script in {request.language} with a {request.tone} tone.
+    
+    Key requirements:
+    - Duration: {request.duration}
+    - Style: {request.style}
+    - Target audience: {request.targetAudience}
+    - Language: {request.language}
+    - Include hook: {request.includeHook}
+    - Include CTA: {request.includeCTA}
+    - Include timestamps: {request.includeTimestamps}
+    
+    Script styles guide:
+    - faceless-documentary: Professional narration with facts and insights
+    - faceless-listicle: Numbered list format with countdown style
+    - podcast-style: Conversational tone with natural flow
+    - shorts-punchline: Quick hook, main point, strong ending (max 60 seconds)
+    - educational-breakdown: Step-by-step tutorial format
+    - story-driven: Narrative structure with beginning, middle, end
+    
+    Duration guidelines:
+    - shorts: 60 seconds maximum, very punchy
+    - 5min: Concise, focused content
+    - 10min: Standard YouTube video length
+    - 15min+: Comprehensive coverage with multiple sections
+    - podcast: Long-form conversational content
+    
+    Always provide:
+    1. A compelling hook (first 15 seconds)
+    2. Clear structure with smooth transitions
+    3. Engaging content throughout
+    4. Strong call-to-action
+    5. Proper pacing for the duration
+    """
+    
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"script_gen_{uuid.uuid4()}",
+        system_message=system_message
+    ).with_model("openai", "gpt-4o-mini")
+    
+    # Build the generation prompt
+    prompt = f"""Generate a {request.duration} YouTube script about: {request.topic}
 
 Style: {request.style}
 Tone: {request.tone}
@@ -946,19 +1530,19 @@ Language: {request.language}
 Target Audience: {request.targetAudience}
 
 """
-        
-        # Add research data if available
-        if request.researchData:
-            prompt += f"Research insights to incorporate:\n"
-            if 'keywords' in request.researchData:
-                prompt += f"- Trending keywords: {', '.join(request.researchData['keywords'])}\n"
-            if 'competitorCount' in request.researchData:
-                prompt += f"- {request.researchData['competitorCount']} similar videos found in competitor analysis\n"
-            if 'optimalLength' in request.researchData:
-                prompt += f"- Optimal length based on research: {request.researchData['optimalLength']}\n"
-            prompt += "\n"
-        
-        prompt += """Please provide the script in this exact format:
+    
+    # Add research data if available
+    if request.researchData:
+        prompt += f"Research insights to incorporate:\n"
+        if 'keywords' in request.researchData:
+            prompt += f"- Trending keywords: {', '.join(request.researchData['keywords'])}\n"
+        if 'competitorCount' in request.researchData:
+            prompt += f"- {request.researchData['competitorCount']} similar videos found in competitor analysis\n"
+        if 'optimalLength' in request.researchData:
+            prompt += f"- Optimal length based on research: {request.researchData['optimalLength']}\n"
+        prompt += "\n"
+    
+    prompt += """Please provide the script in this exact format:
 
 TITLE: [Compelling video title]
 
@@ -966,81 +1550,248 @@ HOOK: [First 15 seconds - grab attention immediately]
 
 SCRIPT:
 [Full script with clear sections]"""
-        
-        if request.includeTimestamps:
-            prompt += "\n[Include timestamps like [0:00], [1:30], etc.]"
-        
-        if request.includeCTA:
-            prompt += "\n[Include natural call-to-actions throughout]"
-        
-        # Generate the script
-        response = await chat.send_message(UserMessage(prompt))
-        script_content = str(response)
-        
-        # Parse the response to extract title, hook, and script
-        lines = script_content.split('\n')
-        title = "Generated Script"
-        hook = ""
-        script = script_content
-        
-        for i, line in enumerate(lines):
-            if line.startswith('TITLE:'):
-                title = line.replace('TITLE:', '').strip()
-            elif line.startswith('HOOK:'):
-                hook = line.replace('HOOK:', '').strip()
-            elif line.startswith('SCRIPT:'):
-                script = '\n'.join(lines[i+1:]).strip()
-                break
-        
-        # Create metadata
-        metadata = {
-            "wordCount": len(script.split()),
-            "estimatedDuration": request.duration,
-            "style": request.style,
-            "tone": request.tone,
-            "language": request.language,
-            "generatedAt": datetime.utcnow().isoformat(),
-            "targetAudience": request.targetAudience
-        }
-        
-        # Store the generated script in the database
-        script_doc = {
-            "script_id": str(uuid.uuid4()),
-            "title": title,
-            "hook": hook,
-            "script": script,
-            "topic": request.topic,
-            "metadata": metadata,
-            "generated_at": datetime.utcnow(),
-            "user_id": "default_user"  # In a real app, this would come from authentication
-        }
-        
-        await db.generated_scripts.insert_one(script_doc)
-        
-        return GeneratedScript(
-            script=script,
-            title=title,
-            hook=hook,
-            metadata=metadata
-        )
-        
+    
+    if request.includeTimestamps:
+        prompt += "\n[Include timestamps like [0:00], [1:30], etc.]"
+    
+    if request.includeCTA:
+        prompt += "\n[Include natural call-to-actions throughout]"
+    
+    # Generate the script
+    response = await llm_send(chat, UserMessage(prompt), "generate_script")
+    script_content = str(response)
+    
+    # Parse the response to extract title, hook, and script
+    lines = script_content.split('\n')
+    title = "Generated Script"
+    hook = ""
+    script = script_content
+    
+    for i, line in enumerate(lines):
+        if line.startswith('TITLE:'):
+            title = line.replace('TITLE:', '').strip()
+        elif line.startswith('HOOK:'):
+            hook = line.replace('HOOK:', '').strip()
+        elif line.startswith('SCRIPT:'):
+            script = '\n'.join(lines[i+1:]).strip()
+            break
+    
+    # Create metadata
+    metadata = {
+        "wordCount": len(script.split()),
+        "estimatedDuration": request.duration,
+        "style": request.style,
+        "tone": request.tone,
+        "language": request.language,
+        "generatedAt": datetime.utcnow().isoformat(),
+        "targetAudience": request.targetAudience
+    }
+    
+    # Store the generated script in the database
+    script_doc = {
+        "script_id": str(uuid.uuid4()),
+        "title": title,
+        "hook": hook,
+        "script": script,
+        "topic": request.topic,
+        "metadata": metadata,
+        "generated_at": datetime.utcnow(),
+        "user_id": user_id
+    }
+    
+    if progress:
+        await progress("saving")
+    await db.generated_scripts.insert_one(script_doc)
+    
+    return GeneratedScript(
+        script=script,
+        title=title,
+        hook=hook,
+        metadata=metadata
+    )
+
+@api_router.post("/generate-script", response_model=GeneratedScript)
+async def generate_script(request: ScriptGenerationRequest, user_id: str = Depends(tenant)):
+    """Generate AI-powered YouTube script based on user requirements"""
+    try:
+        return await build_script(request, user_id=user_id)
+    except LLMUnavailable as e:
+        raise llm_unavailable_error(e)
     except Exception as e:
-        logger.error(f"Error generating script: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error generating script: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate script: {str(e)}")
 
-@api_router.get("/trending-topics", response_model=TrendingTopicsResponse)
-async def get_trending_topics():
-    """Get current trending topics for script inspiration"""
+async def run_script_job(payload, progress):
+    """Job handler: generate the script described by a stored request"""
+    script = await build_script(ScriptGenerationRequest(**payload), progress, payload.get('user_id', DEFAULT_USER_ID))
+    return script.dict()
+
+script_jobs = JobQueue(
+    "generate_script", run_script_job, lambda: db.script_jobs,
+    workers=SCRIPT_JOB_WORKERS, max_pending=SCRIPT_JOB_MAX_PENDING,
+    # Load shedding and an open breaker pass; the job is retried rather than failed
+    retry_on=(LLMUnavailable,),
+)
+
+def script_job_response(job, deduplicated=False):
+    return ScriptJob(
+        jobId=job['job_id'],
+        status=job['status'],
+        stage=job.get('stage', job['status']),
+        deduplicated=deduplicated,
+        error=job.get('error'),
+        createdAt=job['created_at'],
+        startedAt=job.get('started_at'),
+        finishedAt=job.get('finished_at'),
+    )
+
+async def get_tenant_script_job(job_id, user_id):
+    """The job if it belongs to ``user_id``, else None"""
+    job = await script_jobs.get(job_id)
+    if job and job['request'].get('user_id', DEFAULT_USER_ID) == user_id:
+        return job
+    return None
+
+@api_router.post("/generate-script/jobs", response_model=ScriptJob, status_code=202)
+async def submit_script_job(request: ScriptGenerationRequest, user_id: str = Depends(tenant)):
+    """Queue script generation in the background and return a job to poll"""
     try:
-        # Initialize AI for trend analysis
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"trends_{uuid.uuid4()}",
-            system_message="You are a YouTube trends analyst. Provide current trending topics that are perfect for YouTube content creation."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        prompt = """List 12 current trending topics that would make great YouTube videos. 
+        # The tenant is part of the payload, so identical requests only deduplicate within a tenant
+        job, deduplicated = await script_jobs.submit(dict(request.dict(), user_id=user_id))
+        return script_job_response(job, deduplicated)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        logger.exception("Error submitting script job: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to submit script job: {str(e)}")
+
+@api_router.get("/generate-script/jobs/{job_id}", response_model=ScriptJob)
+async def get_script_job(job_id: str, user_id: str = Depends(tenant)):
+    """Current status and stage of a script generation job"""
+    job = await get_tenant_script_job(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return script_job_response(job)
+
+@api_router.get("/generate-script/jobs/{job_id}/result", response_model=GeneratedScript)
+async def get_script_job_result(job_id: str, user_id: str = Depends(tenant)):
+    """The generated script once the job has succeeded"""
+    job = await get_tenant_script_job(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Failed to generate script: {job.get('error')}")
+    if job['status'] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    return GeneratedScript(**job['result'])
+
+
+# Served until a trending topics snapshot has been generated
+FALLBACK_TRENDING_TOPICS = [
+    "AI and Machine Learning Explained",
+    "Cryptocurrency Investment Tips",
+    "Climate Change Solutions",
+    "Space Exploration Updates",
+    "Health and Wellness Trends",
+    "Tech Product Reviews",
+    "Personal Finance Strategies",
+    "Productivity Life Hacks",
+    "Social Media Marketing",
+    "Remote Work Tips",
+    "Sustainable Living Guide",
+    "Mental Health Awareness"
+]
+
+# Latest snapshot per (region, category), kept current by the trending topics jobs
+trending_topic_snapshots = {}
+DEFAULT_TOPIC_VARIANT = ("US", "all")
+
+YOUTUBE_CATEGORY_NAMES = {
+    '1': 'Film & Animation', '2': 'Autos & Vehicles', '10': 'Music', '15': 'Pets & Animals',
+    '17': 'Sports', '19': 'Travel & Events', '20': 'Gaming', '22': 'People & Blogs',
+    '23': 'Comedy', '24': 'Entertainment', '25': 'News & Politics', '26': 'Howto & Style',
+    '27': 'Education', '28': 'Science & Technology',
+}
+
+def parse_topic_variants(spec):
+    """Parse "US:all,GB:28" into (region, category) pairs"""
+    variants = set()
+    for part in spec.split(','):
+        region, _, category = part.strip().partition(':')
+        if region:
+            variants.add((region.upper(), category or "all"))
+    return variants
+
+configured_topic_variants = parse_topic_variants(TRENDING_TOPICS_VARIANTS) or {DEFAULT_TOPIC_VARIANT}
+# variant -> when this worker last recorded a request for it
+topic_variants_touched = {}
+
+def validate_category(category):
+    """Normalized category ID ("all" or a YouTube category), or a 400 for unknown IDs"""
+    category = category.strip().lower()
+    if category != "all" and category not in YOUTUBE_CATEGORY_NAMES:
+        raise HTTPException(status_code=400, detail=f"Invalid category: {category}")
+    return category
+
+def validate_topic_variant(region, category):
+    """(region, category) of a trending topics request, or a 400 for codes YouTube doesn't have"""
+    region = region.strip().upper()
+    if len(region) != 2 or not region.isalpha():
+        raise HTTPException(status_code=400, detail=f"Invalid region code: {region}")
+    return region, validate_category(category)
+
+def parse_topic_lines(text, limit=12):
+    """Topic names from a one-per-line LLM reply, without numbering, bullets or duplicates"""
+    topics, seen = [], set()
+    for line in text.split('\n'):
+        topic = line.strip().lstrip('-*•0123456789.) ').strip().strip('"').strip()
+        if topic and topic.lower() not in seen:
+            seen.add(topic.lower())
+            topics.append(topic)
+    return topics[:limit]
+
+async def known_topic_variants():
+    """Configured variants plus the most recently requested ones, from any worker"""
+    variants = set(configured_topic_variants)
+    docs = await analytics_db.trending_topic_variants.find(
+        {}, {"_id": 0, "region": 1, "category": 1}
+    ).sort("requested_at", -1).to_list(TRENDING_TOPICS_MAX_VARIANTS)
+    for doc in docs:
+        try:
+            variants.add(validate_topic_variant(doc["region"], doc["category"]))
+        except HTTPException:
+            # Recorded before requests were validated; expires with the TTL index
+            continue
+    return variants
+
+async def reload_trending_topics():
+    """Load the latest stored snapshot of every variant into memory"""
+    for region, category in await known_topic_variants():
+        snapshot = await db.trending_topic_snapshots.find_one(
+            {"region": region, "category": category}, {"_id": 0}, sort=[("version", -1)]
+        )
+        if snapshot:
+            trending_topic_snapshots[(region, category)] = snapshot
+
+async def generate_trending_topics(region, category):
+    """Ask the LLM for 12 topics, seeded with titles from the cached mostPopular chart"""
+    seed_titles = []
+    if TRENDING_TOPICS_USE_YOUTUBE:
+        try:
+            seed_titles = [item['snippet']['title'] for item in (await fetch_most_popular(region, category))[:15]]
+        except Exception as e:
+            logger.warning("Could not load mostPopular for %s/%s topic seeding: %s", region, category, e)
+
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"trends_{uuid.uuid4()}",
+        system_message="You are a YouTube trends analyst. Provide current trending topics that are perfect for YouTube content creation."
+    ).with_model("openai", "gpt-4o-mini")
+    
+    audience = f"viewers in region {region}"
+    if category != "all":
+        audience += f" interested in {YOUTUBE_CATEGORY_NAMES.get(category, category)}"
+    prompt = f"""List 12 current trending topics that would make great YouTube videos for {audience}. 
         Focus on topics that are:
         1. Currently popular and trending
         2. Have good search volume
@@ -1048,49 +1799,267 @@ async def get_trending_topics():
         4. Appeal to different demographics
         
         Provide just the topic names, one per line, without numbers or explanations."""
-        
-        response = await chat.send_message(UserMessage(prompt))
-        topics = [topic.strip() for topic in str(response).split('\n') if topic.strip()]
-        
-        return TrendingTopicsResponse(topics=topics[:12])  # Limit to 12 topics
-        
+    if seed_titles:
+        prompt += "\n\nFor reference, these videos are on the YouTube trending chart right now:\n" + "\n".join(f"- {title}" for title in seed_titles)
+    
+    response = await llm_send(chat, UserMessage(prompt), "trending_topics")
+    return parse_topic_lines(str(response)), bool(seed_titles)
+
+async def refresh_trending_topics():
+    """Regenerate stale variants and store them as new snapshot versions"""
+    await reload_trending_topics()
+    for region, category in sorted(await known_topic_variants()):
+        current = trending_topic_snapshots.get((region, category))
+        if current and (datetime.utcnow() - current["generated_at"]).total_seconds() < TRENDING_TOPICS_REFRESH_SECONDS * 0.9:
+            continue
+        try:
+            topics, seeded = await generate_trending_topics(region, category)
+        except Exception as e:
+            logger.warning("Failed to refresh trending topics for %s/%s: %s", region, category, e)
+            continue
+        if len(topics) < 6:
+            # Keep serving the previous snapshot rather than a thin or garbled list
+            logger.warning("Discarding trending topics for %s/%s: only %d parsed", region, category, len(topics))
+            continue
+        snapshot = {
+            "region": region,
+            "category": category,
+            "version": (current["version"] if current else 0) + 1,
+            "topics": topics,
+            "seeded_from_youtube": seeded,
+            "generated_at": datetime.utcnow(),
+        }
+        await db.trending_topic_snapshots.insert_one(dict(snapshot))
+        trending_topic_snapshots[(region, category)] = snapshot
+        logger.info("Stored trending topics %s/%s v%d", region, category, snapshot["version"])
+
+async def request_topic_variant(variant):
+    """Record a request for a variant so the refresh job generates it until requests stop"""
+    if variant in configured_topic_variants:
+        return
+    now = datetime.utcnow()
+    touched = topic_variants_touched.get(variant)
+    # The expiry is days long, so an hourly bump per worker keeps a variant alive
+    if touched and now - touched < timedelta(hours=1):
+        return
+    if len(topic_variants_touched) >= 10000:
+        topic_variants_touched.clear()
+    topic_variants_touched[variant] = now
+    region, category = variant
+    try:
+        await db.trending_topic_variants.update_one(
+            {"region": region, "category": category},
+            {"$set": {"requested_at": now}},
+            upsert=True,
+        )
     except Exception as e:
-        logger.error(f"Error fetching trending topics: {str(e)}")
-        # Return fallback topics if API fails
-        fallback_topics = [
-            "AI and Machine Learning Explained",
-            "Cryptocurrency Investment Tips",
-            "Climate Change Solutions",
-            "Space Exploration Updates",
-            "Health and Wellness Trends",
-            "Tech Product Reviews",
-            "Personal Finance Strategies",
-            "Productivity Life Hacks",
-            "Social Media Marketing",
-            "Remote Work Tips",
-            "Sustainable Living Guide",
-            "Mental Health Awareness"
-        ]
-        return TrendingTopicsResponse(topics=fallback_topics)
+        logger.warning("Failed to record trending topic variant %s/%s: %s", region, category, e)
 
-@api_router.post("/auto-research", response_model=AutoResearchResponse)
-async def auto_research(request: dict):
-    """Perform automated research for the given topic"""
+# Only one worker regenerates (under a Mongo lease); every worker reloads the latest snapshots
+trending_topics_refresh_job = PeriodicJob(
+    "trending_topics_refresh", TRENDING_TOPICS_CHECK_SECONDS, refresh_trending_topics,
+    get_lock_collection=lambda: db.job_locks,
+)
+trending_topics_reload_job = PeriodicJob(
+    "trending_topics_reload", TRENDING_TOPICS_RELOAD_SECONDS, reload_trending_topics,
+)
+
+async def tracked_video_ids(since):
+    """Ids of watched competitors' uploads and catalog videos published since ``since``, newest first"""
+    recent = {"published_at": {"$gte": since}}
+    uploads, catalog = await asyncio.gather(
+        db.competitor_uploads.find(recent, {"video_id": 1, "published_at": 1})
+            .sort("published_at", -1).to_list(VELOCITY_TRACKED_MAX),
+        db.channel_videos.find(recent, {"video_id": 1, "published_at": 1})
+            .sort("published_at", -1).to_list(VELOCITY_TRACKED_MAX),
+    )
+    videos = sorted(uploads + catalog, key=lambda doc: doc["published_at"], reverse=True)
+    return list(dict.fromkeys(doc["video_id"] for doc in videos))[:VELOCITY_TRACKED_MAX]
+
+async def observe_tracked_videos(observations):
+    """Add current view counts of tracked videos not already seen on a chart to ``observations``"""
+    since = datetime.utcnow() - timedelta(days=VELOCITY_TRACKED_DAYS)
+    ids = [video_id for video_id in await tracked_video_ids(since) if video_id not in observations]
+    for offset in range(0, len(ids), 50):
+        if not youtube_quota.can_spend(1, reserve=VELOCITY_QUOTA_RESERVE):
+            break
+        response = await youtube_execute(youtube.videos().list(
+            part="statistics",
+            id=','.join(ids[offset:offset + 50])
+        ))
+        for item in response.get('items', []):
+            observations[item['id']] = (int(item['statistics'].get('viewCount', 0)), {})
+
+async def take_trending_snapshots():
+    """Snapshot every known trending chart and the tracked videos, and update video velocities"""
+    ts = utcnow_minute()
+    observations = {}
+    for region, category in sorted(await known_topic_variants()):
+        # Fresh counts, which also refresh the chart cache for readers
+        most_popular_cache.invalidate((region, category, None))
+        try:
+            items = await fetch_most_popular(region, category)
+        except Exception as e:
+            logger.warning("Trending snapshot for %s/%s failed: %s", region, category, e)
+            continue
+        for rank, item in enumerate(items, start=1):
+            views = int(item['statistics'].get('viewCount', 0))
+            _, ranks = observations.setdefault(item['id'], (views, {}))
+            ranks[f"{region}:{category}"] = rank
     try:
-        topic = request.get('topic', '')
-        language = request.get('language', 'english')
-        
-        if not topic:
-            raise HTTPException(status_code=400, detail="Topic is required for auto-research")
-        
-        # Initialize AI for research analysis
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"research_{uuid.uuid4()}",
-            system_message=f"You are a YouTube research analyst. Analyze topics and provide insights for content creation in {language}."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        prompt = f"""Analyze the topic "{topic}" for YouTube content creation and provide:
+        await observe_tracked_videos(observations)
+    except Exception as e:
+        logger.warning("Tracked video snapshot failed: %s", e)
+    updated = await velocity_tracker.record(ts, observations)
+    logger.info("Trending snapshot: %d videos observed, %d updated", len(observations), updated)
+
+async def reload_video_velocity():
+    # States not refreshed for a few runs have dropped off the charts
+    return await velocity_tracker.reload(datetime.utcnow() - timedelta(seconds=TRENDING_SNAPSHOT_SECONDS * 3))
+
+trending_snapshot_job = PeriodicJob(
+    "trending_snapshots", TRENDING_SNAPSHOT_SECONDS, take_trending_snapshots,
+    get_lock_collection=lambda: db.job_locks,
+)
+velocity_reload_job = PeriodicJob("velocity_reload", VELOCITY_RELOAD_SECONDS, reload_video_velocity)
+
+@api_router.get("/youtube/videos/{video_id}/velocity")
+async def get_video_velocity(video_id: str, limit: int = Query(default=48, ge=1, le=500)):
+    """Current velocity state and snapshot history of a trending video"""
+    try:
+        current = velocity_tracker.get(video_id) or await db.video_velocity.find_one({"_id": video_id}, {"_id": 0})
+        history = await velocity_tracker.history(video_id, limit)
+        if not current and not history:
+            raise HTTPException(status_code=404, detail="Video has not been snapshotted")
+        return {"videoId": video_id, "current": current, "history": history}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching velocity for %s: %s", video_id, e)
+        raise HTTPException(status_code=500, detail="Failed to fetch video velocity")
+
+@api_router.get("/trending-topics", response_model=TrendingTopicsResponse)
+async def get_trending_topics(region: str = Query(default="US"), category: str = Query(default="all")):
+    """Get current trending topics for script inspiration, served from the latest precomputed snapshot"""
+    variant = validate_topic_variant(region, category)
+    category = variant[1]
+    await request_topic_variant(variant)
+    snapshot = trending_topic_snapshots.get(variant)
+    if snapshot is None:
+        # Until that variant is generated, serve the closest one available
+        snapshot = trending_topic_snapshots.get((variant[0], "all")) or trending_topic_snapshots.get(DEFAULT_TOPIC_VARIANT)
+    record_cache('trending_topics', snapshot is not None)
+    if snapshot is None:
+        return TrendingTopicsResponse(topics=FALLBACK_TRENDING_TOPICS, region=variant[0], category=category)
+    return TrendingTopicsResponse(
+        topics=snapshot["topics"],
+        region=snapshot["region"],
+        category=snapshot["category"],
+        version=snapshot["version"],
+        generatedAt=snapshot["generated_at"],
+    )
+
+# Auto-research: competition and length come from YouTube search results,
+# the LLM only supplies keywords and a trends summary
+research_search_cache = TTLCache('youtube_research_search', RESEARCH_CACHE_HOURS * 3600, max_entries=1000)
+research_memo = TTLCache('auto_research', RESEARCH_CACHE_HOURS * 3600, max_entries=1000)
+
+RESEARCH_SEARCH_COST = YOUTUBE_QUOTA_COSTS['search.list'] + YOUTUBE_QUOTA_COSTS['videos.list']
+SHORTS_MAX_SECONDS = 60
+
+def research_key(topic):
+    return ' '.join(topic.lower().split())
+
+async def fetch_topic_search_stats(topic):
+    """Total result count and per-video title, duration and views for a topic's top search results.
+
+    Returns None when the day's quota is down to RESEARCH_QUOTA_RESERVE.
+    """
+    async def load():
+        if not youtube_quota.can_spend(RESEARCH_SEARCH_COST, reserve=RESEARCH_QUOTA_RESERVE, tenant=current_tenant()):
+            logger.warning("Skipping research search for %r: %d quota units left", topic, youtube_quota.remaining)
+            return None
+        search_response = await youtube_execute(youtube.search().list(
+            part="id",
+            q=topic,
+            type="video",
+            order="relevance",
+            maxResults=RESEARCH_SEARCH_RESULTS
+        ))
+        video_ids = [
+            item['id']['videoId'] for item in search_response.get('items', [])
+            if item.get('id', {}).get('videoId')
+        ]
+        videos = []
+        if video_ids:
+            videos_response = await youtube_execute(youtube.videos().list(
+                part="snippet,contentDetails,statistics",
+                id=','.join(video_ids)
+            ))
+            by_id = {item['id']: item for item in videos_response.get('items', [])}
+            # Keep search relevance order
+            for video_id in video_ids:
+                item = by_id.get(video_id)
+                if item is None:
+                    continue
+                videos.append({
+                    'title': item['snippet']['title'],
+                    'duration': get_video_duration_seconds(item.get('contentDetails', {}).get('duration', '')),
+                    'views': int(item.get('statistics', {}).get('viewCount', 0)),
+                })
+        return {
+            'totalResults': int(search_response.get('pageInfo', {}).get('totalResults', 0)),
+            'videos': videos,
+        }
+
+    return await research_search_cache.get_or_load(research_key(topic), load)
+
+def quartiles(values):
+    """25th, 50th and 75th percentiles of a non-empty list"""
+    if len(values) == 1:
+        return values[0], values[0], values[0]
+    return tuple(quantiles(values, n=4, method='inclusive'))
+
+def research_stats(search):
+    """Competition and duration statistics over the top search results, or None without durations"""
+    videos = [video for video in search['videos'] if video['duration'] > 0]
+    if not videos:
+        return None
+    shorts = [video for video in videos if video['duration'] <= SHORTS_MAX_SECONDS]
+    long_form = [video for video in videos if video['duration'] > SHORTS_MAX_SECONDS]
+    # Shorts would drag the percentiles under a minute, so they only count when they dominate the topic
+    is_shorts = len(shorts) > len(long_form)
+    sample = shorts if is_shorts else long_form
+    p25, p50, p75 = quartiles([video['duration'] for video in sample])
+    return {
+        'sampleSize': len(videos),
+        'format': 'shorts' if is_shorts else 'long',
+        'shortsShare': round(len(shorts) / len(videos), 2),
+        'durationSeconds': {'p25': round(p25), 'p50': round(p50), 'p75': round(p75)},
+        'medianViews': round(median(video['views'] for video in sample)),
+    }
+
+def format_optimal_length(stats):
+    durations = stats['durationSeconds']
+    if stats['format'] == 'shorts':
+        return f"{durations['p25']}-{durations['p75']} seconds (Shorts)"
+    low = max(1, round(durations['p25'] / 60))
+    high = max(low, round(durations['p75'] / 60))
+    return f"{low} minutes" if low == high else f"{low}-{high} minutes"
+
+def title_keywords(titles, limit=8):
+    """Most frequent content words across result titles, for when the LLM is unavailable"""
+    counts = {}
+    for title in titles:
+        for word in set(re.findall(r"[a-z0-9][a-z0-9'+#-]*", title.lower())):
+            if len(word) > 2 and word not in STOP_WORDS:
+                counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=lambda word: (-counts[word], word))[:limit]
+
+def research_prompt(topic, search, stats):
+    if stats is None:
+        # No search data; fall back to asking the model for estimates
+        return f"""Analyze the topic "{topic}" for YouTube content creation and provide:
         
         1. 5-8 trending keywords related to this topic
         2. Estimated number of similar videos/competition level
@@ -1103,113 +2072,283 @@ async def auto_research(request: dict):
         COMPETITION: 1500
         OPTIMAL_LENGTH: 10-12 minutes
         TRENDS: Brief analysis of current trends for this topic"""
-        
-        response = await chat.send_message(UserMessage(prompt))
-        content = str(response)
-        
-        # Parse the response
-        keywords = []
-        competitor_count = 0
-        optimal_length = "10-12 minutes"
-        trends_analysis = ""
-        
-        lines = content.split('\n')
-        for line in lines:
-            if line.startswith('KEYWORDS:'):
-                keywords = [k.strip() for k in line.replace('KEYWORDS:', '').split(',')]
-            elif line.startswith('COMPETITION:'):
-                try:
-                    competitor_count = int(line.replace('COMPETITION:', '').strip())
-                except:
-                    competitor_count = 1000
-            elif line.startswith('OPTIMAL_LENGTH:'):
-                optimal_length = line.replace('OPTIMAL_LENGTH:', '').strip()
-            elif line.startswith('TRENDS:'):
-                trends_analysis = line.replace('TRENDS:', '').strip()
-        
-        return AutoResearchResponse(
-            keywords=keywords,
-            competitorCount=competitor_count,
-            optimalLength=optimal_length,
-            trendsAnalysis=trends_analysis
-        )
-        
+
+    titles = '\n'.join(f"- {video['title']}" for video in search['videos'][:15])
+    return f"""Analyze the topic "{topic}" for YouTube content creation.
+
+        These are the current top YouTube results for it:
+{titles}
+
+        About {search['totalResults']} videos match this topic, and the typical top video runs {format_optimal_length(stats)}.
+
+        Provide:
+        1. 5-8 trending keywords related to this topic
+        2. Brief trends analysis based on these results
+
+        Format your response exactly like this:
+
+        KEYWORDS: keyword1, keyword2, keyword3, keyword4, keyword5
+        TRENDS: Brief analysis of current trends for this topic"""
+
+def parse_research_reply(content):
+    """KEYWORDS, COMPETITION, OPTIMAL_LENGTH and TRENDS lines of a research reply; absent lines are omitted"""
+    fields = {}
+    for line in content.split('\n'):
+        line = line.strip()
+        if line.startswith('KEYWORDS:'):
+            fields['keywords'] = [k.strip() for k in line.replace('KEYWORDS:', '').split(',') if k.strip()]
+        elif line.startswith('COMPETITION:'):
+            try:
+                fields['competitorCount'] = int(line.replace('COMPETITION:', '').strip().replace(',', ''))
+            except ValueError:
+                fields['competitorCount'] = 1000
+        elif line.startswith('OPTIMAL_LENGTH:'):
+            fields['optimalLength'] = line.replace('OPTIMAL_LENGTH:', '').strip()
+        elif line.startswith('TRENDS:'):
+            fields['trendsAnalysis'] = line.replace('TRENDS:', '').strip()
+    return fields
+
+async def run_research(topic, language):
+    """Research a topic from YouTube search statistics plus a single LLM call"""
+    search = None
+    try:
+        search = await fetch_topic_search_stats(topic)
     except Exception as e:
-        logger.error(f"Error in auto-research: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.warning("Research search failed for %r: %s", topic, e)
+    stats = research_stats(search) if search else None
+
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"research_{uuid.uuid4()}",
+        system_message=f"You are a YouTube research analyst. Analyze topics and provide insights for content creation in {language}."
+    ).with_model("openai", "gpt-4o-mini")
+
+    try:
+        response = await llm_send(chat, UserMessage(research_prompt(topic, search, stats)), "auto_research")
+        fields = parse_research_reply(str(response))
+        data_source = "youtube+llm" if stats else "llm"
+    except LLMUnavailable:
+        if stats is None:
+            raise
+        # The numbers stand on their own; derive keywords from the result titles
+        fields = {
+            'keywords': title_keywords(video['title'] for video in search['videos']),
+            'trendsAnalysis': (
+                f"Top results are mostly {'Shorts' if stats['format'] == 'shorts' else 'long-form videos'}, "
+                f"with a median of {stats['medianViews']:,} views."
+            ),
+        }
+        data_source = "youtube"
+
+    if stats:
+        fields['competitorCount'] = search['totalResults']
+        fields['optimalLength'] = format_optimal_length(stats)
+    return AutoResearchResponse(
+        keywords=fields.get('keywords', []),
+        competitorCount=fields.get('competitorCount', 0),
+        optimalLength=fields.get('optimalLength', "10-12 minutes"),
+        trendsAnalysis=fields.get('trendsAnalysis', ""),
+        stats=stats,
+        dataSource=data_source
+    )
+
+@api_router.post("/auto-research", response_model=AutoResearchResponse)
+async def auto_research(request: dict):
+    """Perform automated research for the given topic"""
+    try:
+        topic = request.get('topic', '')
+        language = request.get('language', 'english')
+        
+        if not topic:
+            raise HTTPException(status_code=400, detail="Topic is required for auto-research")
+        
+        language_key = language.strip().lower()
+        cache_namespace = f"auto_research:{language_key}"
+        memo_id = f"{language_key}:{research_key(topic)}"
+
+        async def research():
+            result = (await run_research(topic, language)).dict(exclude={"confidence"})
+            if result['dataSource'] == "llm":
+                # A fallback answer; kept briefly in memory only, so real data replaces it soon
+                return result
+            try:
+                await db.research_cache.update_one(
+                    {'_id': memo_id},
+                    {'$set': {'result': result, 'created_at': datetime.utcnow()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning("Failed to memoize research for %r: %s", topic, e)
+            await remember_answer(cache_namespace, topic, result)
+            return result
+
+        def memo_ttl(result):
+            # A similar topic's answer is served but never memoized as this topic's
+            if 'confidence' in result:
+                return 0
+            return RESEARCH_FALLBACK_CACHE_SECONDS if result['dataSource'] == "llm" else None
+
+        async def load():
+            # Exact topic from another worker or before a restart, then a similar topic, then the pipeline
+            memoized = await analytics_db.research_cache.find_one({
+                '_id': memo_id,
+                'created_at': {'$gte': datetime.utcnow() - timedelta(hours=RESEARCH_CACHE_HOURS)}
+            })
+            if memoized:
+                return memoized['result']
+            cached = await recall_answer(cache_namespace, topic)
+            record_cache('semantic_auto_research', cached is not None)
+            if cached:
+                result, confidence, _ = cached
+                return {**result, 'confidence': confidence}
+            return await research()
+
+        if request.get('bypassCache'):
+            result = await research()
+            research_memo.set(memo_id, result, memo_ttl(result))
+        else:
+            result = await research_memo.get_or_load(memo_id, load, ttl=memo_ttl)
+        return AutoResearchResponse(**result)
+        
+    except HTTPException:
+        raise
+    except LLMUnavailable as e:
+        raise llm_unavailable_error(e)
+    except Exception as e:
+        logger.exception("Error in auto-research: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to perform auto-research: {str(e)}")
 
 # Channel management endpoints
+# Connected channels per tenant, dropped on every worker whenever a tenant's channels change
+tenant_channels_cache = TTLCache('tenant_channels', CHANNEL_CACHE_SECONDS, max_entries=10000)
+cache_invalidator = CacheInvalidator(lambda: db.cache_events)
+cache_invalidator.register('tenant_channels', tenant_channels_cache)
+
+async def get_tenant_channels(user_id):
+    """The tenant's connected channel documents, through the channel cache"""
+    return await tenant_channels_cache.get_or_load(
+        user_id, lambda: db.connected_channels.find({"user_id": user_id}).to_list(100)
+    )
+
+async def get_primary_channel(user_id):
+    return next((channel for channel in await get_tenant_channels(user_id) if channel.get("is_primary")), None)
+
+async def insert_connected_channel(channel, user_id):
+    """Upsert keyed by tenant and channel_id; True if inserted, False if it was already connected"""
+    result = await db.connected_channels.update_one(
+        {"user_id": user_id, "channel_id": channel.channel_id},
+        {"$setOnInsert": dict(channel.dict(), user_id=user_id)},
+        upsert=True
+    )
+    return result.upserted_id is not None
+
+async def promote_fallback_primary(user_id):
+    """Make the tenant's earliest connected channel primary if none of its channels is"""
+    try:
+        await db.connected_channels.find_one_and_update(
+            {"user_id": user_id, "is_primary": {"$ne": True}},
+            {"$set": {"is_primary": True}},
+            sort=[("connected_at", 1)]
+        )
+    except DuplicateKeyError:
+        # Some channel is already primary
+        pass
+
+def uploads_playlist_id(channel_data):
+    """ID of the playlist holding a channels.list item's uploads, if contentDetails was requested"""
+    return channel_data.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+
+async def fetch_recent_upload_ids(playlist_id, count):
+    """IDs of a channel's latest uploads, newest first, from its uploads playlist (1 quota unit)"""
+    try:
+        response = await youtube_execute(youtube.playlistItems().list(
+            part="contentDetails",
+            playlistId=playlist_id,
+            maxResults=count
+        ))
+    except HttpError as e:
+        # Channels that never uploaded have no uploads playlist
+        if e.resp.status == 404:
+            return []
+        raise
+    return [item['contentDetails']['videoId'] for item in response.get('items', [])]
+
+async def resolve_channel_id(request: ChannelConnectionRequest):
+    """Channel ID from a channel ID, URL or handle; None if it can't be found"""
+    channel_id = None
+    
+    # Extract channel ID from different formats
+    input_value = None
+    
+    if request.channel_id:
+        channel_id = request.channel_id
+    elif request.channel_url:
+        input_value = request.channel_url.strip()
+    elif request.channel_handle:
+        input_value = request.channel_handle.strip()
+    
+    if input_value and not channel_id:
+        # Check if it's a direct channel ID (starts with UC and 24 characters)
+        if input_value.startswith('UC') and len(input_value) == 24:
+            channel_id = input_value
+        # Check if it's a URL with channel ID
+        elif '/channel/' in input_value:
+            channel_id = input_value.split('/channel/')[-1].split('?')[0].split('/')[0]
+        # Check if it's a handle (starts with @)
+        elif input_value.startswith('@'):
+            handle = input_value[1:]  # Remove @ symbol
+            search_request = youtube.search().list(
+                part="snippet",
+                q=handle,
+                type="channel",
+                maxResults=1
+            )
+            search_response = await youtube_execute(search_request)
+            if search_response.get('items'):
+                channel_id = search_response['items'][0]['snippet']['channelId']
+        # Check if it's a custom URL (/c/ or /user/)
+        elif '/c/' in input_value or '/user/' in input_value or '/@' in input_value:
+            # Extract custom name from URL
+            custom_name = input_value.split('/')[-1].replace('@', '')
+            search_request = youtube.search().list(
+                part="snippet",
+                q=custom_name,
+                type="channel",
+                maxResults=1
+            )
+            search_response = await youtube_execute(search_request)
+            if search_response.get('items'):
+                channel_id = search_response['items'][0]['snippet']['channelId']
+        # If it's just a plain name/handle without @, try searching
+        else:
+            search_request = youtube.search().list(
+                part="snippet",
+                q=input_value,
+                type="channel",
+                maxResults=1
+            )
+            search_response = await youtube_execute(search_request)
+            if search_response.get('items'):
+                channel_id = search_response['items'][0]['snippet']['channelId']
+    
+    return channel_id
+
 @api_router.post("/channels/connect", response_model=ConnectedChannel)
-async def connect_channel(request: ChannelConnectionRequest):
+async def connect_channel(request: ChannelConnectionRequest, user_id: str = Depends(tenant)):
     """Connect a YouTube channel to the dashboard"""
     try:
-        channel_id = None
-        
-        # Extract channel ID from different formats
-        input_value = None
-        
-        if request.channel_id:
-            channel_id = request.channel_id
-        elif request.channel_url:
-            input_value = request.channel_url.strip()
-        elif request.channel_handle:
-            input_value = request.channel_handle.strip()
-        
-        if input_value and not channel_id:
-            # Check if it's a direct channel ID (starts with UC and 24 characters)
-            if input_value.startswith('UC') and len(input_value) == 24:
-                channel_id = input_value
-            # Check if it's a URL with channel ID
-            elif '/channel/' in input_value:
-                channel_id = input_value.split('/channel/')[-1].split('?')[0].split('/')[0]
-            # Check if it's a handle (starts with @)
-            elif input_value.startswith('@'):
-                handle = input_value[1:]  # Remove @ symbol
-                search_request = youtube.search().list(
-                    part="snippet",
-                    q=handle,
-                    type="channel",
-                    maxResults=1
-                )
-                search_response = search_request.execute()
-                if search_response.get('items'):
-                    channel_id = search_response['items'][0]['snippet']['channelId']
-            # Check if it's a custom URL (/c/ or /user/)
-            elif '/c/' in input_value or '/user/' in input_value or '/@' in input_value:
-                # Extract custom name from URL
-                custom_name = input_value.split('/')[-1].replace('@', '')
-                search_request = youtube.search().list(
-                    part="snippet",
-                    q=custom_name,
-                    type="channel",
-                    maxResults=1
-                )
-                search_response = search_request.execute()
-                if search_response.get('items'):
-                    channel_id = search_response['items'][0]['snippet']['channelId']
-            # If it's just a plain name/handle without @, try searching
-            else:
-                search_request = youtube.search().list(
-                    part="snippet",
-                    q=input_value,
-                    type="channel",
-                    maxResults=1
-                )
-                search_response = search_request.execute()
-                if search_response.get('items'):
-                    channel_id = search_response['items'][0]['snippet']['channelId']
+        channel_id = await resolve_channel_id(request)
         
         if not channel_id:
             raise HTTPException(status_code=400, detail="Could not extract channel ID from provided information")
         
         # Get channel details
         channel_request = youtube.channels().list(
-            part="snippet,statistics",
+            part="snippet,statistics,contentDetails",
             id=channel_id
         )
         
-        channel_response = channel_request.execute()
+        channel_response = await youtube_execute(channel_request)
         
         if not channel_response.get('items'):
             raise HTTPException(status_code=404, detail="Channel not found")
@@ -1218,12 +2357,6 @@ async def connect_channel(request: ChannelConnectionRequest):
         snippet = channel_data['snippet']
         statistics = channel_data['statistics']
         
-        # Check if channel is already connected
-        existing_channel = await db.connected_channels.find_one({"channel_id": channel_id})
-        
-        if existing_channel:
-            raise HTTPException(status_code=400, detail="Channel is already connected")
-        
         # Create connected channel record
         connected_channel = ConnectedChannel(
             channel_id=channel_id,
@@ -1233,310 +2366,878 @@ async def connect_channel(request: ChannelConnectionRequest):
             subscriber_count=int(statistics.get('subscriberCount', 0)),
             view_count=int(statistics.get('viewCount', 0)),
             video_count=int(statistics.get('videoCount', 0)),
-            is_primary=True  # Set as primary if it's the first channel
+            is_primary=True,  # Primary if no other channel is; the unique index decides
+            uploads_playlist_id=uploads_playlist_id(channel_data)
         )
         
-        # Check if there are other channels - if not, this becomes primary
-        existing_channels = await db.connected_channels.find().to_list(10)
-        if existing_channels:
+        # Insert unless already connected, in one round trip
+        try:
+            inserted = await insert_connected_channel(connected_channel, user_id)
+        except DuplicateKeyError as e:
+            if "is_primary" not in (e.details or {}).get("keyPattern", {}):
+                raise HTTPException(status_code=400, detail="Channel is already connected")
+            # Another of the tenant's channels is primary already
             connected_channel.is_primary = False
+            inserted = await insert_connected_channel(connected_channel, user_id)
         
-        # Store in database
-        await db.connected_channels.insert_one(connected_channel.dict())
+        if not inserted:
+            raise HTTPException(status_code=400, detail="Channel is already connected")
         
+        await cache_invalidator.publish('tenant_channels', user_id)
         return connected_channel
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error connecting channel: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error connecting channel: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to connect channel: {str(e)}")
 
 @api_router.get("/channels", response_model=List[ConnectedChannel])
-async def get_connected_channels():
+async def get_connected_channels(user_id: str = Depends(tenant)):
     """Get all connected YouTube channels"""
     try:
-        channels = await db.connected_channels.find().to_list(100)
+        channels = await get_tenant_channels(user_id)
         return [ConnectedChannel(**channel) for channel in channels]
     except Exception as e:
-        logger.error(f"Error fetching connected channels: {str(e)}")
+        logger.error("Error fetching connected channels: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch connected channels")
 
 @api_router.put("/channels/{channel_id}/primary")
-async def set_primary_channel(channel_id: str):
+async def set_primary_channel(channel_id: str, user_id: str = Depends(tenant)):
     """Set a channel as the primary channel for dashboard"""
     try:
-        # Remove primary status from all channels
-        await db.connected_channels.update_many({}, {"$set": {"is_primary": False}})
-        
-        # Set the selected channel as primary
-        result = await db.connected_channels.update_one(
-            {"channel_id": channel_id},
-            {"$set": {"is_primary": True}}
-        )
-        
-        if result.matched_count == 0:
+        switch_id = str(uuid.uuid4())
+        for attempt in range(PRIMARY_SWITCH_ATTEMPTS):
+            # Demote the current primary and promote the new one in a single ordered batch;
+            # the unique index rejects the promotion if a concurrent switch got there first
+            try:
+                result = await db.connected_channels.bulk_write([
+                    UpdateOne(
+                        {"user_id": user_id, "is_primary": True, "channel_id": {"$ne": channel_id}},
+                        {"$set": {"is_primary": False, "primary_switch_id": switch_id}}
+                    ),
+                    UpdateOne({"user_id": user_id, "channel_id": channel_id}, {"$set": {"is_primary": True}}),
+                ], ordered=True)
+                break
+            except BulkWriteError as e:
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+                logger.info("Primary switch to %s raced another switch (attempt %d)", channel_id, attempt + 1)
+        else:
+            raise HTTPException(status_code=409, detail="Primary channel is being changed concurrently, please retry")
+        
+        # Both updates matched in the common case; with one match, either there was no other
+        # primary or the target doesn't exist and the old primary was demoted for nothing
+        if result.matched_count < 2 and not await db.connected_channels.find_one({"user_id": user_id, "channel_id": channel_id}, {"_id": 1}):
+            try:
+                await db.connected_channels.update_one(
+                    {"primary_switch_id": switch_id},
+                    {"$set": {"is_primary": True}, "$unset": {"primary_switch_id": ""}}
+                )
+            except DuplicateKeyError:
+                pass
             raise HTTPException(status_code=404, detail="Channel not found")
         
+        # The marker only matters for the restore above
+        await db.connected_channels.update_one(
+            {"user_id": user_id, "primary_switch_id": switch_id}, {"$unset": {"primary_switch_id": ""}}
+        )
+        await cache_invalidator.publish('tenant_channels', user_id)
         return {"message": "Primary channel updated successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error setting primary channel: {str(e)}")
+        logger.error("Error setting primary channel: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update primary channel")
 
 @api_router.delete("/channels/{channel_id}")
-async def disconnect_channel(channel_id: str):
+async def disconnect_channel(channel_id: str, user_id: str = Depends(tenant)):
     """Disconnect a YouTube channel"""
     try:
-        result = await db.connected_channels.delete_one({"channel_id": channel_id})
+        removed = await db.connected_channels.find_one_and_delete({"user_id": user_id, "channel_id": channel_id}, {"is_primary": 1})
         
-        if result.deleted_count == 0:
+        if removed is None:
             raise HTTPException(status_code=404, detail="Channel not found")
         
+        if removed.get("is_primary"):
+            # Keep the dashboard pointed at a remaining channel
+            await promote_fallback_primary(user_id)
+        
+        await cache_invalidator.publish('tenant_channels', user_id)
+        await cache_invalidator.publish('dashboard', (user_id, channel_id))
+        
         return {"message": "Channel disconnected successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error disconnecting channel: {str(e)}")
+        logger.error("Error disconnecting channel: %s", e)
         raise HTTPException(status_code=500, detail="Failed to disconnect channel")
 
-@api_router.get("/analytics/dashboard")
-async def get_dashboard_analytics():
-    """Get dashboard analytics data from connected YouTube channel"""
+class CompetitorUpload(BaseModel):
+    video_id: str
+    channel_id: str
+    channel_name: str
+    title: str
+    thumbnail: str
+    views: int
+    duration: str
+    viral_score: int
+    published_at: datetime
+    detected_at: datetime
+    velocity_score: Optional[int] = None
+    views_per_hour: Optional[float] = None
+
+class WatchedChannel(BaseModel):
+    channel_id: str
+    channel_name: str
+    thumbnail_url: str
+    subscriber_count: int
+    added_at: datetime
+    last_polled_at: Optional[datetime] = None
+    next_poll_at: Optional[datetime] = None
+    last_upload_at: Optional[datetime] = None
+
+def watched_channel_response(entry, channel):
+    """Tenant's watchlist entry joined with the shared polling state"""
+    channel = channel or {}
+    high_water = channel.get("high_water") or {}
+    return WatchedChannel(
+        channel_id=entry["channel_id"],
+        channel_name=entry["channel_name"],
+        thumbnail_url=entry["thumbnail_url"],
+        subscriber_count=entry.get("subscriber_count", 0),
+        added_at=entry["added_at"],
+        last_polled_at=channel.get("last_polled_at"),
+        next_poll_at=channel.get("next_poll_at"),
+        last_upload_at=high_water.get("published_at"),
+    )
+
+async def fetch_new_uploads(playlist_id, high_water):
+    """(video_id, published_at) of uploads past the high-water mark, paging only until it is reached"""
+    uploads, page_token = [], None
+    for _ in range(WATCHLIST_MAX_PAGES):
+        try:
+            response = await youtube_execute(youtube.playlistItems().list(
+                part="contentDetails",
+                playlistId=playlist_id,
+                maxResults=WATCHLIST_PAGE_SIZE,
+                pageToken=page_token
+            ))
+        except HttpError as e:
+            # Channels that never uploaded have no uploads playlist
+            if e.resp.status == 404:
+                break
+            raise
+        page_uploads, reached = select_new_uploads(response.get('items', []), high_water)
+        uploads.extend(page_uploads)
+        page_token = response.get('nextPageToken')
+        if reached or not page_token:
+            break
+    return uploads
+
+async def store_competitor_uploads(channel, uploads):
+    """Hydrate new uploads with videos.list (50 ids a unit) and upsert them into the feed"""
+    published = dict(uploads)
+    ids = list(published)
+    now = datetime.utcnow()
+    writes = []
+    for offset in range(0, len(ids), 50):
+        response = await youtube_execute(youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            id=','.join(ids[offset:offset + 50])
+        ))
+        for item in response.get('items', []):
+            video = build_trending_video(item)
+            writes.append(UpdateOne(
+                {"video_id": video.id},
+                {
+                    "$set": {
+                        "channel_id": channel["channel_id"],
+                        "channel_name": video.channel,
+                        "title": video.title,
+                        "thumbnail": video.thumbnail,
+                        "views": video.views,
+                        "duration": video.duration,
+                        "viral_score": video.viral_score,
+                        "published_at": published[video.id],
+                    },
+                    "$setOnInsert": {"detected_at": now},
+                },
+                upsert=True
+            ))
+    if writes:
+        await db.competitor_uploads.bulk_write(writes, ordered=False)
+    return len(writes)
+
+async def poll_watched_channel(channel):
+    """Fetch a watched channel's new uploads and schedule its next poll by upload frequency"""
+    now = datetime.utcnow()
     try:
-        # Get the primary connected channel
-        primary_channel = await db.connected_channels.find_one({"is_primary": True})
-        
-        if not primary_channel:
-            # Return empty state if no channels are connected
-            return {
-                "connected": False,
-                "message": "No YouTube channels connected. Please connect a channel to view analytics.",
-                "totalViews": 0,
-                "totalSubscribers": 0,
-                "avgViewDuration": "0:00",
-                "revenueThisMonth": 0,
-                "channelInfo": None,
-                "topPerformingVideo": None,
-                "monthlyGrowth": []
-            }
-        
-        channel_id = primary_channel['channel_id']
-        
-        # Fetch updated channel statistics
-        channel_request = youtube.channels().list(
-            part="snippet,statistics",
-            id=channel_id
+        playlist_id = channel.get("uploads_playlist_id")
+        if not playlist_id:
+            # Not known when the channel was added; look it up again (1 unit) until it exists
+            response = await youtube_execute(youtube.channels().list(part="contentDetails", id=channel["channel_id"]))
+            playlist_id = uploads_playlist_id(response['items'][0]) if response.get('items') else None
+            if playlist_id:
+                await db.watched_channels.update_one({"_id": channel["_id"]}, {"$set": {"uploads_playlist_id": playlist_id}})
+        uploads = await fetch_new_uploads(playlist_id, channel.get("high_water")) if playlist_id else []
+        stored = await store_competitor_uploads(channel, uploads)
+    except Exception as e:
+        error_count = channel.get("error_count", 0) + 1
+        logger.warning("Polling uploads of %s failed (%d in a row): %s", channel["channel_id"], error_count, e)
+        await db.watched_channels.update_one({"_id": channel["_id"]}, {
+            "$set": {"error_count": error_count, "last_error": str(e), "next_poll_at": now + error_backoff(error_count)},
+            "$inc": {"failed_polls": 1},
+        })
+        return 0
+    upload_times = merge_upload_times(channel.get("upload_times"), uploads)
+    await db.watched_channels.update_one({"_id": channel["_id"]}, {
+        "$set": {
+            "high_water": advance_high_water(channel.get("high_water"), uploads),
+            "upload_times": upload_times,
+            "last_polled_at": now,
+            "next_poll_at": now + poll_interval(upload_times),
+            "error_count": 0,
+            "last_error": None,
+        },
+        "$inc": {"polls": 1, "uploads_detected": stored},
+    })
+    return stored
+
+async def poll_due_competitors():
+    """Poll every watched channel whose next poll is due, within the quota reserve"""
+    channels = await db.watched_channels.find(
+        {"next_poll_at": {"$lte": datetime.utcnow()}}
+    ).sort("next_poll_at", 1).to_list(WATCHLIST_POLL_BATCH)
+    limiter = asyncio.Semaphore(WATCHLIST_POLL_CONCURRENCY)
+    
+    async def poll(channel):
+        async with limiter:
+            # At worst a channel lookup, every playlist page and a hydration call
+            if not youtube_quota.can_spend(WATCHLIST_MAX_PAGES + 2, reserve=WATCHLIST_QUOTA_RESERVE):
+                return 0
+            return await poll_watched_channel(channel)
+    
+    detected = sum(await asyncio.gather(*(poll(channel) for channel in channels)))
+    if channels:
+        logger.info("Competitor watchlist: polled %d channels, %d new uploads", len(channels), detected)
+
+competitor_watch_job = PeriodicJob(
+    "competitor_watchlist", WATCHLIST_CHECK_SECONDS, poll_due_competitors,
+    get_lock_collection=lambda: db.job_locks,
+)
+
+async def reserve_watchlist_slot(user_id):
+    """Take one of the tenant's WATCHLIST_MAX_CHANNELS slots; False when they are all used.
+
+    The count lives on a per-tenant counter document so checking the cap and
+    taking a slot is a single conditional update, which concurrent adds can't
+    both slip through. A tenant's first add seeds it from the watchlist itself.
+    """
+    if await db.watchlist_counts.find_one({"_id": user_id}) is None:
+        channels = await db.competitor_watchlist.count_documents({"user_id": user_id})
+        await db.watchlist_counts.update_one(
+            {"_id": user_id}, {"$setOnInsert": {"channels": channels}}, upsert=True
         )
+    result = await db.watchlist_counts.update_one(
+        {"_id": user_id, "channels": {"$lt": WATCHLIST_MAX_CHANNELS}}, {"$inc": {"channels": 1}}
+    )
+    return result.modified_count == 1
+
+async def release_watchlist_slot(user_id):
+    await db.watchlist_counts.update_one({"_id": user_id}, {"$inc": {"channels": -1}})
+
+@api_router.post("/competitors", response_model=WatchedChannel)
+async def watch_competitor(request: ChannelConnectionRequest, user_id: str = Depends(tenant)):
+    """Add a channel to the tenant's competitor watchlist"""
+    try:
+        channel_id = await resolve_channel_id(request)
+        if not channel_id:
+            raise HTTPException(status_code=400, detail="Could not extract channel ID from provided information")
         
-        channel_response = channel_request.execute()
+        if not await reserve_watchlist_slot(user_id):
+            raise HTTPException(status_code=400, detail=f"Watchlist is limited to {WATCHLIST_MAX_CHANNELS} channels")
         
-        if not channel_response.get('items'):
-            return {
-                "connected": False,
-                "message": "Connected channel not found. Please reconnect your channel.",
-                "error": "Channel not accessible"
+        added = False
+        try:
+            channel_response = await youtube_execute(youtube.channels().list(
+                part="snippet,statistics,contentDetails",
+                id=channel_id
+            ))
+            if not channel_response.get('items'):
+                raise HTTPException(status_code=404, detail="Channel not found")
+            channel_data = channel_response['items'][0]
+            snippet = channel_data['snippet']
+            
+            entry = {
+                "user_id": user_id,
+                "channel_id": channel_id,
+                "channel_name": snippet['title'],
+                "thumbnail_url": snippet['thumbnails']['medium']['url'],
+                "subscriber_count": int(channel_data['statistics'].get('subscriberCount', 0)),
+                "added_at": datetime.utcnow(),
             }
-        
-        channel_data = channel_response['items'][0]
-        snippet = channel_data['snippet']
-        statistics = channel_data['statistics']
-        
-        # Get channel's recent videos for analysis
-        videos_request = youtube.search().list(
-            part="snippet",
-            channelId=channel_id,
-            type="video",
-            order="date",
-            maxResults=10
+            result = await db.competitor_watchlist.update_one(
+                {"user_id": user_id, "channel_id": channel_id}, {"$setOnInsert": entry}, upsert=True
+            )
+            if result.upserted_id is None:
+                raise HTTPException(status_code=400, detail="Channel is already on the watchlist")
+            added = True
+        finally:
+            if not added:
+                await release_watchlist_slot(user_id)
+        
+        # Polling state is shared by every tenant watching the channel; the watcher
+        # count lets the last one to leave delete it without racing a new watcher
+        await db.watched_channels.update_one(
+            {"_id": channel_id},
+            {
+                "$setOnInsert": {
+                    "channel_id": channel_id,
+                    "uploads_playlist_id": uploads_playlist_id(channel_data),
+                    "next_poll_at": datetime.utcnow(),
+                },
+                "$inc": {"watchers": 1},
+            },
+            upsert=True
         )
+        channel = await db.watched_channels.find_one({"_id": channel_id})
+        if channel.get("high_water") is None:
+            # First watcher: baseline the feed now rather than on the next tick
+            await poll_watched_channel(channel)
+            channel = await db.watched_channels.find_one({"_id": channel_id})
         
-        videos_response = videos_request.execute()
-        video_ids = [item['id']['videoId'] for item in videos_response.get('items', [])]
+        return watched_channel_response(entry, channel)
         
-        top_performing_video = None
-        total_video_views = 0
-        
-        if video_ids:
-            # Get detailed video statistics
-            videos_detail_request = youtube.videos().list(
-                part="snippet,statistics,contentDetails",
-                id=','.join(video_ids[:5])  # Analyze top 5 recent videos
-            )
-            
-            videos_detail_response = videos_detail_request.execute()
-            
-            max_views = 0
-            for video in videos_detail_response.get('items', []):
-                video_views = int(video['statistics'].get('viewCount', 0))
-                total_video_views += video_views
-                
-                if video_views > max_views:
-                    max_views = video_views
-                    top_performing_video = {
-                        "title": video['snippet']['title'],
-                        "views": video_views,
-                        "thumbnail": video['snippet']['thumbnails']['medium']['url']
-                    }
-        
-        # Calculate realistic estimated revenue based on channel analysis
-        total_views = int(statistics.get('viewCount', 0))
-        total_subscribers = int(statistics.get('subscriberCount', 0))
-        video_count = int(statistics.get('videoCount', 0))
-        
-        # Estimate recent monthly views (simplified approach using video analysis)
-        # In reality, this would come from YouTube Analytics API
-        if video_count > 0:
-            avg_views_per_video = total_views / video_count
-            # Estimate monthly uploads and views based on channel size
-            if total_subscribers > 10000000:  # 10M+ subscribers
-                estimated_monthly_videos = min(15, max(4, video_count / 24))  # Large channels post more
-                estimated_monthly_views = avg_views_per_video * estimated_monthly_videos * 1.5  # Bigger channels get more views per video
-            elif total_subscribers > 1000000:  # 1M+ subscribers  
-                estimated_monthly_videos = min(10, max(3, video_count / 36))
-                estimated_monthly_views = avg_views_per_video * estimated_monthly_videos * 1.2
-            elif total_subscribers > 100000:  # 100K+ subscribers
-                estimated_monthly_videos = min(8, max(2, video_count / 48))
-                estimated_monthly_views = avg_views_per_video * estimated_monthly_videos
-            else:  # Smaller channels
-                estimated_monthly_videos = max(1, video_count / 60)
-                estimated_monthly_views = avg_views_per_video * estimated_monthly_videos * 0.8
-        else:
-            estimated_monthly_views = 0
-        
-        # Determine channel category/niche based on channel analysis
-        channel_category = analyze_channel_category(snippet.get('title', ''), snippet.get('description', ''), top_performing_video)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error adding competitor channel: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to add competitor channel")
+
+@api_router.get("/competitors", response_model=List[WatchedChannel])
+async def get_competitors(user_id: str = Depends(tenant)):
+    """The tenant's watched competitor channels"""
+    try:
+        entries = await db.competitor_watchlist.find({"user_id": user_id}).sort("added_at", 1).to_list(WATCHLIST_MAX_CHANNELS)
+        channels = await db.watched_channels.find(
+            {"_id": {"$in": [entry["channel_id"] for entry in entries]}}
+        ).to_list(len(entries) or 1)
+        by_id = {channel["_id"]: channel for channel in channels}
+        return [watched_channel_response(entry, by_id.get(entry["channel_id"])) for entry in entries]
+    except Exception as e:
+        logger.error("Error fetching competitor channels: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to fetch competitor channels")
+
+@api_router.delete("/competitors/{channel_id}")
+async def unwatch_competitor(channel_id: str, user_id: str = Depends(tenant)):
+    """Remove a channel from the tenant's competitor watchlist"""
+    try:
+        result = await db.competitor_watchlist.delete_one({"user_id": user_id, "channel_id": channel_id})
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Channel is not on the watchlist")
         
-        # Get RPM rate based on category
-        rpm_data = get_category_rpm(channel_category)
-        base_rpm = rpm_data['rpm']
-        category_name = rpm_data['category']
+        await release_watchlist_slot(user_id)
+        await db.watched_channels.update_one({"_id": channel_id}, {"$inc": {"watchers": -1}})
+        # Only if nobody started watching it meanwhile; its feed entries expire with the retention index
+        await db.watched_channels.delete_one({"_id": channel_id, "watchers": {"$lte": 0}})
         
-        # *** ENHANCED DEMOGRAPHIC-AWARE REVENUE CALCULATION ***
+        return {"message": "Channel removed from watchlist"}
         
-        # Step 1: Fetch real audience demographics
-        logger.info(f"Fetching demographic data for channel {channel_id}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error removing competitor channel: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to remove competitor channel")
+
+@api_router.get("/competitors/feed", response_model=List[CompetitorUpload])
+async def get_competitor_feed(
+    limit: int = Query(default=20, ge=1, le=100),
+    before: Optional[datetime] = Query(default=None),
+    user_id: str = Depends(tenant)
+):
+    """Newest uploads across the tenant's watched channels; page with ``before``"""
+    try:
+        channel_ids = await db.competitor_watchlist.distinct("channel_id", {"user_id": user_id})
+        if not channel_ids:
+            return []
+        query = {"channel_id": {"$in": channel_ids}}
+        if before is not None:
+            query["published_at"] = {"$lt": before}
+        uploads = await db.competitor_uploads.find(query, {"_id": 0}).sort("published_at", -1).to_list(limit)
+        return [CompetitorUpload(**upload, **video_velocity_fields(upload["video_id"])) for upload in uploads]
+    except Exception as e:
+        logger.error("Error fetching competitor feed: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to fetch competitor feed")
+
+def catalog_video_update(channel_id, item, now, previous=None, upsert=True):
+    """Write of a channel_videos document from a videos.list item, rating views against ``previous``"""
+    statistics = item['statistics']
+    published_at = parse_published_at(item['snippet']['publishedAt'])
+    views = int(statistics.get('viewCount', 0))
+    daily_views, measured = daily_view_rate(
+        views, published_at, now,
+        previous.get("views") if previous else None, previous.get("stats_refreshed_at") if previous else None
+    )
+    fields = {
+        "views": views,
+        "likes": int(statistics.get('likeCount', 0)),
+        "comments": int(statistics.get('commentCount', 0)),
+        "daily_views": daily_views,
+        "rate_measured": measured,
+        "stats_refreshed_at": now,
+        "next_refresh_at": now + refresh_interval(published_at, now, measured),
+    }
+    if 'contentDetails' in item:
+        fields.update(
+            title=item['snippet']['title'],
+            thumbnail=item['snippet']['thumbnails']['medium']['url'],
+            published_at=published_at,
+            duration_seconds=get_video_duration_seconds(item['contentDetails'].get('duration', 'PT0S')),
+        )
+    return UpdateOne(
+        {"channel_id": channel_id, "video_id": item['id']}, {"$set": fields}, upsert=upsert
+    )
+
+async def hydrate_catalog_videos(channel_id, video_ids, now):
+    """Fetch full details for ``video_ids`` (50 a call) and upsert them into the catalog"""
+    writes = []
+    for offset in range(0, len(video_ids), 50):
+        response = await youtube_execute(youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            id=','.join(video_ids[offset:offset + 50])
+        ))
+        writes.extend(catalog_video_update(channel_id, item, now) for item in response.get('items', []))
+    if writes:
+        await db.channel_videos.bulk_write(writes, ordered=False)
+    return len(writes)
+
+async def sync_catalog_uploads(catalog, now):
+    """Copy the channel's uploads into the catalog: a resumable full pass, then only new uploads"""
+    channel_id, playlist_id = catalog["_id"], catalog["uploads_playlist_id"]
+    if catalog.get("full_synced_at") is not None:
+        checked_at = catalog.get("uploads_checked_at")
+        if checked_at is not None and now - checked_at < timedelta(minutes=CATALOG_UPLOADS_CHECK_MINUTES):
+            return 0
+        uploads = await fetch_new_uploads(playlist_id, catalog.get("high_water"))
+        stored = await hydrate_catalog_videos(channel_id, [video_id for video_id, _ in uploads], now)
+        await db.channel_catalogs.update_one({"_id": channel_id}, {"$set": {
+            "high_water": advance_high_water(catalog.get("high_water"), uploads),
+            "uploads_checked_at": now,
+        }})
+        return stored
+    
+    # The full pass saves its page token as it goes, so quota limits or restarts only pause it
+    page_token, high_water, stored = catalog.get("page_token"), catalog.get("high_water"), 0
+    for _ in range(CATALOG_SYNC_MAX_PAGES):
+        if not youtube_quota.can_spend(2, reserve=CATALOG_QUOTA_RESERVE):
+            break
+        response = await youtube_execute(youtube.playlistItems().list(
+            part="contentDetails",
+            playlistId=playlist_id,
+            maxResults=50,
+            pageToken=page_token
+        ))
+        uploads, _ = select_new_uploads(response.get('items', []), None)
+        stored += await hydrate_catalog_videos(channel_id, [video_id for video_id, _ in uploads], now)
+        high_water = advance_high_water(high_water, uploads)
+        page_token = response.get('nextPageToken')
+        update = {"page_token": page_token, "high_water": high_water}
+        if page_token is None:
+            update.update(full_synced_at=now, uploads_checked_at=now)
+        await db.channel_catalogs.update_one({"_id": channel_id}, {"$set": update})
+        if page_token is None:
+            logger.info("Catalog of %s fully synced", channel_id)
+            break
+    return stored
+
+async def refresh_catalog_stats(channel_id, now):
+    """Refresh statistics of the channel's videos whose tier interval has elapsed"""
+    due = await db.channel_videos.find(
+        {"channel_id": channel_id, "next_refresh_at": {"$lte": now}},
+        {"video_id": 1, "views": 1, "stats_refreshed_at": 1}
+    ).sort("next_refresh_at", 1).to_list(CATALOG_REFRESH_BATCH)
+    previous = {doc["video_id"]: doc for doc in due}
+    writes, missing = [], set(previous)
+    ids = list(previous)
+    for offset in range(0, len(ids), 50):
+        if not youtube_quota.can_spend(1, reserve=CATALOG_QUOTA_RESERVE):
+            # Unrefreshed videos stay due for the next run
+            missing.difference_update(ids[offset:])
+            break
+        response = await youtube_execute(youtube.videos().list(
+            part="snippet,statistics",
+            id=','.join(ids[offset:offset + 50])
+        ))
+        for item in response.get('items', []):
+            missing.discard(item['id'])
+            # No upsert: a video deleted from the catalog meanwhile must not come back without a title
+            writes.append(catalog_video_update(channel_id, item, now, previous[item['id']], upsert=False))
+    if writes:
+        await db.channel_videos.bulk_write(writes, ordered=False)
+    if missing:
+        # Deleted or made private since the last refresh
+        await db.channel_videos.delete_many({"channel_id": channel_id, "video_id": {"$in": list(missing)}})
+    return len(writes)
+
+async def sync_channel_catalogs():
+    """Sync the least recently synced catalogs, within a channel and time budget, and drop those no tenant has connected"""
+    connected = await db.connected_channels.find(
+        {"uploads_playlist_id": {"$ne": None}}, {"channel_id": 1, "uploads_playlist_id": 1}
+    ).to_list(None)
+    playlists = {channel["channel_id"]: channel["uploads_playlist_id"] for channel in connected}
+    
+    orphaned = [
+        channel_id for channel_id in await db.channel_catalogs.distinct("_id") if channel_id not in playlists
+    ]
+    if orphaned:
+        await db.channel_catalogs.delete_many({"_id": {"$in": orphaned}})
+        await db.channel_videos.delete_many({"channel_id": {"$in": orphaned}})
+    
+    now = datetime.utcnow()
+    known = set(await db.channel_catalogs.distinct("_id"))
+    for channel_id, playlist_id in playlists.items():
+        if channel_id not in known:
+            await db.channel_catalogs.update_one(
+                {"_id": channel_id},
+                {"$setOnInsert": {"uploads_playlist_id": playlist_id, "created_at": now}},
+                upsert=True
+            )
+    
+    # Never-synced catalogs first, then the stalest; the rest wait for later runs
+    catalogs = await db.channel_catalogs.find({}).sort("last_synced_at", 1).to_list(CATALOG_SYNC_MAX_CHANNELS)
+    deadline = time.monotonic() + CATALOG_SYNC_BUDGET_SECONDS
+    for catalog in catalogs:
+        if time.monotonic() >= deadline:
+            break
+        channel_id = catalog["_id"]
+        try:
+            stored = await sync_catalog_uploads(catalog, now)
+            refreshed = await refresh_catalog_stats(channel_id, now)
+            await db.channel_catalogs.update_one({"_id": channel_id}, {"$set": {"last_synced_at": now}})
+            if stored or refreshed:
+                logger.info("Catalog of %s: %d videos stored, %d refreshed", channel_id, stored, refreshed)
+        except Exception as e:
+            logger.warning("Catalog sync of %s failed: %s", channel_id, e)
+
+catalog_sync_job = PeriodicJob(
+    "channel_catalog_sync", CATALOG_SYNC_CHECK_SECONDS, sync_channel_catalogs,
+    get_lock_collection=lambda: db.job_locks,
+)
+
+async def catalog_analytics(channel_id):
+    """Views, upload cadence and top videos from a fully synced catalog; None until the first full pass"""
+    catalog = await analytics_db.channel_catalogs.find_one({"_id": channel_id}, {"full_synced_at": 1})
+    if not catalog or catalog.get("full_synced_at") is None:
+        return None
+    
+    month_ago = datetime.utcnow() - timedelta(days=30)
+    summary, top_videos, recent_videos = await asyncio.gather(
+        analytics_db.channel_videos.aggregate([
+            {"$match": {"channel_id": channel_id}},
+            {"$group": {
+                "_id": None,
+                "videos": {"$sum": 1},
+                "views": {"$sum": "$views"},
+                # Lifetime averages standing in for unmeasured rates would skew the monthly figure
+                "daily_views": {"$sum": {"$cond": ["$rate_measured", "$daily_views", 0]}},
+                "unmeasured": {"$sum": {"$cond": ["$rate_measured", 0, 1]}},
+                "uploads_last_30_days": {"$sum": {"$cond": [{"$gte": ["$published_at", month_ago]}, 1, 0]}},
+            }},
+        ]).to_list(1),
+        analytics_db.channel_videos.find(
+            {"channel_id": channel_id}, {"_id": 0, "title": 1, "views": 1, "thumbnail": 1, "published_at": 1}
+        ).sort("views", -1).to_list(5),
+        analytics_db.channel_videos.find(
+            {"channel_id": channel_id}, {"_id": 0, "views": 1}
+        ).sort("published_at", -1).to_list(CATALOG_RECENT_VIDEOS),
+    )
+    if not summary or not summary[0]["videos"]:
+        return None
+    summary = summary[0]
+    return {
+        "videos": summary["videos"],
+        # None until some video's rate has been measured
+        "monthly_views": summary["daily_views"] * 30 if summary["unmeasured"] < summary["videos"] else None,
+        "unmeasured_videos": summary["unmeasured"],
+        "avg_views_per_video": summary["views"] / summary["videos"],
+        "avg_views_recent": sum(video["views"] for video in recent_videos) / len(recent_videos),
+        "uploads_last_30_days": summary["uploads_last_30_days"],
+        "top_videos": top_videos,
+    }
+
+# Keyed by (tenant, channel)
+dashboard_cache = TTLCache('dashboard', DASHBOARD_CACHE_SECONDS, max_entries=10000)
+cache_invalidator.register('dashboard', dashboard_cache)
+
+def dashboard_ttl(dashboard):
+    # A channel that could not be read may be reachable again soon
+    return DASHBOARD_CACHE_SECONDS if dashboard.get("connected", True) else DASHBOARD_ERROR_CACHE_SECONDS
+
+async def build_dashboard(primary_channel):
+    """Dashboard analytics for a connected channel, from live YouTube data"""
+    channel_id = primary_channel['channel_id']
+    
+    # Fetch updated channel statistics, plus the uploads playlist the first time
+    playlist_id = primary_channel.get('uploads_playlist_id')
+    channel_request = youtube.channels().list(
+        part="snippet,statistics" if playlist_id else "snippet,statistics,contentDetails",
+        id=channel_id
+    )
+    
+    channel_response = await youtube_execute(channel_request)
+    
+    if not channel_response.get('items'):
+        return {
+            "connected": False,
+            "message": "Connected channel not found. Please reconnect your channel.",
+            "error": "Channel not accessible"
+        }
+    
+    channel_data = channel_response['items'][0]
+    snippet = channel_data['snippet']
+    statistics = channel_data['statistics']
+    
+    playlist_id = playlist_id or uploads_playlist_id(channel_data)
+    
+    # Per-video figures come from the synced catalog once it is complete
+    catalog = await catalog_analytics(channel_id)
+    
+    # Otherwise get the channel's recent videos for analysis through the uploads
+    # playlist, 1 quota unit against 100 for search.list ordered by date
+    video_ids = await fetch_recent_upload_ids(playlist_id, 5) if playlist_id and not catalog else []
+    
+    top_performing_video = None
+    total_video_views = 0
+    
+    if catalog:
+        top_video = catalog['top_videos'][0]
+        top_performing_video = {
+            "title": top_video['title'],
+            "views": top_video['views'],
+            "thumbnail": top_video['thumbnail']
+        }
+    elif video_ids:
+        # Get detailed video statistics
+        videos_detail_request = youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            id=','.join(video_ids)  # Analyze top 5 recent videos
+        )
         
-        # Try to get cached demographics first
-        demographics = await get_cached_demographics(channel_id)
+        videos_detail_response = await youtube_execute(videos_detail_request)
         
-        if not demographics:
-            # Fetch new demographic data
-            demographics = await fetch_youtube_demographics(channel_id, YOUTUBE_API_KEY)
+        max_views = 0
+        for video in videos_detail_response.get('items', []):
+            video_views = int(video['statistics'].get('viewCount', 0))
+            total_video_views += video_views
             
-            # Cache the demographic data
-            if demographics:
-                await store_channel_demographics(channel_id, demographics)
-        
-        # Step 2: Calculate demographic-aware multipliers
-        demographic_multipliers = {'combined_multiplier': 0.7}  # Fallback
+            if video_views > max_views:
+                max_views = video_views
+                top_performing_video = {
+                    "title": video['snippet']['title'],
+                    "views": video_views,
+                    "thumbnail": video['snippet']['thumbnails']['medium']['url']
+                }
+    
+    # Calculate realistic estimated revenue based on channel analysis
+    total_views = int(statistics.get('viewCount', 0))
+    total_subscribers = int(statistics.get('subscriberCount', 0))
+    video_count = int(statistics.get('videoCount', 0))
+    
+    # Monthly views from the catalog's per-video view rates; without it, estimate
+    # from channel totals (in reality, this would come from YouTube Analytics API)
+    if catalog and catalog['monthly_views'] is not None:
+        estimated_monthly_views = catalog['monthly_views']
+    elif video_count > 0:
+        avg_views_per_video = total_views / video_count
+        # Estimate monthly uploads and views based on channel size
+        if total_subscribers > 10000000:  # 10M+ subscribers
+            estimated_monthly_videos = min(15, max(4, video_count / 24))  # Large channels post more
+            estimated_monthly_views = avg_views_per_video * estimated_monthly_videos * 1.5  # Bigger channels get more views per video
+        elif total_subscribers > 1000000:  # 1M+ subscribers  
+            estimated_monthly_videos = min(10, max(3, video_count / 36))
+            estimated_monthly_views = avg_views_per_video * estimated_monthly_videos * 1.2
+        elif total_subscribers > 100000:  # 100K+ subscribers
+            estimated_monthly_videos = min(8, max(2, video_count / 48))
+            estimated_monthly_views = avg_views_per_video * estimated_monthly_videos
+        else:  # Smaller channels
+            estimated_monthly_videos = max(1, video_count / 60)
+            estimated_monthly_views = avg_views_per_video * estimated_monthly_videos * 0.8
+    else:
+        estimated_monthly_views = 0
+    
+    # Determine channel category/niche based on channel analysis
+    channel_category = analyze_channel_category(snippet.get('title', ''), snippet.get('description', ''), top_performing_video)
+    
+    # Get RPM rate based on category
+    rpm_data = get_category_rpm(channel_category)
+    base_rpm = rpm_data['rpm']
+    category_name = rpm_data['category']
+    
+    # *** ENHANCED DEMOGRAPHIC-AWARE REVENUE CALCULATION ***
+    
+    # Step 1: Fetch real audience demographics
+    logger.info("Fetching demographic data for channel %s", channel_id)
+    
+    # Try to get cached demographics first
+    demographics = await get_cached_demographics(channel_id)
+    
+    if not demographics:
+        # Fetch new demographic data
+        demographics = await fetch_youtube_demographics(channel_id, YOUTUBE_API_KEY)
         
+        # Cache the demographic data
         if demographics:
-            demographic_multipliers = calculate_demographic_multiplier(demographics)
-            logger.info(f"Calculated demographic multipliers: {demographic_multipliers}")
-        else:
-            logger.warning(f"No demographic data available for channel {channel_id}, using fallback multipliers")
-        
-        # Step 3: Apply legacy geography and size multipliers (for baseline)
-        legacy_geography_multiplier = estimate_geography_multiplier(total_subscribers, channel_category)
-        size_multiplier = get_channel_size_multiplier(total_subscribers)
-        
-        # Step 4: Calculate enhanced final RPM with demographic data
-        # Combine demographic multiplier with legacy multipliers
-        demographic_multiplier = demographic_multipliers['combined_multiplier']
-        
-        # Use demographic multiplier instead of estimated geography multiplier
-        final_rpm = base_rpm * demographic_multiplier * size_multiplier
-        
-        # Step 5: Calculate demographic-aware monthly revenue
-        estimated_monthly_revenue = max(1, int((estimated_monthly_views / 1000) * final_rpm))
-        
-        # Cap at reasonable maximum
-        estimated_monthly_revenue = min(estimated_monthly_revenue, 2000000)  # $2M max
-        
-        logger.info(f"Enhanced revenue calculation: ${estimated_monthly_revenue:,} (RPM: ${final_rpm:.2f}, Demographics: {demographic_multiplier:.3f})")
-        
-        # Simulated monthly growth data (in real implementation, this would come from YouTube Analytics API)
-        monthly_growth = [
-            {"month": "Aug", "subscribers": int(statistics.get('subscriberCount', 0)) - 50000, "views": total_views - 5000000},
-            {"month": "Sep", "subscribers": int(statistics.get('subscriberCount', 0)) - 40000, "views": total_views - 4000000},
-            {"month": "Oct", "subscribers": int(statistics.get('subscriberCount', 0)) - 30000, "views": total_views - 3000000},
-            {"month": "Nov", "subscribers": int(statistics.get('subscriberCount', 0)) - 20000, "views": total_views - 2000000},
-            {"month": "Dec", "subscribers": int(statistics.get('subscriberCount', 0)) - 10000, "views": total_views - 1000000},
-            {"month": "Jan", "subscribers": int(statistics.get('subscriberCount', 0)), "views": total_views}
-        ]
-        
-        # Ensure all values are positive
-        for item in monthly_growth:
-            item['subscribers'] = max(0, item['subscribers'])
-            item['views'] = max(0, item['views'])
-        
-        analytics = {
-            "connected": True,
-            "channelInfo": {
-                "name": snippet['title'],
-                "id": channel_id,
-                "handle": primary_channel.get('channel_handle'),
-                "thumbnail": snippet['thumbnails']['medium']['url'],
-                "description": snippet.get('description', '')[:200] + "..." if snippet.get('description') else "",
-                "category": category_name
-            },
-            "totalViews": int(statistics.get('viewCount', 0)),
-            "totalSubscribers": int(statistics.get('subscriberCount', 0)),
-            "videoCount": int(statistics.get('videoCount', 0)),
-            "avgViewDuration": "4:32",  # This would require YouTube Analytics API
-            "clickThroughRate": 12.8,
-            "engagementRate": 8.5,
-            "revenueThisMonth": estimated_monthly_revenue,
-            "revenueDetails": {
-                "estimatedMonthlyViews": int(estimated_monthly_views),
-                "rpm": round(final_rpm, 2),
-                "baseRpm": round(base_rpm, 2),
-                "category": category_name,
-                "demographicMultiplier": round(demographic_multiplier, 3),
-                "legacyGeographyMultiplier": round(legacy_geography_multiplier, 2),
-                "sizeMultiplier": round(size_multiplier, 2),
-                "revenuePerDay": int(estimated_monthly_revenue / 30),
-                "revenuePerWeek": int(estimated_monthly_revenue / 4.33),
-                "breakdown": f"${estimated_monthly_revenue:,} = {int(estimated_monthly_views):,} views × ${final_rpm:.2f} RPM",
-                "demographicBreakdown": {
-                    "ageMultiplier": demographic_multipliers.get('age_multiplier', 1.0),
-                    "genderMultiplier": demographic_multipliers.get('gender_multiplier', 1.0),
-                    "geographicMultiplier": demographic_multipliers.get('geo_multiplier', 0.5),
-                    "coverageData": demographic_multipliers.get('weights_used', {}),
-                    "dataSource": demographics.get('data_source', 'fallback') if demographics else 'fallback'
-                },
-                "audienceDemographics": demographics if demographics else {
-                    "message": "Demographic data not available - using estimated multipliers",
-                    "age_groups": {},
-                    "gender": {},
-                    "countries": {}
-                }
+            await store_channel_demographics(channel_id, demographics)
+    
+    # Step 2: Calculate demographic-aware multipliers
+    demographic_multipliers = {'combined_multiplier': 0.7}  # Fallback
+    
+    if demographics:
+        demographic_multipliers = calculate_demographic_multiplier(demographics)
+        logger.debug("Calculated demographic multipliers: %s", demographic_multipliers)
+    else:
+        logger.warning("No demographic data available for channel %s, using fallback multipliers", channel_id)
+    
+    # Step 3: Apply legacy geography and size multipliers (for baseline)
+    legacy_geography_multiplier = estimate_geography_multiplier(total_subscribers, channel_category)
+    size_multiplier = get_channel_size_multiplier(total_subscribers)
+    
+    # Step 4: Calculate enhanced final RPM with demographic data
+    # Combine demographic multiplier with legacy multipliers
+    demographic_multiplier = demographic_multipliers['combined_multiplier']
+    
+    # Use demographic multiplier instead of estimated geography multiplier
+    final_rpm = base_rpm * demographic_multiplier * size_multiplier
+    
+    # Step 5: Calculate demographic-aware monthly revenue
+    estimated_monthly_revenue = max(1, int((estimated_monthly_views / 1000) * final_rpm))
+    
+    # Cap at reasonable maximum
+    estimated_monthly_revenue = min(estimated_monthly_revenue, 2000000)  # $2M max
+    
+    logger.info(
+        "Enhanced revenue calculation: $%s (RPM: $%.2f, Demographics: %.3f)",
+        estimated_monthly_revenue, final_rpm, demographic_multiplier,
+        extra={"channel_id": channel_id, "revenue": estimated_monthly_revenue, "rpm": round(final_rpm, 2)}
+    )
+    
+    # Simulated monthly growth data (in real implementation, this would come from YouTube Analytics API)
+    monthly_growth = [
+        {"month": "Aug", "subscribers": int(statistics.get('subscriberCount', 0)) - 50000, "views": total_views - 5000000},
+        {"month": "Sep", "subscribers": int(statistics.get('subscriberCount', 0)) - 40000, "views": total_views - 4000000},
+        {"month": "Oct", "subscribers": int(statistics.get('subscriberCount', 0)) - 30000, "views": total_views - 3000000},
+        {"month": "Nov", "subscribers": int(statistics.get('subscriberCount', 0)) - 20000, "views": total_views - 2000000},
+        {"month": "Dec", "subscribers": int(statistics.get('subscriberCount', 0)) - 10000, "views": total_views - 1000000},
+        {"month": "Jan", "subscribers": int(statistics.get('subscriberCount', 0)), "views": total_views}
+    ]
+    
+    # Ensure all values are positive
+    for item in monthly_growth:
+        item['subscribers'] = max(0, item['subscribers'])
+        item['views'] = max(0, item['views'])
+    
+    analytics = {
+        "connected": True,
+        "channelInfo": {
+            "name": snippet['title'],
+            "id": channel_id,
+            "handle": primary_channel.get('channel_handle'),
+            "thumbnail": snippet['thumbnails']['medium']['url'],
+            "description": snippet.get('description', '')[:200] + "..." if snippet.get('description') else "",
+            "category": category_name
+        },
+        "totalViews": int(statistics.get('viewCount', 0)),
+        "totalSubscribers": int(statistics.get('subscriberCount', 0)),
+        "videoCount": int(statistics.get('videoCount', 0)),
+        "avgViewDuration": "4:32",  # This would require YouTube Analytics API
+        "clickThroughRate": 12.8,
+        "engagementRate": 8.5,
+        "revenueThisMonth": estimated_monthly_revenue,
+        "revenueDetails": {
+            "estimatedMonthlyViews": int(estimated_monthly_views),
+            "rpm": round(final_rpm, 2),
+            "baseRpm": round(base_rpm, 2),
+            "category": category_name,
+            "demographicMultiplier": round(demographic_multiplier, 3),
+            "legacyGeographyMultiplier": round(legacy_geography_multiplier, 2),
+            "sizeMultiplier": round(size_multiplier, 2),
+            "revenuePerDay": int(estimated_monthly_revenue / 30),
+            "revenuePerWeek": int(estimated_monthly_revenue / 4.33),
+            "breakdown": f"${estimated_monthly_revenue:,} = {int(estimated_monthly_views):,} views × ${final_rpm:.2f} RPM",
+            "demographicBreakdown": {
+                "ageMultiplier": demographic_multipliers.get('age_multiplier', 1.0),
+                "genderMultiplier": demographic_multipliers.get('gender_multiplier', 1.0),
+                "geographicMultiplier": demographic_multipliers.get('geo_multiplier', 0.5),
+                "coverageData": demographic_multipliers.get('weights_used', {}),
+                "dataSource": demographics.get('data_source', 'fallback') if demographics else 'fallback'
             },
-            "topPerformingVideo": top_performing_video,
-            "monthlyGrowth": monthly_growth,
-            "lastUpdated": datetime.utcnow().isoformat()
-        }
-        
-        # Update the stored channel data
+            "audienceDemographics": demographics if demographics else {
+                "message": "Demographic data not available - using estimated multipliers",
+                "age_groups": {},
+                "gender": {},
+                "countries": {}
+            }
+        },
+        "topPerformingVideo": top_performing_video,
+        "topVideos": catalog['top_videos'] if catalog else [],
+        "catalog": {
+            "videosSynced": catalog['videos'],
+            "avgViewsPerVideo": int(catalog['avg_views_per_video']),
+            "avgViewsRecent": int(catalog['avg_views_recent']),
+            "uploadsLast30Days": catalog['uploads_last_30_days'],
+            # Left out of estimatedMonthlyViews until their view rate is measured
+            "videosWithoutMeasuredRate": catalog['unmeasured_videos'],
+        } if catalog else None,
+        "monthlyGrowth": monthly_growth,
+        "lastUpdated": datetime.utcnow().isoformat()
+    }
+    
+    # Update the stored channel data; unchanged figures (most refreshes) cost no write or invalidation
+    user_id = primary_channel.get("user_id", DEFAULT_USER_ID)
+    stored = {
+        "subscriber_count": int(statistics.get('subscriberCount', 0)),
+        "view_count": int(statistics.get('viewCount', 0)),
+        "video_count": int(statistics.get('videoCount', 0)),
+        "uploads_playlist_id": playlist_id
+    }
+    if any(primary_channel.get(field) != value for field, value in stored.items()):
         await db.connected_channels.update_one(
-            {"channel_id": channel_id},
-            {"$set": {
-                "subscriber_count": int(statistics.get('subscriberCount', 0)),
-                "view_count": int(statistics.get('viewCount', 0)),
-                "video_count": int(statistics.get('videoCount', 0))
-            }}
+            {"user_id": user_id, "channel_id": channel_id}, {"$set": stored}
         )
+        await cache_invalidator.publish('tenant_channels', user_id)
+    
+    return analytics
+
+@api_router.get("/analytics/dashboard")
+async def get_dashboard_analytics(user_id: str = Depends(tenant)):
+    """Get dashboard analytics data from connected YouTube channel"""
+    try:
+        # Get the primary connected channel
+        primary_channel = await get_primary_channel(user_id)
         
-        return analytics
+        if not primary_channel:
+            # Return empty state if no channels are connected
+            return {
+                "connected": False,
+                "message": "No YouTube channels connected. Please connect a channel to view analytics.",
+                "totalViews": 0,
+                "totalSubscribers": 0,
+                "avgViewDuration": "0:00",
+                "revenueThisMonth": 0,
+                "channelInfo": None,
+                "topPerformingVideo": None,
+                "monthlyGrowth": []
+            }
+        
+        return await dashboard_cache.get_or_load(
+            (user_id, primary_channel['channel_id']), lambda: build_dashboard(primary_channel), ttl=dashboard_ttl
+        )
         
     except Exception as e:
-        logger.error(f"Error fetching dashboard analytics: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error fetching dashboard analytics: %s", e)
         
         # Return fallback data with error info
         return {
@@ -1581,86 +3282,108 @@ class AutomationWorkflow(BaseModel):
     success_rate: int
     config: dict = {}
 
+# Mock course data - in production this would come from database
+LEARNING_COURSES = [
+    {
+        "id": "faceless-youtube-mastery",
+        "title": "Faceless YouTube Mastery",
+        "description": "Complete guide to building a successful faceless YouTube channel",
+        "instructor": "CreatorHub Team",
+        "duration": "6 hours",
+        "lessons": 24,
+        "level": "Beginner to Advanced",
+        "rating": 4.9,
+        "students": 15420,
+        "thumbnail": "https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=400&h=300&fit=crop",
+        "progress": 0
+    },
+    {
+        "id": "automation-mastery",
+        "title": "YouTube Automation Mastery",
+        "description": "Advanced automation strategies for scaling your YouTube channel",
+        "instructor": "Automation Expert",
+        "duration": "4 hours",
+        "lessons": 18,
+        "level": "Intermediate",
+        "rating": 4.8,
+        "students": 8920,
+        "thumbnail": "https://images.unsplash.com/photo-1518186285589-2f7649de83e0?w=400&h=300&fit=crop",
+        "progress": 0
+    }
+]
+
+COURSES_PAYLOAD = StaticPayload({"courses": LEARNING_COURSES})
+
 @api_router.get("/learning/courses")
-async def get_courses():
+async def get_courses(request: Request):
     """Get available learning courses"""
     try:
-        # For now, return mock data - in production this would come from database
-        courses = [
-            {
-                "id": "faceless-youtube-mastery",
-                "title": "Faceless YouTube Mastery",
-                "description": "Complete guide to building a successful faceless YouTube channel",
-                "instructor": "CreatorHub Team",
-                "duration": "6 hours",
-                "lessons": 24,
-                "level": "Beginner to Advanced",
-                "rating": 4.9,
-                "students": 15420,
-                "thumbnail": "https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=400&h=300&fit=crop",
-                "progress": 0
-            },
-            {
-                "id": "automation-mastery",
-                "title": "YouTube Automation Mastery",
-                "description": "Advanced automation strategies for scaling your YouTube channel",
-                "instructor": "Automation Expert",
-                "duration": "4 hours",
-                "lessons": 18,
-                "level": "Intermediate",
-                "rating": 4.8,
-                "students": 8920,
-                "thumbnail": "https://images.unsplash.com/photo-1518186285589-2f7649de83e0?w=400&h=300&fit=crop",
-                "progress": 0
-            }
-        ]
-        return {"courses": courses}
+        return COURSES_PAYLOAD.response(request)
     except Exception as e:
-        logger.error(f"Error fetching courses: {str(e)}")
+        logger.error("Error fetching courses: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch courses")
 
+AUTOMATION_WORKFLOWS = [
+    {
+        "id": "content-pipeline",
+        "name": "Complete Content Pipeline",
+        "description": "Automated workflow from idea generation to published video",
+        "steps": 8,
+        "status": "active",
+        "last_run": "2 hours ago",
+        "success_rate": 94,
+        "icon": "Zap",
+        "color": "bg-blue-500"
+    },
+    {
+        "id": "analytics-report",
+        "name": "Weekly Analytics Report",
+        "description": "Automated weekly performance analysis and insights",
+        "steps": 4,
+        "status": "active",
+        "last_run": "1 day ago",
+        "success_rate": 98,
+        "icon": "BarChart3",
+        "color": "bg-green-500"
+    },
+]
+
+def time_ago(moment):
+    """Coarse "N units ago" label for a past UTC datetime"""
+    seconds = max(0, (datetime.utcnow() - moment).total_seconds())
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return "just now"
+
+async def competitor_monitoring_workflow(user_id):
+    """The competitor-monitoring workflow, reporting the tenant's watchlist polling"""
+    channel_ids = await db.competitor_watchlist.distinct("channel_id", {"user_id": user_id})
+    channels = await db.watched_channels.find({"_id": {"$in": channel_ids}}).to_list(len(channel_ids) or 1)
+    polls = sum(channel.get("polls", 0) for channel in channels)
+    failed = sum(channel.get("failed_polls", 0) for channel in channels)
+    last_polled = max((channel["last_polled_at"] for channel in channels if channel.get("last_polled_at")), default=None)
+    return {
+        "id": "competitor-monitoring",
+        "name": "Competitor Content Monitoring",
+        "description": "Track competitor uploads and analyze trending content",
+        "steps": 3,
+        "status": "active" if channel_ids else "inactive",
+        "last_run": time_ago(last_polled) if last_polled else "never",
+        "success_rate": round(100 * polls / (polls + failed)) if polls + failed else 100,
+        "icon": "Target",
+        "color": "bg-purple-500",
+        "config": {"channels": len(channel_ids)}
+    }
+
 @api_router.get("/learning/workflows")
-async def get_automation_workflows():
+async def get_automation_workflows(user_id: str = Depends(tenant)):
     """Get automation workflows"""
     try:
-        workflows = [
-            {
-                "id": "content-pipeline",
-                "name": "Complete Content Pipeline",
-                "description": "Automated workflow from idea generation to published video",
-                "steps": 8,
-                "status": "active",
-                "last_run": "2 hours ago",
-                "success_rate": 94,
-                "icon": "Zap",
-                "color": "bg-blue-500"
-            },
-            {
-                "id": "analytics-report",
-                "name": "Weekly Analytics Report",
-                "description": "Automated weekly performance analysis and insights",
-                "steps": 4,
-                "status": "active",
-                "last_run": "1 day ago",
-                "success_rate": 98,
-                "icon": "BarChart3",
-                "color": "bg-green-500"
-            },
-            {
-                "id": "competitor-monitoring",
-                "name": "Competitor Content Monitoring",
-                "description": "Track competitor uploads and analyze trending content",
-                "steps": 6,
-                "status": "active",
-                "last_run": "4 hours ago",
-                "success_rate": 91,
-                "icon": "Target",
-                "color": "bg-purple-500"
-            }
-        ]
-        return {"workflows": workflows}
+        return {"workflows": AUTOMATION_WORKFLOWS + [await competitor_monitoring_workflow(user_id)]}
     except Exception as e:
-        logger.error(f"Error fetching workflows: {str(e)}")
+        logger.error("Error fetching workflows: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch workflows")
 
 # Community Hub API endpoints
@@ -1690,53 +3413,59 @@ class CommunityMember(BaseModel):
     posts: int
     reputation: int
 
+# Mock community discussions data
+COMMUNITY_DISCUSSIONS = [
+    {
+        "id": "1",
+        "title": "Just hit 100K subscribers with faceless content! AMA",
+        "content": "Started my channel 8 months ago following the faceless YouTube strategies. Here to answer any questions about what worked for me!",
+        "author": {
+            "name": "TechGrowthHacker",
+            "avatar": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=40&h=40&fit=crop&crop=face",
+            "subscribers": "127K",
+            "verified": True,
+            "level": "Expert"
+        },
+        "category": "success-stories",
+        "replies": 47,
+        "likes": 234,
+        "views": 1205,
+        "timeAgo": "2 hours ago",
+        "tags": ["milestone", "faceless", "growth"],
+        "pinned": True
+    },
+    {
+        "id": "2",
+        "title": "Best automation tools for YouTube content creation?",
+        "content": "Looking for recommendations on tools that can help automate the content creation process. Currently spending 10+ hours per video.",
+        "author": {
+            "name": "ContentCreator2024",
+            "avatar": "https://images.unsplash.com/photo-1494790108755-2616b5185e29?w=40&h=40&fit=crop&crop=face",
+            "subscribers": "12K",
+            "verified": False,
+            "level": "Growing"
+        },
+        "category": "automation",
+        "replies": 23,
+        "likes": 89,
+        "views": 456,
+        "timeAgo": "4 hours ago",
+        "tags": ["automation", "tools", "efficiency"]
+    }
+]
+
+DISCUSSIONS_PAYLOAD = StaticPayload({"discussions": COMMUNITY_DISCUSSIONS})
+
 @api_router.get("/community/discussions")
-async def get_community_discussions(category: str = "all", search: str = ""):
+async def get_community_discussions(request: Request, category: str = "all", search: str = ""):
     """Get community discussions"""
     try:
-        # Mock community discussions data
-        discussions = [
-            {
-                "id": "1",
-                "title": "Just hit 100K subscribers with faceless content! AMA",
-                "content": "Started my channel 8 months ago following the faceless YouTube strategies. Here to answer any questions about what worked for me!",
-                "author": {
-                    "name": "TechGrowthHacker",
-                    "avatar": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=40&h=40&fit=crop&crop=face",
-                    "subscribers": "127K",
-                    "verified": True,
-                    "level": "Expert"
-                },
-                "category": "success-stories",
-                "replies": 47,
-                "likes": 234,
-                "views": 1205,
-                "timeAgo": "2 hours ago",
-                "tags": ["milestone", "faceless", "growth"],
-                "pinned": True
-            },
-            {
-                "id": "2",
-                "title": "Best automation tools for YouTube content creation?",
-                "content": "Looking for recommendations on tools that can help automate the content creation process. Currently spending 10+ hours per video.",
-                "author": {
-                    "name": "ContentCreator2024",
-                    "avatar": "https://images.unsplash.com/photo-1494790108755-2616b5185e29?w=40&h=40&fit=crop&crop=face",
-                    "subscribers": "12K",
-                    "verified": False,
-                    "level": "Growing"
-                },
-                "category": "automation",
-                "replies": 23,
-                "likes": 89,
-                "views": 456,
-                "timeAgo": "4 hours ago",
-                "tags": ["automation", "tools", "efficiency"]
-            }
-        ]
-        
+        # Unfiltered listing is served precompressed from memory
+        if category == "all" and not search:
+            return DISCUSSIONS_PAYLOAD.response(request)
+
         # Filter by category and search
-        filtered = discussions
+        filtered = COMMUNITY_DISCUSSIONS
         if category != "all":
             filtered = [d for d in filtered if d["category"] == category]
         if search:
@@ -1744,61 +3473,142 @@ async def get_community_discussions(category: str = "all", search: str = ""):
         
         return {"discussions": filtered}
     except Exception as e:
-        logger.error(f"Error fetching discussions: {str(e)}")
+        logger.error("Error fetching discussions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch discussions")
 
+FEATURED_CREATORS = [
+    {
+        "id": "1",
+        "name": "Alex Chen",
+        "username": "@alexcreates",
+        "subscribers": "567K",
+        "niche": "Tech Reviews",
+        "avatar": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=60&h=60&fit=crop&crop=face",
+        "growth": "+15.2%",
+        "isOnline": True,
+        "level": "Expert",
+        "posts": 156,
+        "reputation": 2340
+    },
+    {
+        "id": "2",
+        "name": "Sarah Johnson",
+        "username": "@sarahgrows",
+        "subscribers": "234K",
+        "niche": "Business",
+        "avatar": "https://images.unsplash.com/photo-1494790108755-2616b5185e29?w=60&h=60&fit=crop&crop=face",
+        "growth": "+8.7%",
+        "isOnline": False,
+        "level": "Mentor",
+        "posts": 89,
+        "reputation": 1890
+    }
+]
+
+CREATORS_PAYLOAD = StaticPayload({"creators": FEATURED_CREATORS})
+
 @api_router.get("/community/creators")
-async def get_featured_creators():
+async def get_featured_creators(request: Request):
     """Get featured community creators"""
     try:
-        creators = [
-            {
-                "id": "1",
-                "name": "Alex Chen",
-                "username": "@alexcreates",
-                "subscribers": "567K",
-                "niche": "Tech Reviews",
-                "avatar": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=60&h=60&fit=crop&crop=face",
-                "growth": "+15.2%",
-                "isOnline": True,
-                "level": "Expert",
-                "posts": 156,
-                "reputation": 2340
-            },
-            {
-                "id": "2",
-                "name": "Sarah Johnson",
-                "username": "@sarahgrows",
-                "subscribers": "234K",
-                "niche": "Business",
-                "avatar": "https://images.unsplash.com/photo-1494790108755-2616b5185e29?w=60&h=60&fit=crop&crop=face",
-                "growth": "+8.7%",
-                "isOnline": False,
-                "level": "Mentor",
-                "posts": 89,
-                "reputation": 1890
-            }
-        ]
-        return {"creators": creators}
+        return CREATORS_PAYLOAD.response(request)
     except Exception as e:
-        logger.error(f"Error fetching creators: {str(e)}")
+        logger.error("Error fetching creators: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch creators")
 
+COMMUNITY_STATS = {
+    "activeMembers": 15420,
+    "discussions": 1247,
+    "successStories": 89,
+    "expertsOnline": 567
+}
+
+STATS_PAYLOAD = StaticPayload(COMMUNITY_STATS)
+
 @api_router.get("/community/stats")
-async def get_community_stats():
+async def get_community_stats(request: Request):
     """Get community statistics"""
     try:
-        stats = {
-            "activeMembers": 15420,
-            "discussions": 1247,
-            "successStories": 89,
-            "expertsOnline": 567
-        }
-        return stats
+        return STATS_PAYLOAD.response(request)
     except Exception as e:
-        logger.error(f"Error fetching community stats: {str(e)}")
+        logger.error("Error fetching community stats: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch community stats")
 
+@api_router.get("/quota")
+async def get_quota(user_id: str = Depends(tenant)):
+    """Today's YouTube quota spend for the calling tenant and what remains for the project"""
+    return {
+        "tenant": user_id,
+        "spent": youtube_quota.spent_by(user_id),
+        "tenantLimit": youtube_quota.tenant_limit or None,
+        "projectRemaining": youtube_quota.remaining,
+        "projectLimit": youtube_quota.daily_limit,
+    }
+
+# Health endpoints
+@api_router.get("/health/live")
+async def liveness():
+    """The process is up and serving"""
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """200 once this worker has warmed up and Mongo answers a ping, 503 otherwise"""
+    if not warmup_state["ready"]:
+        return JSONResponse({"status": "warming_up", "steps": warmup_state["steps"]}, status_code=503)
+    mongo_error = await check_ready(db)
+    if mongo_error:
+        return JSONResponse({"status": "mongo_unavailable", "error": mongo_error}, status_code=503)
+    return {"status": "ready", "steps": warmup_state["steps"]}
+
+# Debug and admin endpoints
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Allow the request only with a matching X-Admin-Token header"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@api_router.get("/debug/blocking", dependencies=[Depends(require_admin)])
+async def get_blocking_report(limit: int = Query(default=30, le=200)):
+    """Per-function event loop blocking time collected by the blocking detector"""
+    if not blocking_detector.enabled:
+        raise HTTPException(status_code=404, detail="Blocking detector is disabled. Set LOOP_BLOCKING_DETECTOR=true to enable it.")
+    return blocking_detector.report(limit)
+
+@api_router.delete("/debug/blocking", dependencies=[Depends(require_admin)])
+async def reset_blocking_report():
+    """Clear collected blocking samples, e.g. before re-measuring a fix"""
+    if not blocking_detector.enabled:
+        raise HTTPException(status_code=404, detail="Blocking detector is disabled. Set LOOP_BLOCKING_DETECTOR=true to enable it.")
+    blocking_detector.reset()
+    return {"message": "Blocking report reset"}
+
+@api_router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(default=10, ge=1, le=120),
+    memory: bool = Query(default=True),
+    format: str = Query(default="json", pattern="^(json|folded)$")
+):
+    """Profile this worker in place: CPU stack samples plus tracemalloc allocation growth"""
+    if sampling_profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+    
+    handler_names = {route.endpoint.__name__ for route in api_router.routes}
+    logger.info("Profiling worker %s for %ss", os.getpid(), seconds)
+    
+    try:
+        # Sampling runs on a worker thread so the loop keeps serving the traffic being profiled
+        result = await asyncio.to_thread(sampling_profiler.run, seconds, handler_names, memory)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "folded":
+        return PlainTextResponse(result['cpu']['folded'] + "\n")
+    
+    result['workerPid'] = os.getpid()
+    return result
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1810,6 +3620,257 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large textual responses (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware)
+
+# Request IDs, nested spans and the optional Server-Timing header
+app.add_middleware(TracingMiddleware)
+
+# Outermost so latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Indexes for the queries the API runs; TTL indexes expire memoized data in Mongo itself
+MONGO_INDEXES = [
+    ("connected_channels", [("user_id", 1), ("channel_id", 1)], {"unique": True}),
+    # At most one primary channel per tenant, enforced by Mongo rather than by read-then-write
+    ("connected_channels", [("user_id", 1), ("is_primary", 1)], {"unique": True, "partialFilterExpression": {"is_primary": True}}),
+    ("generated_scripts", [("user_id", 1), ("generated_at", -1)], {}),
+    ("video_ideas", [("user_id", 1), ("created_at", -1)], {}),
+    ("channel_demographics", [("channel_id", 1)], {"unique": True}),
+    ("channel_demographics", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("script_jobs", [("job_id", 1)], {"unique": True}),
+    ("script_jobs", [("kind", 1), ("request_hash", 1), ("status", 1)], {}),
+    ("script_jobs", [("kind", 1), ("status", 1)], {}),
+    # Pending jobs have no finished_at and are never expired
+    ("script_jobs", [("finished_at", 1)], {"expireAfterSeconds": int(SCRIPT_JOB_RETENTION_DAYS * 86400)}),
+    ("semantic_cache", [("namespace", 1), ("key", 1)], {"unique": True}),
+    ("semantic_cache", [("namespace", 1), ("created_at", 1)], {}),
+    ("semantic_cache", [("created_at", 1)], {"expireAfterSeconds": int(SEMANTIC_CACHE_TTL_HOURS * 3600)}),
+    ("research_cache", [("created_at", 1)], {"expireAfterSeconds": int(RESEARCH_CACHE_HOURS * 3600)}),
+    ("trending_topic_snapshots", [("region", 1), ("category", 1), ("version", -1)], {"unique": True}),
+    ("trending_topic_variants", [("region", 1), ("category", 1)], {"unique": True}),
+    ("trending_topic_variants", [("requested_at", 1)], {"expireAfterSeconds": int(TRENDING_TOPICS_VARIANT_TTL_DAYS * 86400)}),
+    ("cache_events", [("created_at", 1)], {"expireAfterSeconds": CACHE_EVENTS_TTL_SECONDS}),
+    ("youtube_quota", [("day", 1), ("tenant", 1)], {"unique": True}),
+    # Quota days are done with after a day; kept a little longer for inspection
+    ("youtube_quota", [("created_at", 1)], {"expireAfterSeconds": 3 * 86400}),
+    ("trending_snapshots", [("video_id", 1), ("ts", 1)], {"unique": True}),
+    ("trending_snapshots", [("ts", 1)], {"expireAfterSeconds": int(TRENDING_SNAPSHOT_RETENTION_DAYS * 86400)}),
+    ("video_velocity", [("ts", 1)], {}),
+    ("competitor_watchlist", [("user_id", 1), ("channel_id", 1)], {"unique": True}),
+    ("competitor_watchlist", [("channel_id", 1)], {}),
+    ("watched_channels", [("next_poll_at", 1)], {}),
+    ("competitor_uploads", [("video_id", 1)], {"unique": True}),
+    ("competitor_uploads", [("channel_id", 1), ("published_at", -1)], {}),
+    ("competitor_uploads", [("detected_at", 1)], {"expireAfterSeconds": int(WATCHLIST_FEED_RETENTION_DAYS * 86400)}),
+    ("channel_videos", [("channel_id", 1), ("video_id", 1)], {"unique": True}),
+    ("channel_videos", [("channel_id", 1), ("next_refresh_at", 1)], {}),
+    ("channel_videos", [("channel_id", 1), ("views", -1)], {}),
+    ("channel_videos", [("channel_id", 1), ("published_at", -1)], {}),
+]
+
+# Global indexes superseded by the per-tenant ones above
+STALE_MONGO_INDEXES = [
+    ("connected_channels", "channel_id_1"),
+    ("connected_channels", "is_primary_1"),
+]
+
+# Collections whose documents predate tenancy and belong to the default tenant
+TENANT_COLLECTIONS = ["connected_channels", "generated_scripts", "video_ideas"]
+
+warmup_state = {"ready": False, "steps": {}}
+
+async def warm_up_step(name, func):
+    """Run one warm-up step, recording its duration and outcome for /health/ready"""
+    start = time.perf_counter()
+    try:
+        detail = await func()
+        outcome = {"ok": True, "detail": detail}
+    except asyncio.CancelledError:
+        outcome = {"ok": False, "detail": "timed out"}
+        raise
+    except Exception as e:
+        logger.warning("Warm-up step %s failed: %s", name, e)
+        outcome = {"ok": False, "detail": str(e)}
+    finally:
+        elapsed = time.perf_counter() - start
+        WARMUP_STEP_DURATION.set(name, value=elapsed)
+        warmup_state["steps"][name] = dict(outcome, ms=round(elapsed * 1000, 1))
+
+async def wait_for_mongo():
+    """Ping Mongo until it answers, which also opens the first pooled connection.
+
+    Retries forever: this step runs before, not under, WARMUP_TIMEOUT_SECONDS,
+    so the worker stays unready for as long as Mongo is unreachable.
+    """
+    delay = 0.5
+    while True:
+        try:
+            await db.command('ping')
+            return "pong"
+        except Exception as e:
+            logger.warning("Mongo not reachable yet (%s); retrying in %.1fs", e, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+
+async def backfill_tenants():
+    """Assign documents written before tenancy to the default tenant"""
+    updated = 0
+    for collection in TENANT_COLLECTIONS:
+        result = await db[collection].update_many(
+            {"user_id": {"$exists": False}}, {"$set": {"user_id": DEFAULT_USER_ID}}
+        )
+        updated += result.modified_count
+    return f"{updated} documents"
+
+async def backfill_watchers():
+    """Count the watchers of channels added to watchlists before watched_channels tracked them"""
+    channels = await db.watched_channels.find({"watchers": {"$exists": False}}, {"_id": 1}).to_list(None)
+    for channel in channels:
+        watchers = await db.competitor_watchlist.count_documents({"channel_id": channel["_id"]})
+        await db.watched_channels.update_one(
+            {"_id": channel["_id"], "watchers": {"$exists": False}}, {"$set": {"watchers": watchers}}
+        )
+    return f"{len(channels)} channels"
+
+async def repair_primary_channels():
+    """Leave each tenant one primary channel (its earliest connected) so the unique index can build"""
+    duplicates = await db.connected_channels.aggregate([
+        {"$match": {"is_primary": True}},
+        {"$sort": {"connected_at": 1}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}, "channel_ids": {"$push": "$channel_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]).to_list(None)
+    for tenant_primaries in duplicates:
+        await db.connected_channels.update_many(
+            {"user_id": tenant_primaries["_id"], "channel_id": {"$in": tenant_primaries["channel_ids"][1:]}},
+            {"$set": {"is_primary": False}}
+        )
+        logger.warning("Demoted %d extra primary channels of %s", tenant_primaries["count"] - 1, tenant_primaries["_id"])
+    # Markers left by switches that ran before they were cleared after use
+    await db.connected_channels.update_many(
+        {"primary_switch_id": {"$exists": True}}, {"$unset": {"primary_switch_id": ""}}
+    )
+    return len(duplicates)
+
+async def create_indexes():
+    await drop_indexes(db, STALE_MONGO_INDEXES)
+    await repair_primary_channels()
+    failed = await ensure_indexes(db, MONGO_INDEXES)
+    return f"{len(MONGO_INDEXES) - failed}/{len(MONGO_INDEXES)} indexes"
+
+async def preload_trending_charts():
+    variants = sorted(await known_topic_variants())
+    results = await asyncio.gather(
+        *(fetch_most_popular(region, category) for region, category in variants), return_exceptions=True
+    )
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        raise failures[0]
+    return f"{len(variants)} charts"
+
+async def preload_dashboards():
+    channels = await db.connected_channels.find({"is_primary": True}).to_list(WARMUP_MAX_DASHBOARDS)
+    for channel in channels:
+        await dashboard_cache.get_or_load(
+            (channel.get("user_id", DEFAULT_USER_ID), channel['channel_id']),
+            lambda channel=channel: build_dashboard(channel), ttl=dashboard_ttl
+        )
+    return f"{len(channels)} dashboards"
+
+async def preload_velocity():
+    return f"{await reload_video_velocity()} videos"
+
+async def preload_semantic_cache():
+    return f"{await semantic_cache.preload()} namespaces"
+
+async def start_background_jobs():
+    """Start the periodic jobs and the script job workers, once Mongo is up and indexed"""
+    for job in (
+        trending_topics_refresh_job, trending_topics_reload_job, trending_snapshot_job, velocity_reload_job,
+        competitor_watch_job, catalog_sync_job, quota_sync_job,
+    ):
+        job.start()
+    try:
+        await reload_trending_topics()
+    except Exception as e:
+        logger.warning("Could not load trending topic snapshots at startup: %s", e)
+    await script_jobs.start()
+    return "started"
+
+async def warm_up_worker():
+    """Connect to Mongo, ensure indexes, start background jobs and fill hot caches, then mark the worker ready.
+
+    Static payloads (courses, community) are encoded at import and the YouTube
+    client is built there too; preloading the charts opens its first connection.
+    """
+    start = time.perf_counter()
+    await warm_up_step("mongo", wait_for_mongo)
+    # Backfill first so the per-tenant unique indexes see every document
+    await warm_up_step("tenant_backfill", backfill_tenants)
+    await warm_up_step("watchers_backfill", backfill_watchers)
+    await warm_up_step("indexes", create_indexes)
+    await warm_up_step("background_jobs", start_background_jobs)
+    if WARMUP_PRELOAD:
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                warm_up_step("trending_charts", preload_trending_charts),
+                warm_up_step("dashboards", preload_dashboards),
+                warm_up_step("semantic_cache", preload_semantic_cache),
+                warm_up_step("velocity", preload_velocity),
+            ), WARMUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up preloading exceeded %ss; serving with partially warm caches", WARMUP_TIMEOUT_SECONDS)
+    warmup_state["ready"] = True
+    WORKER_READY.set(value=1)
+    logger.info("Worker ready after %.2fs warm-up", time.perf_counter() - start)
+
+@app.on_event("startup")
+async def start_event_loop_monitor():
+    app.state.loop_lag_task = asyncio.create_task(monitor_event_loop_lag())
+
+@app.on_event("startup")
+async def start_span_exporter():
+    span_exporter.start()
+
+@app.on_event("startup")
+async def start_blocking_detector():
+    if LOOP_BLOCKING_DETECTOR:
+        blocking_detector.start(asyncio.get_running_loop())
+
+@app.on_event("startup")
+async def start_cache_invalidation():
+    cache_invalidator.start()
+
+@app.on_event("startup")
+async def start_warm_up():
+    WORKER_READY.set(value=0)
+    app.state.warmup_task = asyncio.create_task(warm_up_worker())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    app.state.loop_lag_task.cancel()
+    app.state.warmup_task.cancel()
+    await script_jobs.stop()
+    await cache_invalidator.stop()
+    await trending_topics_refresh_job.stop()
+    await trending_topics_reload_job.stop()
+    await trending_snapshot_job.stop()
+    await velocity_reload_job.stop()
+    await competitor_watch_job.stop()
+    await catalog_sync_job.stop()
+    await quota_sync_job.stop()
+    try:
+        # Hand this worker's last spend to the others
+        await youtube_quota.sync()
+    except Exception as e:
+        logger.warning("Final quota sync failed: %s", e)
+    span_exporter.stop()
+    blocking_detector.stop()
+    client.close()
+    shutdown_logging()
\ No newline at end of file
@@ -0,0 +1,367 @@
+"""Near-duplicate matching of free-text topics, for reusing LLM answers.
+
+Topics are reduced to normalized tokens (lowercased, stop words dropped,
+plurals folded so "tip" and "tips" coincide) plus their character trigrams
+for spelling variants. A MinHash signature over those features is banded
+into an LSH index to find candidates in constant time; an index of word
+prefixes adds the candidates an abbreviation would miss there. Each
+candidate is then scored twice: the share of words that match one-to-one,
+where a word only matches itself, its plural, a one-letter typo of it or a
+word it abbreviates ("crypto" for "cryptocurrency"), and the exact Jaccard
+similarity of the feature sets once abbreviations are spelled out. The lower
+score is the confidence reported to callers, so topics that merely share a
+stem ("investing" and "investigation", "marketing" and "market") don't
+match. Numbers must match exactly, so "phones 2024" never answers for
+"phones 2025". Everything is computed locally.
+
+``SemanticCache`` keeps one index per namespace in memory, backed by a
+Mongo collection so answers survive restarts. Each index picks up entries
+other workers stored once it is older than ``SEMANTIC_CACHE_REFRESH_SECONDS``.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.75'))
+SEMANTIC_CACHE_TTL_HOURS = float(os.environ.get('SEMANTIC_CACHE_TTL_HOURS', '168'))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', '5000'))
+SEMANTIC_CACHE_REFRESH_SECONDS = float(os.environ.get('SEMANTIC_CACHE_REFRESH_SECONDS', '30'))
+
+# Words shorter than this must be spelled exactly to match, and can't abbreviate another
+TYPO_MIN_LENGTH = 5
+# An abbreviation must share this much of the full word's trigrams, and counts as this much of a match
+PREFIX_MIN_TRIGRAM_JACCARD = 0.3
+PREFIX_MATCH_WEIGHT = 0.9
+# Endings that make a different word of the same stem rather than spell out an abbreviation
+DERIVATION_SUFFIXES = frozenset({
+    'al', 'ally', 'ation', 'ations', 'ed', 'er', 'ers', 'ing', 'ings', 'ion', 'ions',
+    'ism', 'ist', 'ists', 'ity', 'ive', 'ly', 'ment', 'ments', 'ness',
+})
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'but', 'for', 'to', 'of', 'in', 'on', 'at', 'by', 'with',
+    'about', 'from', 'into', 'is', 'are', 'be', 'how', 'what', 'why', 'when', 'your', 'my',
+    'you', 'i', 'it', 'its', 'this', 'that', 'vs', 'video', 'videos',
+})
+
+# "video" is filler in a keyword list but not in a topic: "cat videos" is not "cats"
+MATCH_STOP_WORDS = STOP_WORDS - {'video', 'videos'}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def singular(token):
+    """``token`` with a plural ending folded away"""
+    if token.isdigit() or len(token) <= 3:
+        return token
+    if token.endswith('ies') and len(token) > 4:
+        return token[:-3] + 'y'
+    if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def normalize_tokens(text):
+    """Lowercased content tokens with plurals folded"""
+    return [singular(token) for token in _TOKEN_RE.findall(text.lower()) if token not in MATCH_STOP_WORDS]
+
+
+def within_one_edit(a, b):
+    """True if ``a`` and ``b`` differ by at most one inserted, deleted or substituted letter"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+        else:
+            i += 1
+        j += 1
+    return edits + (len(b) - j) <= 1
+
+
+def trigrams(token):
+    padded = f'^{token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def abbreviates(a, b):
+    """True if one word abbreviates the other by its leading letters, like crypto and cryptocurrency"""
+    short, full = (a, b) if len(a) < len(b) else (b, a)
+    return (
+        len(short) >= TYPO_MIN_LENGTH
+        and full.startswith(short)
+        and full[len(short):] not in DERIVATION_SUFFIXES
+        and jaccard(trigrams(short), trigrams(full)) >= PREFIX_MIN_TRIGRAM_JACCARD
+    )
+
+
+def word_similarity(a, b):
+    """1 for the same word (up to a typo), PREFIX_MATCH_WEIGHT for an abbreviation, else 0"""
+    if a == b:
+        return 1.0
+    if a.isdigit() or b.isdigit() or min(len(a), len(b)) < TYPO_MIN_LENGTH:
+        return 0.0
+    if within_one_edit(a, b):
+        return 1.0
+    return PREFIX_MATCH_WEIGHT if abbreviates(a, b) else 0.0
+
+
+def word_overlap(a, b):
+    """Share of words pairing up one-to-one, over the longer of two token lists.
+
+    Returned with ``a`` rewritten to spell out the words it abbreviates as ``b`` does.
+    """
+    if not a and not b:
+        return 1.0, a
+    remaining = list(b)
+    matched = 0.0
+    aligned = []
+    for word in a:
+        for i, other in enumerate(remaining):
+            similarity = word_similarity(word, other)
+            if similarity:
+                matched += similarity
+                aligned.append(word if similarity == 1.0 else other)
+                del remaining[i]
+                break
+        else:
+            aligned.append(word)
+    return matched / max(len(a), len(b)), aligned
+
+
+def features(tokens):
+    """Tokens plus boundary-padded character trigrams of the non-numeric ones"""
+    result = set(tokens)
+    for token in tokens:
+        if not token.isdigit():
+            result.update(trigrams(token))
+    return result
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), 'little')
+
+
+# Fixed 32-bit coefficients, so signatures are identical across processes and
+# products of a 32-bit hash never overflow uint64
+_PERM_A = np.array([_hash(f'a{i}') | 1 for i in range(NUM_PERMUTATIONS)], dtype=np.uint64)
+_PERM_B = np.array([_hash(f'b{i}') for i in range(NUM_PERMUTATIONS)], dtype=np.uint64)
+
+
+def minhash(feature_set):
+    """MinHash signature of a feature set"""
+    if not feature_set:
+        return (_MAX_HASH,) * NUM_PERMUTATIONS
+    hashes = np.fromiter((_hash(feature) for feature in feature_set), dtype=np.uint64, count=len(feature_set))
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % np.uint64(_MERSENNE_PRIME)
+    return tuple((permuted.min(axis=1) & np.uint64(_MAX_HASH)).tolist())
+
+
+class _Entry:
+    __slots__ = ('text', 'tokens', 'features', 'numbers', 'signature', 'result', 'created_at')
+
+    def __init__(self, text, result, created_at):
+        tokens = normalize_tokens(text)
+        self.text = text
+        self.tokens = tokens
+        self.features = features(tokens)
+        self.numbers = frozenset(token for token in tokens if token.isdigit())
+        self.signature = minhash(self.features)
+        self.result = result
+        self.created_at = created_at
+
+
+class SimilarityIndex:
+    """MinHash LSH index over topic texts, bounded to the most recent entries"""
+
+    def __init__(self, max_entries=SEMANTIC_CACHE_MAX_ENTRIES, bands=LSH_BANDS):
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = NUM_PERMUTATIONS // bands
+        self._entries = OrderedDict()
+        self._buckets = {}
+        # Leading TYPO_MIN_LENGTH letters of each word -> keys, for abbreviations LSH misses
+        self._prefixes = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, key, text, result, created_at=None):
+        if key in self._entries:
+            self.remove(key)
+        entry = _Entry(text, result, created_at or datetime.utcnow())
+        self._entries[key] = entry
+        for band_key in self._band_keys(entry.signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+        for prefix in {token[:TYPO_MIN_LENGTH] for token in entry.tokens}:
+            self._prefixes.setdefault(prefix, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+        for prefix in {token[:TYPO_MIN_LENGTH] for token in entry.tokens}:
+            keys = self._prefixes.get(prefix)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._prefixes[prefix]
+
+    def query(self, text, threshold=SEMANTIC_CACHE_THRESHOLD, not_before=None, accept=None):
+        """Best ``(key, entry, score)`` at or above ``threshold``, or None"""
+        tokens = normalize_tokens(text)
+        query_features = features(tokens)
+        numbers = frozenset(token for token in tokens if token.isdigit())
+        candidates = set()
+        for band_key in self._band_keys(minhash(query_features)):
+            candidates |= self._buckets.get(band_key, set())
+        # Words matching exactly, by plural or as an abbreviation share their leading letters
+        shared = {}
+        for prefix in {token[:TYPO_MIN_LENGTH] for token in tokens}:
+            for key in self._prefixes.get(prefix, ()):
+                shared[key] = shared.get(key, 0) + 1
+        candidates.update(
+            key for key, count in shared.items()
+            if count >= threshold * max(len(tokens), len(self._entries[key].tokens))
+        )
+
+        best = None
+        for key in candidates:
+            entry = self._entries[key]
+            if entry.numbers != numbers:
+                continue
+            if not_before and entry.created_at < not_before:
+                continue
+            if accept and not accept(entry.result):
+                continue
+            score, aligned = word_overlap(tokens, entry.tokens)
+            if score < threshold:
+                continue
+            aligned_features = features(aligned) if aligned != tokens else query_features
+            score = min(score, jaccard(aligned_features, entry.features))
+            if score >= threshold and (best is None or score > best[2]):
+                best = (key, entry, score)
+        return best
+
+
+class SemanticCache:
+    """Per-namespace similarity indexes persisted to a Mongo collection"""
+
+    def __init__(self, get_collection, threshold=SEMANTIC_CACHE_THRESHOLD, ttl_hours=SEMANTIC_CACHE_TTL_HOURS):
+        self.get_collection = get_collection
+        self.threshold = threshold
+        self.ttl = timedelta(hours=ttl_hours)
+        self._indexes = {}
+        # namespace -> (monotonic time of the last read, newest created_at read)
+        self._synced = {}
+        self._locks = {}
+
+    async def _index(self, namespace):
+        index = self._indexes.get(namespace)
+        synced = self._synced.get(namespace)
+        if index is not None and time.monotonic() - synced[0] < SEMANTIC_CACHE_REFRESH_SECONDS:
+            return index
+        lock = self._locks.setdefault(namespace, asyncio.Lock())
+        if index is not None and lock.locked():
+            # Another request is already refreshing; the current index will do
+            return index
+        async with lock:
+            index = self._indexes.get(namespace)
+            synced = self._synced.get(namespace)
+            if index is not None and time.monotonic() - synced[0] < SEMANTIC_CACHE_REFRESH_SECONDS:
+                return index
+            since = datetime.utcnow() - self.ttl
+            if index is not None:
+                since = max(since, synced[1])
+            docs = await self.get_collection().find(
+                {'namespace': namespace, 'created_at': {'$gte': since}},
+                {'_id': 0, 'key': 1, 'text': 1, 'result': 1, 'created_at': 1},
+            ).sort('created_at', 1).to_list(SEMANTIC_CACHE_MAX_ENTRIES)
+            if index is None:
+                # Signing thousands of entries takes long enough to stall the loop
+                index = await asyncio.to_thread(self._build, docs)
+            else:
+                # A handful of new entries; added here since queries read the index concurrently
+                self._build(docs, index)
+            newest = docs[-1]['created_at'] if docs else (synced[1] if synced else since)
+            self._indexes[namespace] = index
+            self._synced[namespace] = (time.monotonic(), newest)
+        return index
+
+    @staticmethod
+    def _build(docs, index=None):
+        index = index if index is not None else SimilarityIndex()
+        for doc in docs:
+            index.add(doc['key'], doc['text'], doc['result'], doc['created_at'])
+        return index
+
+    async def lookup(self, namespace, text, accept=None):
+        """Return ``(result, confidence, matched_text)`` for a similar enough topic, or None"""
+        index = await self._index(namespace)
+        match = index.query(text, self.threshold, datetime.utcnow() - self.ttl, accept)
+        if match is None:
+            return None
+        _, entry, score = match
+        return entry.result, round(score, 3), entry.text
+
+    async def store(self, namespace, text, result):
+        key = ' '.join(sorted(set(normalize_tokens(text)))) or text.strip().lower()
+        now = datetime.utcnow()
+        (await self._index(namespace)).add(key, text, result, now)
+        await self.get_collection().update_one(
+            {'namespace': namespace, 'key': key},
+            {'$set': {'text': text, 'result': result, 'created_at': now}},
+            upsert=True,
+        )
+
+    async def preload(self):
+        """Build the index of every namespace with live entries"""
+        namespaces = await self.get_collection().distinct(
+            'namespace', {'created_at': {'$gte': datetime.utcnow() - self.ttl}}
+        )
+        for namespace in namespaces:
+            await self._index(namespace)
+        return len(namespaces)
+
+    def clear(self, namespace=None):
+        """Drop in-memory indexes so they reload from Mongo on next use"""
+        if namespace is None:
+            self._indexes.clear()
+            self._synced.clear()
+        else:
+            self._indexes.pop(namespace, None)
+            self._synced.pop(namespace, None)
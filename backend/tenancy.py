@@ -0,0 +1,34 @@
+"""Per-request tenant identity.
+
+Every API request runs on behalf of a tenant (a creator account) named by
+the ``X-User-ID`` header, which the auth proxy in front of the API sets.
+Requests without it belong to ``DEFAULT_USER_ID``, which also owns data
+written before tenancy existed. The tenant is kept in a context variable so
+code far from the endpoint (YouTube quota accounting) can attribute work
+without having it passed down.
+"""
+import contextvars
+import os
+import re
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+DEFAULT_USER_ID = os.environ.get('DEFAULT_USER_ID', 'default_user')
+
+_USER_ID_RE = re.compile(r'^[A-Za-z0-9_.:@-]{1,64}$')
+_current_tenant = contextvars.ContextVar('current_tenant', default=None)
+
+
+def current_tenant():
+    """Tenant of the request being handled, or None outside a request"""
+    return _current_tenant.get()
+
+
+async def tenant(x_user_id: Optional[str] = Header(default=None)):
+    """FastAPI dependency resolving the request's tenant and recording it for the request"""
+    user_id = x_user_id.strip() if x_user_id else DEFAULT_USER_ID
+    if not _USER_ID_RE.match(user_id):
+        raise HTTPException(status_code=400, detail="Invalid X-User-ID header")
+    _current_tenant.set(user_id)
+    return user_id
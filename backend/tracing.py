@@ -0,0 +1,298 @@
+"""Lightweight per-request tracing for the CreatorHub API.
+
+Each HTTP request gets a request ID and a root span; code under it opens
+nested spans with ``span(name)``. Finished traces are handed to a background
+thread that appends them as JSONL (for offline analysis) and/or posts them
+to an OTLP/HTTP collector, so exporting never blocks the event loop. A
+``Server-Timing`` header summarising span durations can be attached to
+responses.
+
+Tracing is off unless ``TRACING_ENABLED`` is set; when off, ``span()``
+returns a shared no-op context manager.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', '1.0'))
+TRACING_JSONL_PATH = os.environ.get('TRACING_JSONL_PATH', '')
+TRACING_OTLP_ENDPOINT = os.environ.get('TRACING_OTLP_ENDPOINT', '')
+TRACING_SERVER_TIMING = os.environ.get('TRACING_SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+SERVICE_NAME = os.environ.get('TRACING_SERVICE_NAME', 'creatorhub-backend')
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start_ns', 'end_ns', 'error', '_token')
+
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = None
+        self._token = None
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+        return False
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace.trace_id,
+            'request_id': self.trace.request_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+
+
+def current_request_id():
+    """Request ID of the trace active in this context, if any"""
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def span(name, **attributes):
+    """Open a child span of the current span (no-op outside a traced request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    parent = _current_span.get()
+    return Span(trace, name, parent.span_id if parent else None, attributes)
+
+
+def server_timing_header(trace):
+    """Summarise span durations by name for a Server-Timing header"""
+    totals = {}
+    for finished in trace.spans:
+        if finished.parent_id is None:
+            continue
+        metric = finished.name.replace(' ', '_').replace(';', '_').replace(',', '_')
+        total, count = totals.get(metric, (0.0, 0))
+        totals[metric] = (total + finished.duration_ms, count + 1)
+    return ', '.join(
+        f'{metric};dur={total:.1f};desc="{count}x"' for metric, (total, count) in totals.items()
+    )
+
+
+def _otlp_payload(spans):
+    def attr(key, value):
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    otlp_spans = []
+    for item in spans:
+        attributes = dict(item['attributes'], **{'request.id': item['request_id']})
+        otlp_span = {
+            'traceId': item['trace_id'],
+            'spanId': item['span_id'],
+            'name': item['name'],
+            'kind': 2 if item['parent_id'] is None else 1,
+            'startTimeUnixNano': str(item['start_ns']),
+            'endTimeUnixNano': str(item['start_ns'] + int(item['duration_ms'] * 1e6)),
+            'attributes': [attr(k, v) for k, v in attributes.items()],
+            'status': {'code': 2, 'message': item['error']} if item['error'] else {'code': 1},
+        }
+        if item['parent_id']:
+            otlp_span['parentSpanId'] = item['parent_id']
+        otlp_spans.append(otlp_span)
+
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [attr('service.name', SERVICE_NAME)]},
+            'scopeSpans': [{'scope': {'name': 'creatorhub'}, 'spans': otlp_spans}],
+        }]
+    }
+
+
+class SpanExporter:
+    """Background thread that batches finished spans to JSONL and/or OTLP"""
+
+    def __init__(self, jsonl_path=TRACING_JSONL_PATH, otlp_endpoint=TRACING_OTLP_ENDPOINT,
+                 max_queue=10000, batch_size=256, flush_interval=1.0):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.otlp_url = otlp_endpoint.rstrip('/') + '/v1/traces' if otlp_endpoint else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.jsonl_path is not None or self.otlp_url is not None
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        if self.jsonl_path:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def export(self, trace):
+        if self._thread is None:
+            return
+        for finished in trace.spans:
+            try:
+                self._queue.put_nowait(finished.to_dict())
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ...
+            if item is None:
+                self._flush(batch)
+                return
+            if item is not ...:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        if self.jsonl_path:
+            try:
+                with self.jsonl_path.open('a', encoding='utf-8') as fh:
+                    for item in batch:
+                        fh.write(json.dumps(item, default=str) + '\n')
+            except OSError as e:
+                logger.warning("Failed to write spans to %s: %s", self.jsonl_path, e)
+        if self.otlp_url:
+            request = urllib.request.Request(
+                self.otlp_url,
+                data=json.dumps(_otlp_payload(batch), default=str).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method='POST',
+            )
+            try:
+                urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                logger.warning("Failed to export spans to %s: %s", self.otlp_url, e)
+
+
+exporter = SpanExporter()
+
+
+class TracingMiddleware:
+    """Start a trace per HTTP request and tag the response with its request ID"""
+
+    def __init__(self, app, enabled=TRACING_ENABLED, server_timing=TRACING_SERVER_TIMING,
+                 sample_rate=TRACING_SAMPLE_RATE):
+        self.app = app
+        self.enabled = enabled
+        self.server_timing = server_timing
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.enabled or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get('x-request-id') or uuid.uuid4().hex
+        trace = Trace(request_id)
+        trace_token = _current_trace.set(trace)
+        root = Span(trace, f"{scope['method']} {scope['path']}", None, {'http.method': scope['method']})
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers['X-Request-ID'] = request_id
+                if self.server_timing:
+                    summary = server_timing_header(trace)
+                    if summary:
+                        headers['Server-Timing'] = summary
+                root.set_attribute('http.status_code', message['status'])
+            await send(message)
+
+        try:
+            with root:
+                await self.app(scope, receive, send_with_headers)
+        finally:
+            route = scope.get('route')
+            if route is not None:
+                root.set_attribute('http.route', route.path)
+            _current_trace.reset(trace_token)
+            exporter.export(trace)
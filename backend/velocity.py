@@ -0,0 +1,129 @@
+"""View velocity of trending videos from periodic snapshots.
+
+Each snapshot run observes a set of videos (view count plus chart rank per
+"REGION:category" chart; tracked videos off the charts have no ranks).
+Observations are appended to a compact history collection keyed by
+(video_id, ts), and each video's running state (last views, views per hour,
+acceleration, rank movement, score) is updated from its previous state
+alone, so a run costs one read and two writes however long the history
+grows.
+
+``VelocityTracker`` keeps the latest states in memory for serving, reloaded
+from Mongo so every worker sees the runs whichever worker took them.
+"""
+import math
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo import ReplaceOne
+
+VELOCITY_MAX_TRACKED = int(os.environ.get('VELOCITY_MAX_TRACKED', '5000'))
+# Observations closer together than this are too noisy to derive a rate from
+VELOCITY_MIN_INTERVAL_MINUTES = float(os.environ.get('VELOCITY_MIN_INTERVAL_MINUTES', '10'))
+
+
+def velocity_score(views_per_hour, acceleration, rank_change):
+    """0-100 score: mostly the (log-scaled) view rate, nudged by acceleration and chart movement.
+
+    1M views/hour saturates the rate part at 80; relative acceleration and the
+    best rank climb across charts each add or remove up to 10.
+    """
+    base = 80 * min(1.0, math.log10(1 + max(views_per_hour, 0)) / 6)
+    accel_bonus = 10 * math.tanh(acceleration / max(views_per_hour, 1)) if acceleration is not None else 0
+    climb = max(rank_change.values()) if rank_change else 0
+    rank_bonus = 10 * math.tanh(climb / 10)
+    return round(min(100, max(0, base + accel_bonus + rank_bonus)))
+
+
+def next_state(previous, ts, views, ranks):
+    """The video's state after observing ``views`` and ``ranks`` at ``ts``"""
+    state = {'ts': ts, 'views': views, 'ranks': ranks, 'first_seen': ts}
+    if previous is None:
+        return state
+    state['first_seen'] = previous.get('first_seen', previous['ts'])
+
+    hours = (ts - previous['ts']).total_seconds() / 3600
+    if hours <= 0:
+        # Same snapshot minute (or clock skew): nothing to derive a rate from
+        return previous
+    views_per_hour = max(0, views - previous['views']) / hours
+    previous_rate = previous.get('views_per_hour')
+    acceleration = (views_per_hour - previous_rate) / hours if previous_rate is not None else None
+    # Positive when the video climbed; only charts it was on both times
+    rank_change = {
+        chart: previous['ranks'][chart] - rank
+        for chart, rank in ranks.items() if chart in previous.get('ranks', {})
+    }
+    state.update(
+        views_per_hour=round(views_per_hour, 1),
+        acceleration=round(acceleration, 2) if acceleration is not None else None,
+        rank_change=rank_change,
+        velocity_score=velocity_score(views_per_hour, acceleration, rank_change),
+    )
+    return state
+
+
+class VelocityTracker:
+    def __init__(self, get_state_collection, get_snapshot_collection, max_tracked=VELOCITY_MAX_TRACKED):
+        self.get_state_collection = get_state_collection
+        self.get_snapshot_collection = get_snapshot_collection
+        self.max_tracked = max_tracked
+        self._states = OrderedDict()
+
+    def get(self, video_id):
+        """Latest state of a tracked video, or None"""
+        return self._states.get(video_id)
+
+    def _remember(self, video_id, state):
+        self._states[video_id] = state
+        self._states.move_to_end(video_id)
+        while len(self._states) > self.max_tracked:
+            self._states.popitem(last=False)
+
+    async def record(self, ts, observations):
+        """Apply one snapshot run: ``observations`` maps video_id to (views, {chart: rank})"""
+        if not observations:
+            return 0
+        states = self.get_state_collection()
+        # Previous states come from Mongo: the last run may have been taken by another worker
+        previous = {
+            doc['_id']: doc for doc in
+            await states.find({'_id': {'$in': list(observations)}}).to_list(len(observations))
+        }
+        min_interval = timedelta(minutes=VELOCITY_MIN_INTERVAL_MINUTES)
+        snapshots, writes = [], []
+        for video_id, (views, ranks) in observations.items():
+            before = previous.get(video_id)
+            # A non-advancing ts would also collide with the (video_id, ts) snapshot key
+            if before is not None and (ts <= before['ts'] or ts - before['ts'] < min_interval):
+                continue
+            state = next_state(before, ts, views, ranks)
+            snapshots.append({'video_id': video_id, 'ts': ts, 'views': views, 'ranks': ranks})
+            writes.append(ReplaceOne({'_id': video_id}, state, upsert=True))
+            self._remember(video_id, state)
+        if writes:
+            await self.get_snapshot_collection().insert_many(snapshots, ordered=False)
+            await states.bulk_write(writes, ordered=False)
+        return len(writes)
+
+    async def reload(self, since):
+        """Load states updated since ``since`` into memory"""
+        docs = await self.get_state_collection().find(
+            {'ts': {'$gte': since}}
+        ).sort('ts', 1).to_list(self.max_tracked)
+        for doc in docs:
+            self._remember(doc.pop('_id'), doc)
+        return len(docs)
+
+    async def history(self, video_id, limit=100):
+        """Most recent snapshots of a video, oldest first"""
+        docs = await self.get_snapshot_collection().find(
+            {'video_id': video_id}, {'_id': 0, 'video_id': 0}
+        ).sort('ts', -1).to_list(limit)
+        return docs[::-1]
+
+
+def utcnow_minute():
+    """Current UTC time truncated to the minute, a shared ts for one snapshot run"""
+    return datetime.utcnow().replace(second=0, microsecond=0)
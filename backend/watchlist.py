@@ -0,0 +1,87 @@
+"""Upload detection for watched competitor channels.
+
+Each watched channel is polled through its uploads playlist
+(``playlistItems.list``, 1 quota unit a page, newest first) rather than
+``search.list`` at 100 units. A high-water mark, the newest publish time seen
+plus the video ids published at that instant, lets a poll stop paging as soon
+as it reaches videos it already knows, so only new uploads are hydrated.
+
+How often a channel is polled follows how often it uploads: a few polls per
+typical gap between its recent uploads, clamped to a minimum and maximum.
+"""
+import os
+from datetime import datetime, timedelta
+from statistics import median
+
+WATCHLIST_MIN_POLL_MINUTES = float(os.environ.get('WATCHLIST_MIN_POLL_MINUTES', '15'))
+WATCHLIST_MAX_POLL_HOURS = float(os.environ.get('WATCHLIST_MAX_POLL_HOURS', '24'))
+# Polls per typical gap between a channel's uploads
+WATCHLIST_POLLS_PER_UPLOAD = float(os.environ.get('WATCHLIST_POLLS_PER_UPLOAD', '4'))
+# Recent publish times kept per channel to estimate its upload frequency
+WATCHLIST_UPLOAD_HISTORY = int(os.environ.get('WATCHLIST_UPLOAD_HISTORY', '10'))
+
+
+def parse_published_at(value):
+    """Datetime (naive UTC) from a YouTube RFC 3339 timestamp"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def select_new_uploads(items, high_water):
+    """(new uploads, reached high-water mark) for one page of uploads playlist items.
+
+    New uploads are (video_id, published_at) pairs. Without a high-water mark
+    every item is new and the page counts as the end, so a first poll only
+    takes the latest page.
+    """
+    uploads = []
+    reached = high_water is None
+    for item in items:
+        details = item.get('contentDetails', {})
+        # Private and deleted videos have no publish time
+        if not details.get('videoId') or not details.get('videoPublishedAt'):
+            continue
+        video_id, published_at = details['videoId'], parse_published_at(details['videoPublishedAt'])
+        if high_water is not None and (
+            published_at < high_water['published_at']
+            or (published_at == high_water['published_at'] and video_id in high_water['video_ids'])
+        ):
+            reached = True
+            continue
+        uploads.append((video_id, published_at))
+    return uploads, reached
+
+
+def advance_high_water(high_water, uploads):
+    """High-water mark after ``uploads`` were seen"""
+    if not uploads:
+        return high_water
+    newest = max(published_at for _, published_at in uploads)
+    video_ids = [video_id for video_id, published_at in uploads if published_at == newest]
+    if high_water is not None:
+        if high_water['published_at'] > newest:
+            return high_water
+        if high_water['published_at'] == newest:
+            video_ids = list(dict.fromkeys(high_water['video_ids'] + video_ids))
+    return {'published_at': newest, 'video_ids': video_ids}
+
+
+def merge_upload_times(upload_times, uploads):
+    """Most recent publish times, newest first, capped to the history size"""
+    times = set(upload_times or []) | {published_at for _, published_at in uploads}
+    return sorted(times, reverse=True)[:WATCHLIST_UPLOAD_HISTORY]
+
+
+def poll_interval(upload_times):
+    """How long to wait before polling a channel with these recent publish times"""
+    minimum = timedelta(minutes=WATCHLIST_MIN_POLL_MINUTES)
+    maximum = timedelta(hours=WATCHLIST_MAX_POLL_HOURS)
+    if len(upload_times) < 2:
+        return maximum
+    gaps = [newer - older for newer, older in zip(upload_times, upload_times[1:])]
+    return min(maximum, max(minimum, median(gaps) / WATCHLIST_POLLS_PER_UPLOAD))
+
+
+def error_backoff(error_count):
+    """Delay before retrying a channel whose last ``error_count`` polls failed"""
+    delay = timedelta(minutes=WATCHLIST_MIN_POLL_MINUTES) * 2 ** min(error_count, 10)
+    return min(delay, timedelta(hours=WATCHLIST_MAX_POLL_HOURS))
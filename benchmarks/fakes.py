@@ -0,0 +1,844 @@
+"""Local stand-ins for YouTube, the LLM provider and MongoDB.
+
+Used by the benchmark harness to boot ``backend/server.py`` on a machine
+without network access or a running mongod. Latencies are configurable so
+that load tests exercise the same waiting patterns as production.
+"""
+import asyncio
+import copy
+import json
+import re
+import sys
+import time
+import types
+from pathlib import Path
+
+from bson import ObjectId
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult,
+)
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+
+# ---------------------------------------------------------------------------
+# YouTube Data API
+# ---------------------------------------------------------------------------
+
+class FakeYouTubeRequest:
+    """Mimics ``googleapiclient.http.HttpRequest`` for a recorded response"""
+
+    def __init__(self, api, method_id, params):
+        self.api = api
+        self.methodId = method_id
+        self.params = params
+
+    def execute(self, http=None, num_retries=0):
+        # Blocking sleep on purpose: the real client blocks its thread on I/O
+        time.sleep(self.api.latency)
+        self.api.calls[self.methodId] = self.api.calls.get(self.methodId, 0) + 1
+        return self.api.respond(self.methodId, self.params)
+
+
+class _FakeResource:
+    def __init__(self, api, name):
+        self.api = api
+        self.name = name
+
+    def list(self, **params):
+        return FakeYouTubeRequest(self.api, f'youtube.{self.name}.list', params)
+
+
+class FakeYouTube:
+    """Serves recorded YouTube fixtures with a configurable per-call latency"""
+
+    def __init__(self, fixtures_path=FIXTURES_DIR / 'youtube.json', latency=0.05):
+        with open(fixtures_path, encoding='utf-8') as fh:
+            self.fixtures = json.load(fh)
+        self.latency = latency
+        self.calls = {}
+        self.videos_by_id = {video['id']: video for video in self.fixtures['videos']}
+        self.channels_by_id = {channel['id']: channel for channel in self.fixtures['channels']}
+        self.uploads = {
+            channel['contentDetails']['relatedPlaylists']['uploads']: channel['id']
+            for channel in self.fixtures['channels']
+        }
+
+    def videos(self):
+        return _FakeResource(self, 'videos')
+
+    def search(self):
+        return _FakeResource(self, 'search')
+
+    def channels(self):
+        return _FakeResource(self, 'channels')
+
+    def playlistItems(self):
+        return _FakeResource(self, 'playlistItems')
+
+    @staticmethod
+    def _page(items, params):
+        max_results = int(params.get('maxResults') or 5)
+        offset = int(params.get('pageToken') or 0)
+        page = items[offset:offset + max_results]
+        response = {'items': page, 'pageInfo': {'totalResults': len(items), 'resultsPerPage': max_results}}
+        if offset + max_results < len(items):
+            response['nextPageToken'] = str(offset + max_results)
+        return response
+
+    def _project_parts(self, item, params):
+        parts = set((params.get('part') or 'id').split(','))
+        return {key: value for key, value in item.items() if key in ('id', 'kind', 'etag') or key in parts}
+
+    def respond(self, method_id, params):
+        if method_id == 'youtube.videos.list':
+            if params.get('id'):
+                ids = params['id'].split(',')
+                items = [self.videos_by_id[i] for i in ids if i in self.videos_by_id]
+            else:
+                category = params.get('videoCategoryId')
+                items = [
+                    video for video in self.fixtures['videos']
+                    if not category or video['snippet'].get('categoryId') == category
+                ]
+            page = self._page(items, params if not params.get('id') else dict(params, maxResults=50))
+            page['items'] = [self._project_parts(item, params) for item in page['items']]
+            return page
+
+        if method_id == 'youtube.search.list':
+            if params.get('type') == 'channel':
+                items = [
+                    {'id': {'kind': 'youtube#channel', 'channelId': channel['id']},
+                     'snippet': dict(channel['snippet'], channelId=channel['id'])}
+                    for channel in self.fixtures['channels']
+                ]
+            else:
+                videos = self.fixtures['videos']
+                if params.get('channelId'):
+                    videos = [v for v in videos if v['snippet']['channelId'] == params['channelId']]
+                if params.get('order') == 'date':
+                    videos = sorted(videos, key=lambda v: v['snippet']['publishedAt'], reverse=True)
+                items = [
+                    {'id': {'kind': 'youtube#video', 'videoId': video['id']}, 'snippet': video['snippet']}
+                    for video in videos
+                ]
+            return self._page(items, params)
+
+        if method_id == 'youtube.channels.list':
+            ids = (params.get('id') or '').split(',')
+            items = [self._project_parts(self.channels_by_id[i], params) for i in ids if i in self.channels_by_id]
+            return {'items': items, 'pageInfo': {'totalResults': len(items)}}
+
+        if method_id == 'youtube.playlistItems.list':
+            channel_id = self.uploads.get(params.get('playlistId'))
+            videos = sorted(
+                (v for v in self.fixtures['videos'] if v['snippet']['channelId'] == channel_id),
+                key=lambda v: v['snippet']['publishedAt'], reverse=True,
+            )
+            items = [
+                {
+                    'id': f"PLI{video['id']}",
+                    'snippet': dict(video['snippet'], resourceId={'kind': 'youtube#video', 'videoId': video['id']}),
+                    'contentDetails': {'videoId': video['id'], 'videoPublishedAt': video['snippet']['publishedAt']},
+                }
+                for video in videos
+            ]
+            return self._page(items, params)
+
+        raise NotImplementedError(method_id)
+
+
+# ---------------------------------------------------------------------------
+# LLM provider
+# ---------------------------------------------------------------------------
+
+class StubUserMessage:
+    def __init__(self, text=None, **kwargs):
+        self.text = text
+
+
+class StubLlmChat:
+    """Drop-in for ``emergentintegrations.llm.chat.LlmChat`` with canned replies"""
+
+    latency = 0.2
+
+    def __init__(self, api_key=None, session_id=None, system_message=None, **kwargs):
+        self.session_id = session_id
+        self.system_message = system_message or ''
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        await asyncio.sleep(self.latency)
+        return self.reply(getattr(message, 'text', '') or '')
+
+    def reply(self, prompt):
+        if 'topic_index' in prompt:
+            topics = re.findall(r'^\[(\d+)\] .*\| ideas: (\d+)$', prompt, re.MULTILINE)
+            return json.dumps([
+                {'topic_index': int(index), 'ideas': [self._idea(n) for n in range(int(count))]}
+                for index, count in topics
+            ])
+        if 'JSON array' in prompt:
+            match = re.search(r'Generate (\d+)', prompt)
+            count = int(match.group(1)) if match else 5
+            return 'Here are your ideas:\n' + json.dumps([self._idea(n) for n in range(count)])
+        if 'TITLE:' in prompt:
+            body = '\n'.join(f'[{i}:00] Section {i}: talking points for the benchmark script.' for i in range(12))
+            return f'TITLE: Benchmark Script\n\nHOOK: You will not believe this.\n\nSCRIPT:\n{body}'
+        if 'KEYWORDS:' in prompt:
+            return (
+                'KEYWORDS: ai, automation, productivity, tools, workflow\n'
+                'COMPETITION: 1500\n'
+                'OPTIMAL_LENGTH: 10-12 minutes\n'
+                'TRENDS: Steady growth in tutorial-style content.'
+            )
+        if 'trending topics' in prompt.lower():
+            return '\n'.join(f'Benchmark Topic {i}' for i in range(1, 13))
+        return 'OK'
+
+    @staticmethod
+    def _idea(n):
+        return {
+            'title': f'I Tried Benchmark Idea #{n} for 30 Days',
+            'description': 'A stub idea produced by the benchmark LLM.',
+            'viral_potential': 70 + n % 20,
+            'difficulty': 'Medium',
+            'estimated_views': '100K - 500K',
+            'tags': ['benchmark', 'stub', f'idea{n}'],
+        }
+
+
+def install_llm_stub(latency=0.2):
+    """Register stub ``emergentintegrations.llm.chat`` modules before server import"""
+    StubLlmChat.latency = latency
+    package = types.ModuleType('emergentintegrations')
+    llm = types.ModuleType('emergentintegrations.llm')
+    chat = types.ModuleType('emergentintegrations.llm.chat')
+    chat.LlmChat = StubLlmChat
+    chat.UserMessage = StubUserMessage
+    package.llm = llm
+    llm.chat = chat
+    sys.modules.update({
+        'emergentintegrations': package,
+        'emergentintegrations.llm': llm,
+        'emergentintegrations.llm.chat': chat,
+    })
+
+
+# ---------------------------------------------------------------------------
+# MongoDB
+# ---------------------------------------------------------------------------
+
+_MISSING = object()
+
+
+def _get_path(doc, path):
+    value = doc
+    for part in path.split('.'):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc, path):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _compare(value, op, expected):
+    if op == '$exists':
+        return (value is not _MISSING) == bool(expected)
+    if op == '$in':
+        return value in expected or (isinstance(value, list) and any(v in expected for v in value))
+    if op == '$nin':
+        return not _compare(value, '$in', expected)
+    if op == '$ne':
+        return value != expected and not (isinstance(value, list) and expected in value)
+    if op == '$eq':
+        return _eq(value, expected)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == '$gt':
+            return value > expected
+        if op == '$gte':
+            return value >= expected
+        if op == '$lt':
+            return value < expected
+        if op == '$lte':
+            return value <= expected
+    except TypeError:
+        return False
+    raise NotImplementedError(f'Query operator {op} is not supported by the fake')
+
+
+def _eq(value, expected):
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+            value = _get_path(doc, key)
+            if not all(_compare(value, op, expected) for op, expected in condition.items()):
+                return False
+        elif not _eq(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != '_id'}
+    if include:
+        projected = {}
+        for field in include:
+            value = _get_path(doc, field)
+            if value is not _MISSING:
+                _set_path(projected, field, value)
+        if projection.get('_id', 1) and '_id' in doc:
+            projected['_id'] = doc['_id']
+        return projected
+    for field, flag in projection.items():
+        if not flag:
+            _unset_path(doc, field)
+    return doc
+
+
+def _sort(docs, spec):
+    for field, direction in reversed(spec):
+        docs.sort(
+            key=lambda d: (_get_path(d, field) in (_MISSING, None), _sortable(_get_path(d, field))),
+            reverse=direction < 0,
+        )
+    return docs
+
+
+def _sortable(value):
+    if value is _MISSING or value is None:
+        return ''
+    return value
+
+
+def _apply_update(doc, update, inserting=False):
+    if not any(key.startswith('$') for key in update):
+        preserved = doc.get('_id')
+        doc.clear()
+        doc.update(copy.deepcopy(update))
+        if preserved is not None:
+            doc['_id'] = preserved
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            current = _get_path(doc, path)
+            if op == '$set':
+                _set_path(doc, path, copy.deepcopy(value))
+            elif op == '$setOnInsert':
+                if inserting:
+                    _set_path(doc, path, copy.deepcopy(value))
+            elif op == '$unset':
+                _unset_path(doc, path)
+            elif op == '$inc':
+                _set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == '$max':
+                if current is _MISSING or value > current:
+                    _set_path(doc, path, value)
+            elif op == '$min':
+                if current is _MISSING or value < current:
+                    _set_path(doc, path, value)
+            elif op == '$push':
+                items = [] if current is _MISSING else current
+                if isinstance(value, dict) and '$each' in value:
+                    items.extend(value['$each'])
+                    if '$slice' in value:
+                        limit = value['$slice']
+                        items = items[limit:] if limit < 0 else items[:limit]
+                else:
+                    items.append(value)
+                _set_path(doc, path, items)
+            elif op == '$addToSet':
+                items = [] if current is _MISSING else current
+                if value not in items:
+                    items.append(value)
+                _set_path(doc, path, items)
+            else:
+                raise NotImplementedError(f'Update operator {op} is not supported by the fake')
+
+
+def _seed_from_query(query):
+    doc = {}
+    for key, value in (query or {}).items():
+        if key.startswith('$'):
+            continue
+        if isinstance(value, dict) and any(k.startswith('$') for k in value):
+            if '$eq' in value:
+                _set_path(doc, key, value['$eq'])
+            continue
+        _set_path(doc, key, copy.deepcopy(value))
+    return doc
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        if isinstance(key, str):
+            self._sort.append((key, direction if direction is not None else 1))
+        else:
+            self._sort.extend(key)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def _results(self):
+        docs = [doc for doc in self.collection.docs if matches(doc, self.query)]
+        if self._sort:
+            docs = _sort(list(docs), self._sort)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(doc, self.projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        results = self._results()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = []
+        # Every collection has the implicit unique _id index
+        self.unique_indexes = [(['_id'], {}, '_id_')]
+
+    # Indexes -------------------------------------------------------------
+
+    async def create_index(self, keys, unique=False, partialFilterExpression=None, name=None, **kwargs):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        fields = [field for field, _ in keys]
+        index_name = name or '_'.join(f'{field}_{direction}' for field, direction in keys)
+        if unique and not any(index[0] == fields for index in self.unique_indexes):
+            self.unique_indexes.append((fields, partialFilterExpression or {}, index_name))
+        return index_name
+
+    async def create_indexes(self, models):
+        names = []
+        for model in models:
+            document = model.document
+            keys = list(document['key'].items())
+            options = {k: v for k, v in document.items() if k != 'key'}
+            names.append(await self.create_index(keys, **options))
+        return names
+
+    async def drop_index(self, name):
+        self.unique_indexes = [index for index in self.unique_indexes if index[2] != name]
+
+    def _check_unique(self, candidate, ignore=None, generated_id=False):
+        for fields, partial, name in self.unique_indexes:
+            if generated_id and fields == ['_id']:
+                continue
+            if not matches(candidate, partial):
+                continue
+            key = [_get_path(candidate, field) for field in fields]
+            for doc in self.docs:
+                if doc is ignore or not matches(doc, partial):
+                    continue
+                if [_get_path(doc, field) for field in fields] == key:
+                    raise DuplicateKeyError(
+                        f'E11000 duplicate key error collection: {self.name} index: {name}',
+                        11000,
+                        {'keyPattern': {field: 1 for field in fields}, 'keyValue': dict(zip(fields, key))},
+                    )
+
+    # Reads ---------------------------------------------------------------
+
+    def find(self, filter=None, projection=None, sort=None, limit=0, skip=0, **kwargs):
+        cursor = FakeCursor(self, filter or {}, projection)
+        if sort:
+            cursor.sort(sort)
+        if limit:
+            cursor.limit(limit)
+        if skip:
+            cursor.skip(skip)
+        return cursor
+
+    async def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {'_id': filter}
+        results = await self.find(filter, projection, sort=sort).limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter, limit=0, **kwargs):
+        await asyncio.sleep(0)
+        count = sum(1 for doc in self.docs if matches(doc, filter))
+        return min(count, limit) if limit else count
+
+    async def estimated_document_count(self, **kwargs):
+        return len(self.docs)
+
+    async def distinct(self, key, filter=None, **kwargs):
+        values = []
+        for doc in self.docs:
+            if matches(doc, filter or {}):
+                value = _get_path(doc, key)
+                if value is not _MISSING and value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        return _FakeAggregation(self, pipeline)
+
+    def watch(self, *args, **kwargs):
+        # A standalone in-memory store has no oplog, like a non-replica-set mongod
+        raise OperationFailure('The $changeStream stage is only supported on replica sets', 40573)
+
+    # Writes --------------------------------------------------------------
+
+    def _insert(self, document):
+        generated_id = '_id' not in document
+        # Generated like the server does for upserts, so ids sort in insert order
+        document.setdefault('_id', ObjectId())
+        self._check_unique(document, generated_id=generated_id)
+        self.docs.append(copy.deepcopy(document))
+        return document['_id']
+
+    async def insert_one(self, document, **kwargs):
+        await asyncio.sleep(0)
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents, ordered=True, **kwargs):
+        await asyncio.sleep(0)
+        return InsertManyResult([self._insert(document) for document in documents], True)
+
+    def _update(self, filter, update, upsert=False, many=False):
+        matched = modified = 0
+        upserted_id = None
+        for doc in self.docs:
+            if not matches(doc, filter):
+                continue
+            updated = copy.deepcopy(doc)
+            _apply_update(updated, update)
+            self._check_unique(updated, ignore=doc)
+            matched += 1
+            if updated != doc:
+                modified += 1
+                doc.clear()
+                doc.update(updated)
+            if not many:
+                break
+        if matched == 0 and upsert:
+            doc = _seed_from_query(filter)
+            _apply_update(doc, update, inserting=True)
+            upserted_id = self._insert(doc)
+        return matched, modified, upserted_id
+
+    async def update_one(self, filter, update, upsert=False, **kwargs):
+        await asyncio.sleep(0)
+        matched, modified, upserted_id = self._update(filter, update, upsert)
+        raw = {'n': matched or (1 if upserted_id is not None else 0), 'nModified': modified}
+        if upserted_id is not None:
+            raw['upserted'] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def update_many(self, filter, update, upsert=False, **kwargs):
+        await asyncio.sleep(0)
+        matched, modified, upserted_id = self._update(filter, update, upsert, many=True)
+        raw = {'n': matched or (1 if upserted_id is not None else 0), 'nModified': modified}
+        if upserted_id is not None:
+            raw['upserted'] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        return await self.update_one(filter, replacement, upsert=upsert)
+
+    async def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                                  return_document=False, **kwargs):
+        await asyncio.sleep(0)
+        candidates = [doc for doc in self.docs if matches(doc, filter)]
+        if sort:
+            candidates = _sort(candidates, list(sort))
+        if candidates:
+            doc = candidates[0]
+            before = copy.deepcopy(doc)
+            updated = copy.deepcopy(doc)
+            _apply_update(updated, update)
+            self._check_unique(updated, ignore=doc)
+            doc.clear()
+            doc.update(updated)
+            return _project(doc if return_document else before, projection)
+        if upsert:
+            doc = _seed_from_query(filter)
+            _apply_update(doc, update, inserting=True)
+            self._insert(doc)
+            return _project(doc, projection) if return_document else None
+        return None
+
+    async def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        await asyncio.sleep(0)
+        candidates = [doc for doc in self.docs if matches(doc, filter)]
+        if sort:
+            candidates = _sort(candidates, list(sort))
+        if not candidates:
+            return None
+        self.docs.remove(candidates[0])
+        return _project(candidates[0], projection)
+
+    async def delete_one(self, filter, **kwargs):
+        await asyncio.sleep(0)
+        for doc in self.docs:
+            if matches(doc, filter):
+                self.docs.remove(doc)
+                return DeleteResult({'n': 1}, True)
+        return DeleteResult({'n': 0}, True)
+
+    async def delete_many(self, filter, **kwargs):
+        await asyncio.sleep(0)
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if not matches(doc, filter)]
+        return DeleteResult({'n': before - len(self.docs)}, True)
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        await asyncio.sleep(0)
+        result = {'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0,
+                  'upserted': [], 'writeErrors': [], 'writeConcernErrors': []}
+        for index, op in enumerate(requests):
+            try:
+                if isinstance(op, InsertOne):
+                    self._insert(op._doc)
+                    result['nInserted'] += 1
+                elif isinstance(op, (UpdateOne, UpdateMany, ReplaceOne)):
+                    matched, modified, upserted_id = self._update(
+                        op._filter, op._doc, op._upsert, many=isinstance(op, UpdateMany),
+                    )
+                    result['nMatched'] += matched
+                    result['nModified'] += modified
+                    if upserted_id is not None:
+                        result['nUpserted'] += 1
+                        result['upserted'].append({'index': index, '_id': upserted_id})
+                elif isinstance(op, (DeleteOne, DeleteMany)):
+                    for doc in list(self.docs):
+                        if matches(doc, op._filter):
+                            self.docs.remove(doc)
+                            result['nRemoved'] += 1
+                            if isinstance(op, DeleteOne):
+                                break
+                else:
+                    raise NotImplementedError(type(op).__name__)
+            except DuplicateKeyError as e:
+                result['writeErrors'].append({'index': index, 'code': 11000, 'errmsg': str(e), 'keyPattern': e.details.get('keyPattern')})
+                if ordered:
+                    break
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+
+class _FakeAggregation:
+    """Supports the pipeline stages used by the server: $match, $sort, $limit, $skip, $project, $group, $count"""
+
+    def __init__(self, collection, pipeline):
+        self.collection = collection
+        self.pipeline = pipeline
+
+    def _run(self):
+        docs = [copy.deepcopy(doc) for doc in self.collection.docs]
+        for stage in self.pipeline:
+            (name, spec), = stage.items()
+            if name == '$match':
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == '$sort':
+                docs = _sort(docs, list(spec.items()))
+            elif name == '$limit':
+                docs = docs[:spec]
+            elif name == '$skip':
+                docs = docs[spec:]
+            elif name == '$project':
+                docs = [self._project(doc, spec) for doc in docs]
+            elif name == '$group':
+                docs = self._group(docs, spec)
+            elif name == '$count':
+                docs = [{spec: len(docs)}]
+            else:
+                raise NotImplementedError(f'Aggregation stage {name} is not supported by the fake')
+        return docs
+
+    def _eval(self, doc, expression):
+        if isinstance(expression, str) and expression.startswith('$'):
+            value = _get_path(doc, expression[1:])
+            return None if value is _MISSING else value
+        if isinstance(expression, dict) and len(expression) == 1:
+            (op, args), = expression.items()
+            if op == '$cond':
+                condition, then, otherwise = args if isinstance(args, list) else (args['if'], args['then'], args['else'])
+                return self._eval(doc, then) if self._eval(doc, condition) else self._eval(doc, otherwise)
+            values = [self._eval(doc, arg) for arg in (args if isinstance(args, list) else [args])]
+            if op == '$gte':
+                return values[0] is not None and values[0] >= values[1]
+            if op == '$gt':
+                return values[0] is not None and values[0] > values[1]
+            if op == '$lt':
+                return values[0] is not None and values[0] < values[1]
+            if op == '$subtract':
+                return (values[0] or 0) - (values[1] or 0)
+            if op == '$add':
+                return sum(v or 0 for v in values)
+            if op == '$multiply':
+                result = 1
+                for v in values:
+                    result *= v or 0
+                return result
+            if op == '$max':
+                return max(v for v in values if v is not None)
+            if op == '$ifNull':
+                return values[0] if values[0] is not None else values[1]
+            raise NotImplementedError(f'Expression {op} is not supported by the fake')
+        return expression
+
+    def _project(self, doc, spec):
+        projected = {'_id': doc.get('_id')} if spec.get('_id', 1) else {}
+        for field, value in spec.items():
+            if field == '_id':
+                continue
+            if value in (1, True):
+                field_value = _get_path(doc, field)
+                if field_value is not _MISSING:
+                    _set_path(projected, field, field_value)
+            elif value not in (0, False):
+                _set_path(projected, field, self._eval(doc, value))
+        return projected
+
+    def _group(self, docs, spec):
+        groups = {}
+        for doc in docs:
+            key = self._eval(doc, spec['_id'])
+            hashable = json.dumps(key, sort_keys=True, default=str)
+            state = groups.setdefault(hashable, {'_id': key, '__docs': []})
+            state['__docs'].append(doc)
+        results = []
+        for state in groups.values():
+            members = state.pop('__docs')
+            for field, accumulator in spec.items():
+                if field == '_id':
+                    continue
+                (op, expression), = accumulator.items()
+                values = [self._eval(doc, expression) for doc in members]
+                numeric = [v for v in values if isinstance(v, (int, float))]
+                if op == '$sum':
+                    state[field] = sum(numeric)
+                elif op == '$avg':
+                    state[field] = sum(numeric) / len(numeric) if numeric else None
+                elif op == '$max':
+                    state[field] = max(numeric) if numeric else None
+                elif op == '$min':
+                    state[field] = min(numeric) if numeric else None
+                elif op == '$first':
+                    state[field] = values[0] if values else None
+                elif op == '$push':
+                    state[field] = values
+                else:
+                    raise NotImplementedError(f'Accumulator {op} is not supported by the fake')
+            results.append(state)
+        return results
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        results = self._run()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._run():
+            yield doc
+
+
+class FakeDatabase:
+    """In-memory stand-in for ``AsyncIOMotorDatabase``"""
+
+    def __init__(self, name='benchmark'):
+        self._name = name
+        self._collections = {}
+
+    @property
+    def name(self):
+        return self._name
+
+    def __getitem__(self, name):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = FakeCollection(self, name)
+        return collection
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    async def command(self, command, *args, **kwargs):
+        if command in ('ping', {'ping': 1}):
+            return {'ok': 1.0}
+        raise NotImplementedError(f'Command {command} is not supported by the fake')
+
+    async def list_collection_names(self, **kwargs):
+        return list(self._collections)
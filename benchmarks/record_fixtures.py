@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Record YouTube Data API responses into benchmarks/fixtures/youtube.json.
+
+Needs network access and a real key; the benchmark itself never does.
+
+Usage:
+    YOUTUBE_API_KEY=... python benchmarks/record_fixtures.py --channel UC... --region US
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from googleapiclient.discovery import build
+
+FIXTURES_PATH = Path(__file__).resolve().parent / 'fixtures' / 'youtube.json'
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def record(api_key, channel_ids, region, uploads_per_channel):
+    youtube = build('youtube', 'v3', developerKey=api_key)
+
+    videos = youtube.videos().list(
+        part='snippet,statistics,contentDetails',
+        chart='mostPopular',
+        regionCode=region,
+        maxResults=50,
+    ).execute().get('items', [])
+
+    channels = youtube.channels().list(
+        part='snippet,statistics,contentDetails',
+        id=','.join(channel_ids),
+    ).execute().get('items', [])
+
+    upload_ids = []
+    for channel in channels:
+        playlist_id = channel['contentDetails']['relatedPlaylists']['uploads']
+        response = youtube.playlistItems().list(
+            part='contentDetails',
+            playlistId=playlist_id,
+            maxResults=min(50, uploads_per_channel),
+        ).execute()
+        upload_ids.extend(item['contentDetails']['videoId'] for item in response.get('items', []))
+
+    known = {video['id'] for video in videos}
+    for batch in chunks([video_id for video_id in upload_ids if video_id not in known], 50):
+        videos.extend(youtube.videos().list(
+            part='snippet,statistics,contentDetails',
+            id=','.join(batch),
+        ).execute().get('items', []))
+
+    return {'channels': channels, 'videos': videos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--channel', action='append', required=True, help='channel ID to record (repeatable)')
+    parser.add_argument('--region', default='US')
+    parser.add_argument('--uploads', type=int, default=50, help='recent uploads to record per channel')
+    parser.add_argument('--output', type=Path, default=FIXTURES_PATH)
+    args = parser.parse_args()
+
+    fixtures = record(os.environ['YOUTUBE_API_KEY'], args.channel, args.region, args.uploads)
+    args.output.write_text(json.dumps(fixtures, indent=1))
+    print(f"Recorded {len(fixtures['channels'])} channels and {len(fixtures['videos'])} videos to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Offline load test and benchmark harness for the CreatorHub backend.
+
+Boots backend/server.py in-process against local stand-ins (recorded YouTube
+fixtures, a stub LlmChat and an in-memory Mongo), drives concurrent load per
+endpoint through the ASGI interface, and reports throughput, latency
+percentiles and event-loop blocking time. No network or mongod is needed.
+
+Usage:
+    python benchmarks/run.py                              # all scenarios
+    python benchmarks/run.py -s trending -s dashboard -c 32 -n 500
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --tolerance 0.15
+
+When --baseline is given the exit status is 1 if any scenario regressed
+(p95 latency up or throughput down by more than the tolerance).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / 'backend'
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import FakeDatabase, FakeYouTube, install_llm_stub  # noqa: E402
+
+# name -> (method, path, json body)
+SCENARIOS = {
+    'root': ('GET', '/api/', None),
+    'trending': ('GET', '/api/youtube/trending?region=US&max_results=50', None),
+    'trending-aggregate': ('GET', '/api/youtube/trending/aggregate?regions=US,GB,IN,DE,FR', None),
+    'trending-crawl': ('GET', '/api/youtube/trending/crawl?region=US&max_pages=4', None),
+    'search': ('GET', '/api/youtube/search?query=productivity&max_results=25', None),
+    'channel-stats': ('GET', '/api/youtube/channel/{channel_id}', None),
+    'dashboard': ('GET', '/api/analytics/dashboard', None),
+    'channels': ('GET', '/api/channels', None),
+    'generate-ideas': ('POST', '/api/content/generate-ideas', {'topic': 'ai tools', 'category': 'tech', 'count': 5}),
+    'generate-script': ('POST', '/api/generate-script', {'topic': 'ai tools', 'duration': '10min'}),
+    'trending-topics': ('GET', '/api/trending-topics', None),
+    'auto-research': ('POST', '/api/auto-research', {'topic': 'ai tools', 'language': 'english'}),
+    'generate-ideas-batch': ('POST', '/api/content/generate-ideas/batch', {
+        'items': [{'topic': f'topic {n}', 'category': 'tech', 'count': 5} for n in range(20)],
+    }),
+    'courses': ('GET', '/api/learning/courses', None),
+    'discussions': ('GET', '/api/community/discussions', None),
+}
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BOLD = '\033[1m'
+    ENDC = '\033[0m'
+
+
+def boot_app(youtube_latency, llm_latency):
+    """Import the server with every external dependency replaced by a local stand-in"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://benchmark.invalid:27017')
+    os.environ.setdefault('DB_NAME', 'benchmark')
+    os.environ['YOUTUBE_API_KEY'] = 'benchmark'
+    os.environ['EMERGENT_LLM_KEY'] = 'benchmark'
+    install_llm_stub(llm_latency)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import server
+    from mongo import InstrumentedDatabase
+
+    youtube = FakeYouTube(latency=youtube_latency)
+    server.youtube = youtube
+    server.build = lambda *args, **kwargs: youtube
+    server.db = InstrumentedDatabase(FakeDatabase())
+    # A single in-memory database has no secondaries to route analytics reads to
+    server.analytics_db = server.db
+    return server, youtube
+
+
+async def seed(server, youtube):
+    """Connect the first fixture channel as primary so the dashboard has data"""
+    channel = youtube.fixtures['channels'][0]
+    await server.db.connected_channels.insert_one(server.ConnectedChannel(
+        channel_id=channel['id'],
+        channel_name=channel['snippet']['title'],
+        channel_handle=channel['snippet'].get('customUrl'),
+        thumbnail_url=channel['snippet']['thumbnails']['medium']['url'],
+        subscriber_count=int(channel['statistics']['subscriberCount']),
+        view_count=int(channel['statistics']['viewCount']),
+        video_count=int(channel['statistics']['videoCount']),
+        is_primary=True,
+    ).dict() | {'user_id': server.DEFAULT_USER_ID})
+    return {'channel_id': channel['id']}
+
+
+async def asgi_request(app, method, path, body=None):
+    """Send one request straight through the ASGI app and return (status, body size)"""
+    path, _, query = path.partition('?')
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'benchmark'),
+            (b'accept-encoding', b'gzip'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('benchmark', 80),
+    }
+    sent = {'request': False}
+    done = asyncio.Event()
+    response = {'status': 0, 'size': 0}
+
+    async def receive():
+        if not sent['request']:
+            sent['request'] = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['size'] += len(message.get('body', b''))
+            if not message.get('more_body', False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return response['status'], response['size']
+
+
+class LoopBlockingMonitor:
+    """Measure how long the event loop was unable to run a short periodic timer"""
+
+    def __init__(self, interval=0.005, threshold=0.01):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.blocked += lag
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        return False
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(app, name, method, path, body, concurrency, total, warmup):
+    for _ in range(warmup):
+        await asgi_request(app, method, path, body)
+
+    latencies = []
+    errors = 0
+    remaining = {'count': total}
+
+    async def worker():
+        nonlocal errors
+        while remaining['count'] > 0:
+            remaining['count'] -= 1
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    with LoopBlockingMonitor() as monitor:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'loop_blocked_ms': round(monitor.blocked * 1000, 2),
+        'max_loop_lag_ms': round(monitor.max_lag * 1000, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of (scenario, reason) regressions against a baseline"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append((name, f"p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"))
+        if previous['rps'] and current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append((name, f"rps {previous['rps']} -> {current['rps']}"))
+    return regressions
+
+
+def print_report(results, baseline):
+    header = f"{'scenario':<18}{'req':>6}{'err':>5}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'blocked':>10}{'maxlag':>9}"
+    print(f"\n{Colors.BOLD}{header}{Colors.ENDC}")
+    for name, r in results.items():
+        line = (
+            f"{name:<18}{r['requests']:>6}{r['errors']:>5}{r['rps']:>10.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+            f"{r['loop_blocked_ms']:>10.1f}{r['max_loop_lag_ms']:>9.1f}"
+        )
+        previous = baseline.get(name) if baseline else None
+        if previous and previous.get('p95_ms'):
+            delta = (r['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+            color = Colors.RED if delta > 0 else Colors.GREEN
+            line += f"  {color}p95 {delta:+.1f}%{Colors.ENDC}"
+        print(line)
+    print("(latencies in ms; 'blocked' is total time the event loop was stalled >10ms)")
+
+
+async def main(args):
+    server, youtube = boot_app(args.youtube_latency, args.llm_latency)
+    app = server.app
+    await app.router.startup()
+    try:
+        # Startup only schedules the warm-up; measure against a ready worker
+        while not server.warmup_state["ready"]:
+            await asyncio.sleep(0.01)
+        params = await seed(server, youtube)
+        names = args.scenario or list(SCENARIOS)
+        results = {}
+        for name in names:
+            method, path, body = SCENARIOS[name]
+            print(f"{Colors.YELLOW}running{Colors.ENDC} {name} ({args.requests} requests, concurrency {args.concurrency})")
+            results[name] = await run_scenario(
+                app, name, method, path.format(**params), body,
+                args.concurrency, args.requests, args.warmup,
+            )
+    finally:
+        await app.router.shutdown()
+    return results, youtube
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS), help='scenario to run (repeatable)')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per scenario')
+    parser.add_argument('--youtube-latency', type=float, default=0.05, help='seconds per fake YouTube call')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='seconds per stub LLM call')
+    parser.add_argument('--baseline', type=Path, help='compare against a saved results file')
+    parser.add_argument('--save-baseline', type=Path, help='write results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (default 0.2)')
+    parser.add_argument('--json', action='store_true', help='print raw results as JSON')
+
+    parser.add_argument('-v', '--verbose', action='store_true', help='keep server INFO logging')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    if not args.verbose:
+        # The server configures logging from LOG_LEVEL when it is imported; keep the report readable
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    results, youtube = asyncio.run(main(args))
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, baseline)
+        print(f"fake YouTube calls: {youtube.calls}")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + '\n')
+        print(f"saved baseline to {args.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, reason in regressions:
+            print(f"{Colors.RED}REGRESSION{Colors.ENDC}: {name}: {reason}")
+        if regressions:
+            sys.exit(1)
+        print(f"{Colors.GREEN}No regressions beyond {args.tolerance:.0%}{Colors.ENDC}")
+
+
+if __name__ == '__main__':
+    cli()
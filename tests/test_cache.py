@@ -0,0 +1,60 @@
+import asyncio
+
+from cache import TTLCache
+
+
+def test_invalidate_during_load_discards_the_stale_result():
+    async def scenario():
+        cache = TTLCache('test', ttl=60)
+        store = {'value': 'old'}
+        loading = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_loader():
+            value = store['value']
+            loading.set()
+            await release.wait()
+            return value
+
+        in_flight = asyncio.create_task(cache.get_or_load('k', slow_loader))
+        await loading.wait()
+        store['value'] = 'new'
+        cache.invalidate('k')
+        release.set()
+        assert await in_flight == 'old'
+
+        async def loader():
+            return store['value']
+
+        assert await cache.get_or_load('k', loader) == 'new'
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = TTLCache('test', ttl=60)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'v'
+
+        results = await asyncio.gather(*(cache.get_or_load('k', loader) for _ in range(5)))
+        assert results == ['v'] * 5 and len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_ttl_can_depend_on_the_loaded_value():
+    async def scenario():
+        cache = TTLCache('test', ttl=60)
+
+        async def failed():
+            return {'connected': False}
+
+        await cache.get_or_load('k', failed, ttl=lambda value: 60 if value['connected'] else 0)
+        assert cache.get('k') is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta
+
+from catalog import CATALOG_FIRST_REFRESH_HOURS, daily_view_rate, refresh_interval
+
+
+def test_rate_is_measured_only_against_a_previous_refresh():
+    now = datetime(2026, 1, 31)
+    published_at = now - timedelta(days=30)
+    assert daily_view_rate(3000, published_at, now) == (100.0, False)
+    assert daily_view_rate(3000, published_at, now, 2800, now - timedelta(days=1)) == (200.0, True)
+
+
+def test_unmeasured_old_video_is_refreshed_soon():
+    now = datetime(2026, 1, 1)
+    published_at = now - timedelta(days=1000)
+    assert refresh_interval(published_at, now) > timedelta(hours=CATALOG_FIRST_REFRESH_HOURS)
+    assert refresh_interval(published_at, now, measured=False) == timedelta(hours=CATALOG_FIRST_REFRESH_HOURS)
@@ -0,0 +1,112 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from compression import CompressionMiddleware, choose_encoding
+
+
+def json_app(body, content_type=b'application/json', extra_headers=()):
+    async def app(scope, receive, send):
+        headers = [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers + list(extra_headers)})
+        await send({'type': 'http.response.body', 'body': body})
+    return app
+
+
+def streaming_app(chunks):
+    async def app(scope, receive, send):
+        headers = [(b'content-type', b'application/x-ndjson')]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        for index, chunk in enumerate(chunks):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': index < len(chunks) - 1})
+    return app
+
+
+def call(app, accept_encoding=None, minimum_size=100):
+    """Run one request through the middleware; returns (headers, body chunks)"""
+    headers = [(b'accept-encoding', accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, receive, send))
+    start = messages[0]
+    response_headers = {key.decode().lower(): value.decode() for key, value in start['headers']}
+    return response_headers, [message['body'] for message in messages[1:]]
+
+
+BODY = b'{"ideas": [' + b', '.join(b'"idea %d"' % i for i in range(100)) + b']}'
+
+
+def test_gzip_response():
+    headers, chunks = call(json_app(BODY), 'gzip, deflate')
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['vary'] == 'Accept-Encoding'
+    assert int(headers['content-length']) == len(chunks[0])
+    assert gzip.decompress(chunks[0]) == BODY
+
+
+def test_brotli_response():
+    brotli = pytest.importorskip('brotli')
+    headers, chunks = call(json_app(BODY), 'gzip, br')
+    assert headers['content-encoding'] == 'br'
+    assert brotli.decompress(b''.join(chunks)) == BODY
+
+
+def test_q_zero_refuses_an_encoding():
+    assert choose_encoding('gzip;q=0') is None
+    assert choose_encoding('*;q=0') is None
+    assert choose_encoding('br;q=0, gzip') == 'gzip'
+    headers, chunks = call(json_app(BODY), 'gzip;q=0')
+    assert 'content-encoding' not in headers
+    assert headers['vary'] == 'Accept-Encoding'
+    assert chunks == [BODY]
+
+
+def test_small_body_passes_through_with_vary():
+    headers, chunks = call(json_app(b'{"ok": true}'), 'gzip')
+    assert 'content-encoding' not in headers
+    assert headers['vary'] == 'Accept-Encoding'
+    assert chunks == [b'{"ok": true}']
+
+
+def test_already_encoded_body_passes_through_with_vary():
+    encoded = gzip.compress(BODY)
+    app = json_app(encoded, extra_headers=[(b'content-encoding', b'gzip'), (b'vary', b'Accept-Encoding')])
+    headers, chunks = call(app, 'gzip')
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['vary'] == 'Accept-Encoding'
+    assert chunks == [encoded]
+
+
+def test_without_accept_encoding_still_varies():
+    headers, chunks = call(json_app(BODY))
+    assert 'content-encoding' not in headers
+    assert headers['vary'] == 'Accept-Encoding'
+    assert chunks == [BODY]
+
+
+def test_binary_content_type_is_untouched():
+    headers, chunks = call(json_app(BODY, content_type=b'image/png'), 'gzip')
+    assert 'content-encoding' not in headers
+    assert 'vary' not in headers
+    assert chunks == [BODY]
+
+
+def test_streamed_chunks_decompress_as_they_arrive():
+    lines = [b'{"n": %d}\n' % i for i in range(3)]
+    headers, chunks = call(streaming_app(lines), 'gzip', minimum_size=10_000)
+    assert headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in headers
+    decompressor = zlib.decompressobj(31)
+    # Each flushed chunk yields its line without waiting for the end of the stream
+    for line, chunk in zip(lines, chunks):
+        assert decompressor.decompress(chunk) == line
+    assert decompressor.flush() == b''
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from cache import TTLCache
+from fakes import FakeDatabase
+from invalidation import CacheInvalidator
+
+
+def test_poller_applies_events_from_a_worker_with_a_slow_clock():
+    async def scenario():
+        db = FakeDatabase()
+        cache = TTLCache('test', ttl=60)
+        listener = CacheInvalidator(lambda: db.cache_events, poll_interval=0.01)
+        listener.register('test', cache)
+        listener.start()
+        for _ in range(100):
+            if listener.mode == 'polling':
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        cache.set('k', 'stale')
+        # Published by another worker whose clock runs an hour behind
+        await db.cache_events.update_one(
+            {'event': 'e1'},
+            {'$setOnInsert': {'cache': 'test', 'key': 'k', 'origin': 'other-worker',
+                              'created_at': datetime.utcnow() - timedelta(hours=1)}},
+            upsert=True,
+        )
+        for _ in range(100):
+            if cache.get('k') is None:
+                break
+            await asyncio.sleep(0.01)
+        await listener.stop()
+        assert cache.get('k') is None
+
+    asyncio.run(scenario())
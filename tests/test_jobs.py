@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fakes import FakeDatabase
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, request_hash
+
+
+class Overloaded(Exception):
+    pass
+
+
+def make_queue(db, handler, lease_seconds=60, **kwargs):
+    return JobQueue('test', handler, lambda: db.jobs, workers=1, lease_seconds=lease_seconds,
+                    retry_on=(Overloaded,), **kwargs)
+
+
+async def wait_for_status(queue, job_id, status, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        job = await queue.get(job_id)
+        if job['status'] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {job['status']}")
+
+
+def test_stopping_mid_run_requeues_the_job():
+    async def scenario():
+        db = FakeDatabase()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def handler(payload, progress):
+            started.set()
+            await release.wait()
+            return {'ok': True}
+
+        queue = make_queue(db, handler)
+        await queue.start()
+        job, _ = await queue.submit({'topic': 'a'})
+        await started.wait()
+        await queue.stop()
+        assert (await queue.get(job['job_id']))['status'] == QUEUED
+
+        release.set()
+        await queue.start()
+        again, deduplicated = await queue.submit({'topic': 'a'})
+        assert deduplicated and again['job_id'] == job['job_id']
+        await wait_for_status(queue, job['job_id'], SUCCEEDED)
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def dead_job(job_id, payload):
+    """A job claimed by a worker that died without releasing it"""
+    return {
+        'job_id': job_id, 'kind': 'test', 'status': RUNNING, 'stage': 'started',
+        'request_hash': request_hash('test', payload), 'request': payload,
+        'lease_expires_at': datetime.utcnow() - timedelta(seconds=1),
+    }
+
+
+def test_expired_running_job_is_not_returned_as_duplicate():
+    async def scenario():
+        db = FakeDatabase()
+
+        async def handler(payload, progress):
+            return {'ok': True}
+
+        queue = make_queue(db, handler)
+        await db.jobs.insert_one(dead_job('dead', {'topic': 'b'}))
+        queue._queue = asyncio.Queue()
+        job, deduplicated = await queue.submit({'topic': 'b'})
+        assert not deduplicated and job['job_id'] != 'dead'
+
+    asyncio.run(scenario())
+
+
+def test_start_requeues_jobs_with_lapsed_lease():
+    async def scenario():
+        db = FakeDatabase()
+
+        async def handler(payload, progress):
+            return {'ok': True}
+
+        queue = make_queue(db, handler)
+        await db.jobs.insert_one(dead_job('dead', {'topic': 'c'}))
+        await queue.start()
+        await wait_for_status(queue, 'dead', SUCCEEDED)
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_job_claimed_elsewhere_is_forgotten_locally():
+    async def scenario():
+        db = FakeDatabase()
+
+        async def handler(payload, progress):
+            return {'ok': True}
+
+        queue = make_queue(db, handler)
+        queue._queue = asyncio.Queue()
+        job, _ = await queue.submit({'topic': 'd'})
+        # Another process claims it before this one's worker gets to it
+        await db.jobs.update_one({'job_id': job['job_id']}, {'$set': {'status': SUCCEEDED}})
+        await queue._run(job['job_id'])
+        assert queue._pending == {}
+
+    asyncio.run(scenario())
+
+
+def test_transient_error_is_retried_after_backoff():
+    async def scenario():
+        db = FakeDatabase()
+        calls = []
+
+        async def handler(payload, progress):
+            calls.append(1)
+            if len(calls) == 1:
+                raise Overloaded('shed')
+            return {'ok': True}
+
+        queue = make_queue(db, handler, reclaim_seconds=0.01, retry_backoff=0)
+        await queue.start()
+        job, _ = await queue.submit({'topic': 'e'})
+        done = await wait_for_status(queue, job['job_id'], SUCCEEDED)
+        assert done['attempts'] == 2 and done['error'] is None
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_transient_errors_fail_the_job_after_max_attempts():
+    async def scenario():
+        db = FakeDatabase()
+
+        async def handler(payload, progress):
+            raise Overloaded('shed')
+
+        queue = make_queue(db, handler, reclaim_seconds=0.01, retry_backoff=0, max_attempts=2)
+        await queue.start()
+        job, _ = await queue.submit({'topic': 'f'})
+        failed = await wait_for_status(queue, job['job_id'], FAILED)
+        assert failed['attempts'] == 2 and failed['error'] == 'shed'
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_running_pool_reclaims_lapsed_leases():
+    async def scenario():
+        db = FakeDatabase()
+
+        async def handler(payload, progress):
+            return {'ok': True}
+
+        queue = make_queue(db, handler, reclaim_seconds=0.01)
+        await queue.start()
+        # The worker holding it dies after this pool started
+        await db.jobs.insert_one(dead_job('dead', {'topic': 'g'}))
+        await wait_for_status(queue, 'dead', SUCCEEDED)
+        await queue.stop()
+
+    asyncio.run(scenario())
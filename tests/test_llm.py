@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from llm import CircuitBreaker, CircuitOpen, LLMGateway, LLMOverloaded
+
+
+class Chat:
+    def __init__(self, fail=False, delay=0):
+        self.fail = fail
+        self.delay = delay
+
+    async def send_message(self, message):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('provider error')
+        return f'reply to {message}'
+
+
+def elapse_reset_timeout(breaker):
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_breaker_opens_after_consecutive_failures_and_closes_after_a_good_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    elapse_reset_timeout(breaker)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    elapse_reset_timeout(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.is_open()
+
+
+def test_half_open_breaker_admits_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    elapse_reset_timeout(breaker)
+    breaker.before_call()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    # A cancelled probe frees the slot for the next caller
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_gateway_rejects_calls_while_open_without_reaching_the_provider():
+    async def scenario():
+        gateway = LLMGateway(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+        with pytest.raises(RuntimeError):
+            await gateway.send(Chat(fail=True), 'a', 'test')
+        chat = Chat()
+        chat.send_message = None  # would fail if called
+        with pytest.raises(CircuitOpen):
+            await gateway.send(chat, 'b', 'test')
+        elapse_reset_timeout(gateway.breaker)
+        assert await gateway.send(Chat(), 'c', 'test') == 'reply to c'
+        assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_queued_call_is_shed_after_the_queue_timeout():
+    async def scenario():
+        gateway = LLMGateway(max_in_flight=1, max_queue=5, queue_timeout=0.05)
+        slow = asyncio.create_task(gateway.send(Chat(delay=0.5), 'slow', 'test'))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded):
+            await gateway.send(Chat(), 'queued', 'test')
+        assert gateway._admitted == 1
+        assert await slow == 'reply to slow'
+        assert gateway._admitted == 0
+
+    asyncio.run(scenario())
+
+
+def test_calls_beyond_the_queue_are_shed_immediately():
+    async def scenario():
+        gateway = LLMGateway(max_in_flight=1, max_queue=0, queue_timeout=5)
+        slow = asyncio.create_task(gateway.send(Chat(delay=0.05), 'slow', 'test'))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded):
+            await gateway.send(Chat(), 'extra', 'test')
+        await slow
+
+    asyncio.run(scenario())
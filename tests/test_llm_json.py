@@ -0,0 +1,51 @@
+import pytest
+
+from llm_json import JSONObjectStream, extract_objects
+
+REPLY = '[{"title": "One", "tags": ["a", "b"]}, {"title": "Two {braces} and [brackets]"}]'
+
+
+def test_plain_array():
+    assert extract_objects(REPLY) == [
+        {"title": "One", "tags": ["a", "b"]},
+        {"title": "Two {braces} and [brackets]"},
+    ]
+
+
+def test_code_fenced_reply():
+    assert len(extract_objects(f'Here you go:\n```json\n{REPLY}\n```\nEnjoy!')) == 2
+
+
+@pytest.mark.parametrize("prefix", [
+    "[Note: these are drafts]\n",
+    "[Note: these are drafts\n",
+    "See [the guide](https://example.com) for more. ",
+    'He said "hi\n',
+])
+def test_prose_before_the_array(prefix):
+    assert [obj["title"] for obj in extract_objects(prefix + REPLY)] == ["One", "Two {braces} and [brackets]"]
+
+
+def test_broken_objects_are_repaired_or_skipped():
+    stream = JSONObjectStream()
+    objects = stream.feed('[{"title": "One",}, {"title": ]}, {"title": “Three”}]')
+    stream.close()
+    assert objects == [{"title": "One"}, {"title": "Three"}]
+    assert stream.failures == 1
+
+
+def test_truncated_reply_keeps_complete_objects():
+    stream = JSONObjectStream()
+    objects = stream.feed('[{"title": "One"}, {"title": "Tw')
+    stream.close()
+    assert objects == [{"title": "One"}]
+    assert stream.failures == 1
+
+
+def test_streamed_in_chunks():
+    stream = JSONObjectStream()
+    seen = []
+    for i in range(0, len(REPLY), 7):
+        seen.extend(stream.feed(REPLY[i:i + 7]))
+    stream.close()
+    assert seen == extract_objects(REPLY) and stream.failures == 0
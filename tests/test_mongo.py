@@ -0,0 +1,33 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from mongo import ensure_indexes
+
+
+class ConflictingCollection:
+    """Holds a plain ``is_primary_1`` index, as left by an older release"""
+
+    def __init__(self):
+        self.indexes = {'is_primary_1': {}}
+        self.dropped = []
+
+    async def create_index(self, keys, **options):
+        name = '_'.join(f'{field}_{direction}' for field, direction in keys)
+        if name in self.indexes and self.indexes[name] != options:
+            raise OperationFailure('Index already exists with a different spec', code=86)
+        self.indexes[name] = options
+        return name
+
+    async def drop_index(self, name):
+        self.dropped.append(name)
+        del self.indexes[name]
+
+
+def test_index_with_changed_definition_is_rebuilt():
+    collection = ConflictingCollection()
+    options = {'unique': True, 'partialFilterExpression': {'is_primary': True}}
+    failed = asyncio.run(ensure_indexes({'channels': collection}, [('channels', [('is_primary', 1)], options)]))
+    assert failed == 0
+    assert collection.dropped == ['is_primary_1']
+    assert collection.indexes['is_primary_1'] == options
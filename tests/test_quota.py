@@ -0,0 +1,44 @@
+import asyncio
+
+from fakes import FakeDatabase
+from quota import QuotaBudget
+
+
+def test_workers_share_the_daily_tally():
+    async def scenario():
+        db = FakeDatabase()
+        first = QuotaBudget(lambda: db.youtube_quota, daily_limit=1000, tenant_limit=150)
+        second = QuotaBudget(lambda: db.youtube_quota, daily_limit=1000, tenant_limit=150)
+        first.spend(100, 'alice')
+        second.spend(300)
+        await first.sync()
+        await second.sync()
+        assert second.remaining == 600
+        assert not second.can_spend(100, tenant='alice')
+        # Already merged spend is not added twice
+        await first.sync()
+        assert first.remaining == 600 and first.spent_by('alice') == 100
+
+    asyncio.run(scenario())
+
+
+def test_failed_sync_keeps_spend_for_the_next_one():
+    class Unreachable:
+        async def bulk_write(self, requests, ordered=True):
+            raise ConnectionError('mongo down')
+
+    async def scenario():
+        db = FakeDatabase()
+        collections = [Unreachable(), db.youtube_quota]
+        budget = QuotaBudget(lambda: collections[0], daily_limit=1000)
+        budget.spend(50)
+        try:
+            await budget.sync()
+        except ConnectionError:
+            pass
+        collections.pop(0)
+        await budget.sync()
+        assert (await db.youtube_quota.find_one({'tenant': None}))['spent'] == 50
+        assert budget.remaining == 950
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fakes import FakeDatabase
+from scheduler import PeriodicJob
+
+
+def test_long_run_renews_its_lease():
+    async def scenario():
+        db = FakeDatabase()
+
+        async def slow_job():
+            await asyncio.sleep(0.25)
+
+        job = PeriodicJob('slow', 0.1, slow_job, get_lock_collection=lambda: db.job_locks)
+        started = datetime.utcnow()
+        run = asyncio.create_task(job.run_once())
+        await asyncio.sleep(0.15)
+        # Past the first interval, the lease has been extended while the job is still running
+        lease = await db.job_locks.find_one({'_id': 'slow'})
+        assert lease['expires_at'] > started + timedelta(seconds=0.15)
+        assert await run
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from fakes import FakeDatabase
+from similarity import SemanticCache, SimilarityIndex
+
+
+@pytest.fixture
+def index():
+    index = SimilarityIndex()
+    for topic in ("investigation tips for beginners", "market strategy", "cats", "best budget phones 2024",
+                  "cryptocurrency tips", "photosynthesis facts"):
+        index.add(topic, topic, topic)
+    return index
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("best budget phone 2024", "best budget phones 2024"),
+    ("Best Budget Phones 2024!", "best budget phones 2024"),
+    ("cat", "cats"),
+    ("crypto tips", "cryptocurrency tips"),
+])
+def test_near_duplicates_match(index, query, expected):
+    key, _, score = index.query(query)
+    assert key == expected and score >= 0.75
+
+
+@pytest.mark.parametrize("query", [
+    "investing tips for beginners",
+    "marketing strategy",
+    "cat videos",
+    "best budget phones 2025",
+    "photo facts",
+])
+def test_distinct_topics_do_not_match(index, query):
+    assert index.query(query) is None
+
+
+def test_cache_sees_entries_stored_by_another_worker(monkeypatch):
+    monkeypatch.setattr('similarity.SEMANTIC_CACHE_REFRESH_SECONDS', 0)
+
+    async def scenario():
+        db = FakeDatabase()
+        here, there = SemanticCache(lambda: db.semantic_cache), SemanticCache(lambda: db.semantic_cache)
+        assert await here.lookup('ideas', 'budget travel tips') is None
+        await there.store('ideas', 'budget travel tips', ['idea'])
+        result, confidence, _ = await here.lookup('ideas', 'budget travel tip')
+        assert result == ['idea'] and confidence >= 0.75
+
+    asyncio.run(scenario())
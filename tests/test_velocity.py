@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import velocity
+from fakes import FakeDatabase
+from velocity import VelocityTracker, next_state
+
+
+def test_rate_between_observations():
+    ts = datetime(2026, 1, 1)
+    first = next_state(None, ts, 1000, {'US:all': 10})
+    second = next_state(first, ts + timedelta(hours=2), 3000, {'US:all': 4})
+    assert second['views_per_hour'] == 1000
+    assert second['rank_change'] == {'US:all': 6}
+    assert second['first_seen'] == ts
+
+
+def test_observation_at_same_time_keeps_previous_state():
+    ts = datetime(2026, 1, 1)
+    state = next_state(None, ts, 1000, {})
+    assert next_state(state, ts, 1500, {}) is state
+
+
+def test_rerun_in_same_minute_is_skipped_without_interval(monkeypatch):
+    monkeypatch.setattr(velocity, 'VELOCITY_MIN_INTERVAL_MINUTES', 0)
+
+    async def scenario():
+        db = FakeDatabase()
+        tracker = VelocityTracker(lambda: db.video_velocity, lambda: db.trending_snapshots)
+        ts = datetime(2026, 1, 1)
+        assert await tracker.record(ts, {'v1': (1000, {})}) == 1
+        assert await tracker.record(ts, {'v1': (1200, {})}) == 0
+        assert await tracker.record(ts + timedelta(minutes=1), {'v1': (1200, {})}) == 1
+        assert tracker.get('v1')['views_per_hour'] == 12000
+        assert await db.trending_snapshots.count_documents({'video_id': 'v1'}) == 2
+
+    asyncio.run(scenario())